@@ -39,10 +39,23 @@ class handler(BaseHTTPRequestHandler):
                 from lib.handlers.pendaftar_list import handler as PendaftarListHandler
                 PendaftarListHandler.do_GET(self) if self.command == 'GET' else PendaftarListHandler.do_OPTIONS(self)
                 
+            elif action == 'pendaftar_stats':
+                from lib.handlers.pendaftar_stats import handler as PendaftarStatsHandler
+                PendaftarStatsHandler.do_GET(self) if self.command == 'GET' else PendaftarStatsHandler.do_OPTIONS(self)
+                
             elif action == 'pendaftar_cek_status':
                 from lib.handlers.pendaftar_cek_status import handler as CekStatusHandler
                 CekStatusHandler.do_GET(self) if self.command == 'GET' else CekStatusHandler.do_OPTIONS(self)
                 
+            elif action == 'cek_status_snapshot':
+                from lib.handlers.cek_status_snapshot import handler as CekStatusSnapshotHandler
+                if self.command == 'GET':
+                    CekStatusSnapshotHandler.do_GET(self)
+                elif self.command == 'POST':
+                    CekStatusSnapshotHandler.do_POST(self)
+                else:
+                    CekStatusSnapshotHandler.do_OPTIONS(self)
+                
             elif action == 'pendaftar_status':
                 from lib.handlers.pendaftar_status import handler as StatusHandler
                 # Use unbound method call pattern (consistent with other handlers)
@@ -67,6 +80,17 @@ class handler(BaseHTTPRequestHandler):
                 from lib.handlers.export_pendaftar_xlsx import handler as ExportXLSXHandler
                 ExportXLSXHandler.do_GET(self) if self.command == 'GET' else ExportXLSXHandler.do_OPTIONS(self)
                 
+            elif action == 'export_jobs':
+                from lib.handlers.export_jobs import handler as ExportJobsHandler
+                if self.command == 'GET':
+                    ExportJobsHandler.do_GET(self)
+                elif self.command == 'POST':
+                    ExportJobsHandler.do_POST(self)
+                elif self.command == 'PUT':
+                    ExportJobsHandler.do_PUT(self)
+                else:
+                    ExportJobsHandler.do_OPTIONS(self)
+                
             elif action == 'get_gelombang_list':
                 from lib.handlers.gelombang_list import handler as GelombangListHandler
                 GelombangListHandler.do_GET(self) if self.command == 'GET' else GelombangListHandler.do_OPTIONS(self)
@@ -91,6 +115,10 @@ class handler(BaseHTTPRequestHandler):
                 from lib.handlers.pembayaran_list import handler as PembayaranListHandler
                 PembayaranListHandler.do_GET(self) if self.command == 'GET' else PembayaranListHandler.do_OPTIONS(self)
                 
+            elif action == 'pendaftar_pembayaran':
+                from lib.handlers.pendaftar_pembayaran_list import handler as PendaftarPembayaranHandler
+                PendaftarPembayaranHandler.do_GET(self) if self.command == 'GET' else PendaftarPembayaranHandler.do_OPTIONS(self)
+                
             elif action == 'pembayaran_submit':
                 from lib.handlers.pembayaran_submit import handler as PembayaranSubmitHandler
                 PembayaranSubmitHandler.do_POST(self) if self.command == 'POST' else PembayaranSubmitHandler.do_OPTIONS(self)
@@ -99,6 +127,14 @@ class handler(BaseHTTPRequestHandler):
                 from lib.handlers.pembayaran_verify import handler as PembayaranVerifyHandler
                 PembayaranVerifyHandler.do_POST(self) if self.command == 'POST' else PembayaranVerifyHandler.do_OPTIONS(self)
                 
+            elif action == 'pembayaran_verify_bulk':
+                from lib.handlers.pembayaran_verify_bulk import handler as PembayaranVerifyBulkHandler
+                PembayaranVerifyBulkHandler.do_POST(self) if self.command == 'POST' else PembayaranVerifyBulkHandler.do_OPTIONS(self)
+                
+            elif action == 'pembayaran_reconcile':
+                from lib.handlers.pembayaran_reconcile import handler as PembayaranReconcileHandler
+                PembayaranReconcileHandler.do_POST(self) if self.command == 'POST' else PembayaranReconcileHandler.do_OPTIONS(self)
+                
             elif action == 'supa_proxy':
                 from lib.handlers.supa_proxy import handler as SupaProxyHandler
                 if self.command == 'POST':
@@ -1,12 +1,81 @@
 # /api/_supabase.py
 import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
 from supabase import create_client, Client
 
-def supabase_client(service_role: bool = False) -> Client:
+# Client di-cache per role (anon / service_role) di level proses, sehingga
+# invocation yang "warm" di Vercel memakai ulang HTTP session + koneksi
+# keep-alive yang sama, tanpa create_client + TLS handshake di setiap request.
+#
+# Client akan dibuat ulang jika:
+# - URL / key di ENV berubah
+# - umur client melewati SUPABASE_CLIENT_MAX_AGE (detik, default 900)
+# - idle melewati SUPABASE_CLIENT_MAX_IDLE (detik, default 240), karena
+#   socket keep-alive biasanya sudah diputus server saat function dibekukan
+# - HTTP session-nya sudah ditutup (health check gagal)
+_DEFAULT_MAX_AGE = 900
+_DEFAULT_MAX_IDLE = 240
+
+_lock = threading.Lock()
+_registry: Dict[str, Dict[str, object]] = {}
+
+
+def _env_seconds(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _role_name(service_role: bool) -> str:
+    return "service_role" if service_role else "anon"
+
+
+def _session_closed(client: Client) -> bool:
+    """Cek apakah HTTP session PostgREST / Storage milik client sudah ditutup."""
+    try:
+        postgrest = getattr(client, "_postgrest", None)
+        session = getattr(postgrest, "session", None)
+        if session is not None and getattr(session, "is_closed", False):
+            return True
+
+        storage = getattr(client, "_storage", None)
+        session = getattr(storage, "session", None)
+        if session is not None and getattr(session, "is_closed", False):
+            return True
+    except Exception:
+        return True
+    return False
+
+
+def _is_healthy(entry: Dict[str, object], url: str, key: str, now: float) -> bool:
+    if entry.get("url") != url or entry.get("key") != key:
+        return False
+    if now - float(entry["created_at"]) > _env_seconds("SUPABASE_CLIENT_MAX_AGE", _DEFAULT_MAX_AGE):
+        return False
+    if now - float(entry["last_used"]) > _env_seconds("SUPABASE_CLIENT_MAX_IDLE", _DEFAULT_MAX_IDLE):
+        return False
+    return not _session_closed(entry["client"])  # type: ignore[arg-type]
+
+
+def _close_client(client: Client) -> None:
+    """Tutup HTTP session lama (best effort) agar koneksi tidak bocor."""
+    for attr in ("_postgrest", "_storage"):
+        session = getattr(getattr(client, attr, None), "session", None)
+        try:
+            if session is not None and hasattr(session, "close"):
+                session.close()
+        except Exception as e:
+            print(f"[SUPABASE] Warning: gagal menutup session {attr}: {e}")
+
+
+def supabase_settings(service_role: bool = False) -> Tuple[str, str]:
     """
-    Buat Supabase client.
-    - service_role=True  → pakai SERVICE_ROLE_KEY (khusus server, akses penuh)
-    - service_role=False → pakai ANON_KEY (akses publik)
+    Ambil (SUPABASE_URL, key) dari ENV.
+    Dipakai juga untuk request HTTP langsung (mis. resumable upload Storage).
     """
     url = os.getenv("SUPABASE_URL", "").rstrip("/")
     key = (
@@ -18,4 +87,87 @@ def supabase_client(service_role: bool = False) -> Client:
     if not url or not key:
         raise ValueError("ENV SUPABASE_URL / SUPABASE_*_KEY belum di-set.")
 
-    return create_client(url, key)
+    return url, key
+
+
+def supabase_client(service_role: bool = False) -> Client:
+    """
+    Ambil Supabase client (di-cache per role, dipakai ulang antar request).
+    - service_role=True  → pakai SERVICE_ROLE_KEY (khusus server, akses penuh)
+    - service_role=False → pakai ANON_KEY (akses publik)
+    """
+    url, key = supabase_settings(service_role)
+
+    role = _role_name(service_role)
+    now = time.monotonic()
+
+    with _lock:
+        entry = _registry.get(role)
+        if entry is not None and _is_healthy(entry, url, key, now):
+            entry["last_used"] = now
+            return entry["client"]  # type: ignore[return-value]
+
+        if entry is not None:
+            print(f"[SUPABASE] Client {role} kedaluwarsa / tidak sehat, membuat ulang")
+            _close_client(entry["client"])  # type: ignore[arg-type]
+
+        client = create_client(url, key)
+        _registry[role] = {
+            "client": client,
+            "url": url,
+            "key": key,
+            "created_at": now,
+            "last_used": now,
+        }
+        return client
+
+
+def reset_supabase_clients(service_role: Optional[bool] = None) -> None:
+    """
+    Buang client yang ter-cache sehingga panggilan berikutnya membuat client baru.
+    - service_role=None  → reset semua role
+    - service_role=True/False → reset role tersebut saja
+    Dipakai setelah error koneksi (mis. socket keep-alive mati) atau rotasi key.
+    """
+    roles = (
+        [_role_name(True), _role_name(False)]
+        if service_role is None
+        else [_role_name(service_role)]
+    )
+    with _lock:
+        for role in roles:
+            entry = _registry.pop(role, None)
+            if entry is not None:
+                _close_client(entry["client"])  # type: ignore[arg-type]
+
+
+# Error PostgREST / Postgres untuk fungsi RPC yang belum dibuat
+_MISSING_FUNCTION_CODES = ("PGRST202", "42883")
+# Error PostgREST / Postgres untuk tabel / view yang belum dibuat
+_MISSING_RELATION_CODES = ("PGRST205", "42P01")
+
+
+def _has_error_code(exc: Exception, codes) -> bool:
+    code = getattr(exc, "code", None)
+    if code is None and exc.args and isinstance(exc.args[0], dict):
+        code = exc.args[0].get("code")
+    if code is not None:
+        return str(code) in codes
+    return any(missing in str(exc) for missing in codes)
+
+
+def is_missing_function(exc: Exception) -> bool:
+    """
+    True jika exception dari supa.rpc() berarti fungsinya belum ada di database.
+    Hanya kondisi ini yang aman untuk fallback ke query biasa: error lain bisa
+    terjadi setelah fungsi berjalan (rollback / sudah commit).
+    """
+    return _has_error_code(exc, _MISSING_FUNCTION_CODES)
+
+
+def is_missing_relation(exc: Exception) -> bool:
+    """
+    True jika exception dari supa.table() berarti tabel / view belum ada di database.
+    Error lain (timeout, filter salah, permission) tidak boleh disamarkan fallback.
+    """
+    return _has_error_code(exc, _MISSING_RELATION_CODES)
@@ -0,0 +1,525 @@
+"""
+Rekonsiliasi mutasi rekening bank dengan pembayaran PENDING.
+
+Alur:
+1. read_statement: baca export mutasi (CSV / XLSX), deteksi baris header
+   (tanggal, keterangan, jumlah / kredit / debet) lalu ambil transaksi masuk saja.
+2. PendingIndex: SATU pass pembayaran PENDING (iter_rows) → index hash per
+   nominal (sen), per NISN / NIK dan per token nama. Tidak ada query per baris mutasi.
+3. reconcile: setiap transaksi dicari kandidatnya lewat index (NISN / NIK di
+   keterangan, token nama, atau nominal unik), diberi skor (nominal, identitas,
+   nama, jendela tanggal), lalu dipasangkan satu-satu (greedy skor tertinggi).
+
+Hasil berupa laporan usulan (tidak mengubah data); verify_items langsung bisa
+dikirim ke /api/pembayaran_verify_bulk setelah dicek admin.
+"""
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime
+
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+
+from lib.handlers._pagination import iter_rows
+
+PEMBAYARAN_COLUMNS = "id,nisn,nik,nama_lengkap,jumlah,metode_pembayaran,tanggal_upload,created_at"
+
+DEFAULT_DATE_WINDOW_DAYS = 3
+HEADER_SCAN_ROWS = 30
+
+# Skor per bukti kecocokan; confidence dari total skor
+SCORE_AMOUNT = 40
+SCORE_IDENTIFIER = 50
+SCORE_NAME = 30
+SCORE_DATE = 15
+CONFIDENCE_LEVELS = (("high", 80), ("medium", 60), ("low", 40))
+
+# Token nama yang terlalu umum tidak dipakai untuk mencari kandidat
+MAX_TOKEN_POSTINGS = 50
+
+# Kata umum di keterangan mutasi / gelar yang bukan bagian nama
+STOP_TOKENS = {
+    "TRANSFER", "TRF", "TRSF", "TRX", "DARI", "KE", "UNTUK", "BAYAR", "PEMBAYARAN",
+    "BIAYA", "PPDB", "PSB", "DAFTAR", "PENDAFTARAN", "SETORAN", "SETOR", "TUNAI",
+    "ATM", "MBANKING", "IBANK", "INTERNET", "BANKING", "MOBILE", "ONLINE", "KR",
+    "OTOMATIS", "BRI", "BCA", "BNI", "MANDIRI", "BSI", "BTN", "CIMB", "DANA",
+    "OVO", "GOPAY", "SHOPEEPAY", "FLIP", "QRIS", "BIFAST", "RTGS", "SKN", "LLG",
+    "SDR", "SDRI", "BPK", "BAPAK", "IBU", "NY", "TN", "AN", "ATAS", "NAMA", "NISN",
+    "NIK", "SANTRI", "SISWA", "CALON", "PONDOK", "PESANTREN", "CR", "DB", "DEBET",
+    "KREDIT", "IDR", "RP",
+}
+
+# Alias header (sudah dinormalisasi: huruf kecil, tanpa spasi / tanda baca)
+BALANCE_HEADERS = ("saldo", "balance")
+DATE_HEADERS = ("tanggal", "tgl", "date")
+CREDIT_HEADERS = ("kredit", "credit", "masuk")
+DEBIT_HEADERS = ("debet", "debit", "keluar")
+TYPE_HEADERS = ("dk", "dbcr", "crdb", "tipe", "type", "jenis")
+AMOUNT_HEADERS = ("jumlah", "nominal", "amount", "mutasi", "nilai")
+DESCRIPTION_HEADERS = ("keterangan", "deskripsi", "description", "uraian", "remark", "berita", "detail", "transaksi")
+
+DATE_FORMATS = ("%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d", "%d/%m/%y", "%d-%m-%y", "%d %b %Y", "%d %B %Y", "%Y/%m/%d")
+SHORT_DATE_FORMATS = ("%d/%m", "%d-%m")
+
+IDENTIFIER_PATTERN = re.compile(r"\d{10,16}")
+
+
+# ---------- Parsing mutasi ----------
+
+def _header_key(value):
+    return re.sub(r"[^a-z0-9]", "", str(value or "").lower())
+
+
+def _role_of(key):
+    """Peran kolom dari header yang sudah dinormalisasi (None = tidak dipakai)."""
+    if not key:
+        return None
+    if any(alias in key for alias in BALANCE_HEADERS):
+        return None
+    if any(alias in key for alias in DATE_HEADERS):
+        return "date"
+    if key in ("cr", "k") or any(alias in key for alias in CREDIT_HEADERS):
+        return "credit"
+    if key in ("db", "d") or any(alias in key for alias in DEBIT_HEADERS):
+        return "debit"
+    if key in TYPE_HEADERS:
+        return "type"
+    if any(alias in key for alias in AMOUNT_HEADERS):
+        return "amount"
+    if any(alias in key for alias in DESCRIPTION_HEADERS):
+        return "description"
+    return None
+
+
+def detect_columns(row):
+    """Map peran → index kolom untuk satu baris kandidat header, None jika bukan header."""
+    columns = {}
+    for index, value in enumerate(row):
+        role = _role_of(_header_key(value))
+        if role and role not in columns:
+            columns[role] = index
+    if "date" in columns and "description" in columns and ("credit" in columns or "amount" in columns):
+        return columns
+    return None
+
+
+def parse_amount(value):
+    """
+    Nominal dari sel mutasi → (float | None, arah "CR" | "DB" | None).
+    Mendukung 1.500.000,00 / 1,500,000.00 / 500000 / "500,000.00 CR" / (1.000) / -1.000.
+    """
+    if value is None or value == "":
+        return None, None
+    if isinstance(value, (int, float)):
+        return float(value), None
+
+    text = str(value).strip().upper().replace("'", "")
+    direction = None
+    match = re.search(r"\b(CR|DB|K|D)\.?$", text)
+    if match:
+        direction = "CR" if match.group(1) in ("CR", "K") else "DB"
+        text = text[:match.start()]
+    negative = text.startswith("-") or (text.startswith("(") and text.endswith(")"))
+    text = re.sub(r"[^0-9.,]", "", text)
+    if not text or not re.search(r"\d", text):
+        return None, direction
+
+    if "." in text and "," in text:
+        decimal = "." if text.rfind(".") > text.rfind(",") else ","
+    elif "," in text or "." in text:
+        separator = "," if "," in text else "."
+        head, _, tail = text.rpartition(separator)
+        # Satu pemisah diikuti tepat 3 digit → ribuan, selain itu desimal
+        decimal = None if text.count(separator) > 1 or len(tail) == 3 else separator
+    else:
+        decimal = None
+
+    thousands = {".", ","} - {decimal} if decimal else {".", ","}
+    for separator in thousands:
+        text = text.replace(separator, "")
+    if decimal:
+        text = text.replace(decimal, ".")
+    try:
+        amount = float(text)
+    except ValueError:
+        return None, direction
+    if negative:
+        amount = -amount
+        direction = direction or "DB"
+    return amount, direction
+
+
+def parse_date(value, default_year=None):
+    """Tanggal dari sel mutasi (date / datetime / teks). None jika tidak dikenali."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value or "").strip().strip("'\"")
+    if not text:
+        return None
+    # Buang bagian jam jika ada ("01/10/2025 08:15:00")
+    candidates = [text, text.split(" ")[0]]
+    for candidate in candidates:
+        for fmt in DATE_FORMATS:
+            try:
+                return datetime.strptime(candidate, fmt).date()
+            except ValueError:
+                continue
+    # Format BCA tanpa tahun ("01/10"), atau "PEND" untuk transaksi pending
+    for fmt in SHORT_DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(candidates[1], fmt)
+        except ValueError:
+            continue
+        if default_year:
+            return date(default_year, parsed.month, parsed.day)
+        # Tanpa tahun: anggap tahun ini, kecuali jadi tanggal di masa depan (mutasi Desember dibaca Januari)
+        today = date.today()
+        result = date(today.year, parsed.month, parsed.day)
+        return result if result <= today else date(today.year - 1, parsed.month, parsed.day)
+    return None
+
+
+def _rows_from_csv(data):
+    for encoding in ("utf-8-sig", "cp1252", "latin-1"):
+        try:
+            text = data.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=",;\t|")
+    except csv.Error:
+        dialect = csv.excel
+    return list(csv.reader(io.StringIO(text), dialect))
+
+
+def _rows_from_xlsx(data):
+    wb = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        return [list(row) for row in ws.iter_rows(values_only=True)]
+    finally:
+        wb.close()
+
+
+def read_statement(data, file_name, default_year=None):
+    """
+    Baca file mutasi → (transaksi_masuk, info).
+    transaksi: { line, tanggal (date), jumlah (float), keterangan }
+    info: { rows, header_line, columns, skipped_debit, skipped_invalid }
+    Raise ValueError jika format / header tidak dikenali.
+    """
+    name = (file_name or "").lower()
+    if name.endswith((".xlsx", ".xlsm")):
+        try:
+            rows = _rows_from_xlsx(data)
+        except (zipfile.BadZipFile, InvalidFileException, KeyError, IndexError, OSError):
+            # File rusak / bukan workbook: kesalahan input, bukan error server
+            raise ValueError("File XLSX tidak valid")
+    elif name.endswith((".csv", ".txt")):
+        rows = _rows_from_csv(data)
+    else:
+        raise ValueError("Format file mutasi harus .csv atau .xlsx")
+
+    header_index, columns = None, None
+    for index, row in enumerate(rows[:HEADER_SCAN_ROWS]):
+        columns = detect_columns(row)
+        if columns:
+            header_index = index
+            break
+    if columns is None:
+        raise ValueError(
+            "Header mutasi tidak dikenali: butuh kolom tanggal, keterangan dan jumlah / kredit"
+        )
+
+    def cell(row, role):
+        index = columns.get(role)
+        return row[index] if index is not None and index < len(row) else None
+
+    transactions = []
+    skipped_debit = 0
+    skipped_invalid = 0
+    for offset, row in enumerate(rows[header_index + 1:], start=header_index + 2):
+        if not any(value not in (None, "") for value in row):
+            continue
+        tanggal = parse_date(cell(row, "date"), default_year)
+
+        if "credit" in columns:
+            amount, _ = parse_amount(cell(row, "credit"))
+            if not amount and "debit" in columns:
+                debit, _ = parse_amount(cell(row, "debit"))
+                amount = debit if debit else amount
+                direction = "DB"
+            else:
+                direction = "CR" if amount and amount > 0 else "DB"
+        else:
+            amount, direction = parse_amount(cell(row, "amount"))
+            type_value = str(cell(row, "type") or "").strip().upper()
+            if type_value:
+                direction = "DB" if type_value.startswith("D") else "CR"
+
+        if tanggal is None or amount is None:
+            # Baris saldo awal / akhir, footer, dsb.
+            skipped_invalid += 1
+            continue
+        if direction == "DB" or amount <= 0:
+            skipped_debit += 1
+            continue
+
+        transactions.append({
+            "line": offset,
+            "tanggal": tanggal,
+            "jumlah": round(abs(amount), 2),
+            "keterangan": " ".join(str(cell(row, "description") or "").split()),
+        })
+
+    return transactions, {
+        "rows": len(rows),
+        "header_line": header_index + 1,
+        "columns": columns,
+        "skipped_debit": skipped_debit,
+        "skipped_invalid": skipped_invalid,
+    }
+
+
+# ---------- Index pembayaran PENDING ----------
+
+def name_tokens(text):
+    """Token nama ternormalisasi (huruf besar, tanpa tanda baca / gelar / kata umum)."""
+    tokens = re.sub(r"[^A-Z ]", " ", str(text or "").upper()).split()
+    return [token for token in tokens if len(token) >= 3 and token not in STOP_TOKENS]
+
+
+def _cents(amount):
+    return int(round(float(amount or 0) * 100))
+
+
+def _payment_date(row):
+    value = row.get("tanggal_upload") or row.get("created_at")
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).date()
+    except ValueError:
+        return parse_date(str(value)[:10])
+
+
+class PendingIndex:
+    """Index hash pembayaran PENDING dari satu pass (nominal, identitas, token nama)."""
+
+    def __init__(self, rows):
+        self.rows = {}
+        self.by_amount = {}
+        self.by_identifier = {}
+        self.by_token = {}
+        self.tokens = {}
+        self.dates = {}
+        for row in rows:
+            row_id = row.get("id")
+            self.rows[row_id] = row
+            self.by_amount.setdefault(_cents(row.get("jumlah")), []).append(row_id)
+            for field in ("nisn", "nik"):
+                value = str(row.get(field) or "").strip()
+                if value:
+                    self.by_identifier.setdefault(value, []).append(row_id)
+            tokens = set(name_tokens(row.get("nama_lengkap")))
+            self.tokens[row_id] = tokens
+            for token in tokens:
+                self.by_token.setdefault(token, []).append(row_id)
+            self.dates[row_id] = _payment_date(row)
+
+    @classmethod
+    def fetch(cls, supa, chunk_size=1000):
+        rows = iter_rows(
+            supa,
+            "pembayaran",
+            PEMBAYARAN_COLUMNS,
+            chunk_size=chunk_size,
+            apply_filters=lambda query: query.eq("status_pembayaran", "PENDING"),
+        )
+        return cls(rows)
+
+
+# ---------- Matching ----------
+
+def _score(index, row_id, transaction, identifiers, tokens, window_days):
+    row = index.rows[row_id]
+    score = 0
+    reasons = []
+
+    if _cents(row.get("jumlah")) == _cents(transaction["jumlah"]):
+        score += SCORE_AMOUNT
+        reasons.append("nominal sama")
+
+    matched_ids = [
+        str(row.get(field)).strip()
+        for field in ("nisn", "nik")
+        if row.get(field) and str(row.get(field)).strip() in identifiers
+    ]
+    if matched_ids:
+        score += SCORE_IDENTIFIER
+        reasons.append(f"NISN/NIK {matched_ids[0]} di keterangan")
+
+    name = index.tokens.get(row_id) or set()
+    if name:
+        ratio = len(name & tokens) / len(name)
+        if ratio:
+            score += int(round(SCORE_NAME * ratio))
+            reasons.append(f"nama cocok {int(round(ratio * 100))}%")
+
+    paid_on = index.dates.get(row_id)
+    in_window = paid_on is not None and abs((transaction["tanggal"] - paid_on).days) <= window_days
+    if in_window:
+        score += SCORE_DATE
+        reasons.append(f"tanggal dalam ±{window_days} hari upload")
+
+    return score, reasons, in_window
+
+
+def _confidence(score):
+    for level, minimum in CONFIDENCE_LEVELS:
+        if score >= minimum:
+            return level
+    return None
+
+
+def candidates_for(index, transaction):
+    """
+    Kandidat pembayaran untuk satu transaksi, hanya dari lookup index:
+    NISN / NIK di keterangan, token nama (yang tidak terlalu umum), atau nominal
+    yang hanya dimiliki satu pembayaran PENDING.
+    """
+    text = transaction["keterangan"].upper()
+    identifiers = set(IDENTIFIER_PATTERN.findall(re.sub(r"[^0-9A-Z]", " ", text)))
+    tokens = set(name_tokens(text))
+
+    candidate_ids = set()
+    for identifier in identifiers:
+        candidate_ids.update(index.by_identifier.get(identifier, ()))
+    for token in tokens:
+        postings = index.by_token.get(token, ())
+        if len(postings) <= MAX_TOKEN_POSTINGS:
+            candidate_ids.update(postings)
+    same_amount = index.by_amount.get(_cents(transaction["jumlah"]), ())
+    if len(same_amount) == 1:
+        candidate_ids.update(same_amount)
+    return candidate_ids, identifiers, tokens
+
+
+def reconcile(transactions, index, window_days=DEFAULT_DATE_WINDOW_DAYS):
+    """
+    Pasangkan transaksi ↔ pembayaran PENDING. Return laporan:
+    { summary, matches, unmatched_transactions, unmatched_pembayaran, verify_items }.
+    """
+    scored = []
+    best_by_tx = {}
+    for tx_index, transaction in enumerate(transactions):
+        candidate_ids, identifiers, tokens = candidates_for(index, transaction)
+        for row_id in candidate_ids:
+            score, reasons, in_window = _score(index, row_id, transaction, identifiers, tokens, window_days)
+            if _confidence(score) is None:
+                continue
+            scored.append((score, tx_index, row_id, reasons, in_window))
+            best_by_tx.setdefault(tx_index, []).append(score)
+
+    # Greedy: pasangan skor tertinggi dulu, satu transaksi ↔ satu pembayaran
+    scored.sort(key=lambda item: (-item[0], item[1], str(item[2])))
+    used_tx, used_rows = set(), set()
+    matches = []
+    for score, tx_index, row_id, reasons, in_window in scored:
+        if tx_index in used_tx or row_id in used_rows:
+            continue
+        used_tx.add(tx_index)
+        used_rows.add(row_id)
+
+        transaction = transactions[tx_index]
+        row = index.rows[row_id]
+        ambiguous = sorted(best_by_tx[tx_index], reverse=True)[1:2] == [score]
+        confidence = _confidence(score)
+        if ambiguous:
+            # Dua kandidat sama kuat → jangan diusulkan otomatis
+            confidence = "low"
+        if _cents(row.get("jumlah")) != _cents(transaction["jumlah"]) and confidence == "high":
+            confidence = "medium"
+
+        matches.append({
+            "line": transaction["line"],
+            "tanggal": transaction["tanggal"].isoformat(),
+            "jumlah": transaction["jumlah"],
+            "keterangan": transaction["keterangan"],
+            "pembayaran": {
+                "id": row.get("id"),
+                "nisn": row.get("nisn"),
+                "nik": row.get("nik"),
+                "nama_lengkap": row.get("nama_lengkap"),
+                "jumlah": float(row.get("jumlah") or 0),
+                "tanggal_upload": row.get("tanggal_upload") or row.get("created_at"),
+            },
+            "identifier": row.get("nisn") or row.get("nik"),
+            "score": score,
+            "confidence": confidence,
+            "reasons": reasons,
+            "in_date_window": in_window,
+            "ambiguous": ambiguous,
+        })
+
+    matches.sort(key=lambda match: match["line"])
+    unmatched_transactions = [
+        {
+            "line": transaction["line"],
+            "tanggal": transaction["tanggal"].isoformat(),
+            "jumlah": transaction["jumlah"],
+            "keterangan": transaction["keterangan"],
+        }
+        for tx_index, transaction in enumerate(transactions)
+        if tx_index not in used_tx
+    ]
+    unmatched_pembayaran = [
+        {
+            "id": row.get("id"),
+            "nisn": row.get("nisn"),
+            "nik": row.get("nik"),
+            "nama_lengkap": row.get("nama_lengkap"),
+            "jumlah": float(row.get("jumlah") or 0),
+            "tanggal_upload": row.get("tanggal_upload") or row.get("created_at"),
+        }
+        for row_id, row in index.rows.items()
+        if row_id not in used_rows
+    ]
+
+    by_confidence = {level: 0 for level, _ in CONFIDENCE_LEVELS}
+    for match in matches:
+        by_confidence[match["confidence"]] += 1
+
+    return {
+        "summary": {
+            "transactions": len(transactions),
+            "pending_pembayaran": len(index.rows),
+            "matched": len(matches),
+            "by_confidence": by_confidence,
+            "unmatched_transactions": len(unmatched_transactions),
+            "unmatched_pembayaran": len(unmatched_pembayaran),
+        },
+        "matches": matches,
+        "unmatched_transactions": unmatched_transactions,
+        "unmatched_pembayaran": unmatched_pembayaran,
+    }
+
+
+def verify_items(matches, min_confidence="high"):
+    """Item untuk /api/pembayaran_verify_bulk dari match dengan confidence >= min_confidence."""
+    levels = [level for level, _ in CONFIDENCE_LEVELS]
+    allowed = set(levels[: levels.index(min_confidence) + 1])
+    return [
+        {
+            "identifier": match["identifier"],
+            "status": "VERIFIED",
+            "catatan": f"Rekonsiliasi mutasi {match['tanggal']} baris {match['line']} (Rp {match['jumlah']:,.0f})",
+        }
+        for match in matches
+        if match["identifier"] and match["confidence"] in allowed
+    ]
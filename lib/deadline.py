@@ -0,0 +1,36 @@
+"""
+Time budget per invocation (Vercel maxDuration = 60 detik di vercel.json).
+Dipakai pekerjaan panjang untuk berhenti rapi sebelum function di-kill.
+"""
+import os
+import time
+
+# Sama dengan "maxDuration" di vercel.json
+MAX_DURATION_SEC = 60
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class Deadline:
+    """Hitung mundur dari saat dibuat; budget default diambil dari ENV."""
+
+    def __init__(self, budget_sec=None, env_name="EXPORT_TIME_BUDGET_SEC", default_budget=40):
+        if budget_sec is None:
+            budget_sec = _env_float(env_name, default_budget)
+        self.budget_sec = max(1.0, min(float(budget_sec), MAX_DURATION_SEC))
+        self.started = time.monotonic()
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def remaining(self):
+        return self.budget_sec - self.elapsed()
+
+    def expired(self, reserve_sec=0.0):
+        """True jika sisa waktu <= reserve_sec (sisakan waktu untuk upload/simpan state)."""
+        return self.remaining() <= reserve_sec
@@ -0,0 +1,64 @@
+"""
+Cache hasil export (XLSX / CSV / NDJSON / ZIP) di Storage, dikunci dengan data version.
+
+data version = jumlah pendaftar + max(updatedat) untuk filter yang sama
+(satu query; butuh trigger sql/create_trigger_pendaftar_updatedat.sql agar
+setiap perubahan baris mengisi updatedat). Key cache = hash dari jenis export,
+opsi (format, only, ...), filter dan data version:
+
+    temp-downloads/export-cache/<prefix>_<key>.<ext>
+
+Klik export berulang tanpa perubahan data → langsung dapat signed URL file
+yang sama. force=1 di endpoint untuk membangun ulang. File cache ikut
+dibersihkan setelah 24 jam oleh cleanup_old_exports.
+"""
+import hashlib
+import json
+
+BUCKET = "temp-downloads"
+FOLDER = "export-cache"
+
+
+def data_version(supa, apply_filters=None, table="pendaftar", column="updatedat"):
+    """
+    Return { count, max_updatedat } tabel untuk filter (satu round trip).
+    Default pendaftar; export yang ikut memuat pembayaran memakai
+    table="pembayaran", column="updated_at".
+    """
+    query = supa.table(table).select(column, count="exact")
+    if apply_filters is not None:
+        query = apply_filters(query)
+    result = query.order(column, desc=True).limit(1).execute()
+    rows = result.data or []
+    return {
+        "count": result.count if result.count is not None else len(rows),
+        "max_updatedat": rows[0].get(column) if rows else None,
+    }
+
+
+def cache_path(prefix, ext, kind, options, filters, version):
+    """Path object cache untuk kombinasi export + data version."""
+    payload = json.dumps(
+        {"kind": kind, "options": options, "filters": filters, "version": version},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    key = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:24]
+    return f"{FOLDER}/{prefix}_{key}.{ext}"
+
+
+def cached_url(supa, path, create_download_url, expires_in=3600):
+    """Signed URL file cache jika sudah ada, None jika belum (cache miss)."""
+    try:
+        existing = supa.storage.from_(BUCKET).list(
+            path=FOLDER, options={"search": path.rsplit("/", 1)[-1], "limit": 1}
+        )
+    except Exception as e:
+        print(f"[EXPORT_CACHE] Warning: gagal cek cache {path}: {e}")
+        return None
+
+    name = path.rsplit("/", 1)[-1]
+    if not any(isinstance(item, dict) and item.get("name") == name for item in existing or []):
+        return None
+    return create_download_url(supa, BUCKET, path, expires_in)
@@ -0,0 +1,116 @@
+"""
+Filter pendaftar untuk export (ZIP berkas, XLSX, export job).
+
+- status   : nilai statusberkas (PENDING / REVISI / DITERIMA / DITOLAK), tidak
+             case-sensitive; alias lama pending / verified / rejected tetap diterima
+- date_from / date_to : rentang createdat; tanggal polos (YYYY-MM-DD) untuk
+             date_to berarti sampai akhir hari itu
+- gelombang: id gelombang → rentang start_date..end_date gelombang tersebut,
+             diiris dengan date_from / date_to jika keduanya diisi
+"""
+from datetime import date, timedelta
+
+STATUS_ALIASES = {
+    "pending": "PENDING",
+    "revisi": "REVISI",
+    "diterima": "DITERIMA",
+    "ditolak": "DITOLAK",
+    "verified": "DITERIMA",
+    "rejected": "DITOLAK",
+}
+
+
+def normalize_status(status_filter):
+    """Nilai statusberkas untuk filter, atau None jika kosong / tidak dikenal (= semua)."""
+    return STATUS_ALIASES.get(str(status_filter or "").strip().lower())
+
+
+def is_plain_date(value):
+    try:
+        date.fromisoformat(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def apply_date_range(query, column, date_from, date_to):
+    """Filter rentang tanggal pada kolom timestamp (date_to polos = inklusif satu hari penuh)."""
+    if date_from:
+        query = query.gte(column, date_from)
+
+    if date_to:
+        if is_plain_date(date_to):
+            # Inklusif sampai akhir hari date_to
+            next_day = date.fromisoformat(date_to) + timedelta(days=1)
+            query = query.lt(column, next_day.isoformat())
+        else:
+            query = query.lte(column, date_to)
+
+    return query
+
+
+def apply_pendaftar_filters(query, status_filter, date_from, date_to):
+    """Filter pendaftar untuk export (statusberkas, rentang createdat)."""
+    status = normalize_status(status_filter)
+    if status:
+        query = query.eq("statusberkas", status)
+    return apply_date_range(query, "createdat", date_from, date_to)
+
+
+def resolve_gelombang_dates(supa, gelombang_id, date_from, date_to):
+    """
+    Persempit (date_from, date_to) ke periode gelombang.
+    Raise ValueError jika gelombang tidak ditemukan.
+    """
+    if not gelombang_id:
+        return date_from, date_to
+
+    result = (
+        supa.table("gelombang")
+        .select("id,nama,start_date,end_date")
+        .eq("id", gelombang_id)
+        .limit(1)
+        .execute()
+    )
+    if not result.data:
+        raise ValueError(f"Gelombang tidak ditemukan: {gelombang_id}")
+
+    gelombang = result.data[0]
+    start = str(gelombang.get("start_date") or "")[:10]
+    end = str(gelombang.get("end_date") or "")[:10]
+
+    # Irisan rentang: yang paling akhir untuk from, paling awal untuk to
+    if start and (not date_from or start > str(date_from)[:10]):
+        date_from = start
+    if end and (not date_to or end < str(date_to)[:10]):
+        date_to = end
+    return date_from, date_to
+
+
+def filters_from_params(supa, params):
+    """
+    Baca filter export dari dict (query string sudah di-flatten / body JSON).
+    Return dict { status, date_from, date_to, gelombang } dengan gelombang sudah
+    diterjemahkan ke rentang tanggal.
+    """
+    status = (params.get("status") or "").strip()
+    date_from = (params.get("date_from") or "").strip()
+    date_to = (params.get("date_to") or "").strip()
+    gelombang = str(params.get("gelombang") or params.get("gelombang_id") or "").strip()
+    date_from, date_to = resolve_gelombang_dates(supa, gelombang, date_from, date_to)
+    return {
+        "status": status,
+        "date_from": date_from,
+        "date_to": date_to,
+        "gelombang": gelombang,
+    }
+
+
+def filter_fn(filters):
+    """Fungsi query -> query untuk iter_rows(apply_filters=...)."""
+    return lambda query: apply_pendaftar_filters(
+        query,
+        filters.get("status") or "",
+        filters.get("date_from") or "",
+        filters.get("date_to") or "",
+    )
@@ -0,0 +1,476 @@
+"""
+Job export background untuk ZIP berkas dan XLSX pendaftar.
+
+Export besar tidak muat dalam satu invocation (maxDuration 60 detik), jadi
+pekerjaan dipecah per range id pendaftar (keyset id ASC) dan dijalankan
+bertahap. State disimpan di tabel export_jobs (sql/create_table_export_jobs.sql):
+
+    POST  /api/export_jobs            buat job → { id }
+    PUT   /api/export_jobs {id}       jalankan satu langkah (sampai budget habis)
+    GET   /api/export_jobs?id=...     progress + signed URL jika sudah selesai
+
+Setiap langkah:
+- claim job dengan optimistic lock (kolom version) + locked_until, sehingga dua
+  invocation tidak memproses range yang sama
+- ambil pendaftar per chunk sesudah state.last_id sampai Deadline hampir habis
+- ZIP : chunk ditulis ke satu part ZIP per langkah (temp-downloads/jobs/<id>/)
+- XLSX: baris hasil transform ditulis ke part NDJSON yang sudah terurut
+        (lebar kolom diakumulasi di state); setelah semua range selesai, part
+        di-merge streaming (heapq.merge) ke workbook write-only (finalizing),
+        jadi memori tetap ~satu baris per part
+- state (last_id, processed, parts) baru disimpan SETELAH part ter-upload,
+  jadi langkah yang mati di tengah jalan cukup diulang dari last_id terakhir
+
+File job (temp-downloads/jobs/<id>/) dan baris export_jobs dihapus setelah
+JOB_MAX_AGE_HOURS oleh cleanup_expired_jobs.
+"""
+import heapq
+import json
+import tempfile
+import zipfile
+from datetime import datetime, timedelta, timezone
+
+from lib import zip_cache
+from lib.deadline import Deadline, MAX_DURATION_SEC
+from lib.export_filters import filter_fn, filters_from_params
+from lib.file_index import INDEX_COLUMNS
+from lib.storage_upload import upload_fileobj
+from lib.handlers.pendaftar_download_zip import (
+    DEFAULT_CONCURRENCY,
+    SPOOL_MAX_MEMORY,
+    TEMP_DIR,
+    add_to_zip,
+    compression_summary,
+    create_download_url,
+    new_zip_result,
+    target_extensions_for,
+)
+from lib.handlers.export_pendaftar_xlsx import (
+    EXPORT_COLUMNS,
+    XLSX_CONTENT_TYPE,
+    new_widths,
+    row_values,
+    sort_key,
+    sort_rows,
+    transform_row,
+    update_widths,
+    write_workbook,
+)
+
+TABLE = "export_jobs"
+BUCKET = "temp-downloads"
+FOLDER = "jobs"
+KINDS = ("zip", "xlsx")
+
+# Jumlah pendaftar per chunk (ZIP: tiap pendaftar = beberapa download storage)
+ZIP_CHUNK_SIZE = 25
+XLSX_CHUNK_SIZE = 1000
+
+# Sisa waktu yang disisakan untuk upload part + simpan state
+ZIP_RESERVE_SEC = 15
+XLSX_RESERVE_SEC = 8
+
+# Lock lebih lama dari maxDuration: invocation yang mati akan melepas lock sendiri
+LOCK_SEC = MAX_DURATION_SEC + 10
+MAX_ATTEMPTS = 3
+MAX_FAILED_DETAILS = 20
+URL_EXPIRES_IN = 3600
+
+# Job (file + baris) yang tidak di-update selama ini dihapus
+JOB_MAX_AGE_HOURS = 24
+CLEANUP_BATCH = 50
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _parse_ts(value):
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _fetch_chunk(supa, columns, params, after_id, limit):
+    """Satu range pendaftar: id > after_id, urut id ASC."""
+    query = filter_fn(params)(supa.table("pendaftar").select(columns))
+    if after_id is not None:
+        query = query.gt("id", after_id)
+    result = query.order("id", desc=False).limit(limit).execute()
+    return result.data or []
+
+
+def create_job(supa, kind, params):
+    """Simpan job baru (status pending) beserta total pendaftar sesuai filter."""
+    if kind not in KINDS:
+        raise ValueError(f"kind tidak dikenal: {kind} (pilihan: {', '.join(KINDS)})")
+
+    # Gelombang diterjemahkan ke rentang tanggal sekali saat job dibuat
+    filters = filters_from_params(supa, params)
+    filters.update({
+        "only": (params.get("only") or "all").strip(),
+        "source": "storage" if (params.get("source") or "").strip() == "storage" else "db",
+    })
+    params = filters
+    cleanup_expired_jobs(supa)
+    if kind == "zip":
+        zip_cache.cleanup_expired(supa)
+    count_query = filter_fn(params)(supa.table("pendaftar").select("id", count="exact"))
+    total = count_query.limit(1).execute().count or 0
+
+    result = supa.table(TABLE).insert({
+        "kind": kind,
+        "status": "pending",
+        "params": params,
+        "state": {"last_id": None, "parts": [], "attempts": 0},
+        "total": total,
+        "processed": 0,
+    }).execute()
+    if not result.data:
+        raise RuntimeError("Gagal menyimpan export job")
+    job = result.data[0]
+    print(f"[EXPORT_JOBS] ✓ Job {job['id']} dibuat: kind={kind}, total={total}, params={params}")
+    return job
+
+
+def get_job(supa, job_id):
+    result = supa.table(TABLE).select("*").eq("id", job_id).limit(1).execute()
+    return result.data[0] if result.data else None
+
+
+def cleanup_expired_jobs(supa, max_age_hours=JOB_MAX_AGE_HOURS):
+    """
+    Hapus job yang tidak di-update lebih dari max_age_hours: semua file di
+    temp-downloads/jobs/<id>/ lalu barisnya. Non-critical, error hanya di-log.
+    """
+    try:
+        cutoff = (_now() - timedelta(hours=max_age_hours)).isoformat()
+        result = (
+            supa.table(TABLE)
+            .select("id")
+            .lt("updated_at", cutoff)
+            .order("updated_at", desc=False)
+            .limit(CLEANUP_BATCH)
+            .execute()
+        )
+        bucket = supa.storage.from_(BUCKET)
+        removed = []
+        for row in result.data or []:
+            folder = f"{FOLDER}/{row['id']}"
+            try:
+                files = bucket.list(folder, {"limit": 1000}) or []
+                paths = [f"{folder}/{item['name']}" for item in files if item.get("name")]
+                if paths:
+                    bucket.remove(paths)
+            except Exception as e:
+                print(f"[EXPORT_JOBS] Warning: gagal hapus file job {row['id']}: {e}")
+                continue
+            removed.append(row["id"])
+        if removed:
+            supa.table(TABLE).delete().in_("id", removed).execute()
+            print(f"[EXPORT_JOBS] ✓ {len(removed)} job kadaluarsa dihapus")
+    except Exception as e:
+        print(f"[EXPORT_JOBS] ⚠️ Cleanup job error (non-critical): {e}")
+
+
+def _claim(supa, job):
+    """Ambil lock job. Return job versi baru, atau None jika sedang dipegang invocation lain."""
+    now = _now()
+    locked_until = _parse_ts(job.get("locked_until")) if job.get("locked_until") else None
+    if locked_until and locked_until > now:
+        return None
+
+    result = (
+        supa.table(TABLE)
+        .update({
+            "version": job["version"] + 1,
+            "status": "running" if job["status"] == "pending" else job["status"],
+            "locked_until": (now + timedelta(seconds=LOCK_SEC)).isoformat(),
+            "updated_at": now.isoformat(),
+        })
+        .eq("id", job["id"])
+        .eq("version", job["version"])
+        .execute()
+    )
+    return result.data[0] if result.data else None
+
+
+def _save(supa, job, changes):
+    """Simpan state langkah + lepas lock (hanya jika version masih milik kita)."""
+    changes = dict(changes)
+    changes.update({
+        "version": job["version"] + 1,
+        "locked_until": None,
+        "updated_at": _now().isoformat(),
+    })
+    result = (
+        supa.table(TABLE)
+        .update(changes)
+        .eq("id", job["id"])
+        .eq("version", job["version"])
+        .execute()
+    )
+    if not result.data:
+        raise RuntimeError("Export job diubah invocation lain (version conflict)")
+    return result.data[0]
+
+
+def _part_path(job, index, ext):
+    return f"{FOLDER}/{job['id']}/part-{index:04d}.{ext}"
+
+
+def _zip_step(supa, job, deadline):
+    state = dict(job.get("state") or {})
+    params = job.get("params") or {}
+    parts = list(state.get("parts") or [])
+    last_id = state.get("last_id")
+    processed = job.get("processed") or 0
+    target_extensions = target_extensions_for(params.get("only"))
+
+    result = new_zip_result()
+    first_id = None
+    exhausted = False
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY, dir=TEMP_DIR)
+    try:
+        with zipfile.ZipFile(spool, "w", zipfile.ZIP_DEFLATED) as zip_file:
+            while True:
+                chunk = _fetch_chunk(supa, INDEX_COLUMNS, params, last_id, ZIP_CHUNK_SIZE)
+                if chunk:
+                    add_to_zip(
+                        supa, zip_file, chunk, target_extensions, DEFAULT_CONCURRENCY, result,
+                        use_cache=True, source=params.get("source") or "db",
+                    )
+                    first_id = first_id if first_id is not None else chunk[0]["id"]
+                    last_id = chunk[-1]["id"]
+                    processed += len(chunk)
+                if len(chunk) < ZIP_CHUNK_SIZE:
+                    exhausted = True
+                    break
+                if deadline.expired(ZIP_RESERVE_SEC):
+                    break
+
+        if result["success_count"] > 0:
+            spool.seek(0, 2)
+            size = spool.tell()
+            spool.seek(0)
+            path = _part_path(job, len(parts) + 1, "zip")
+            upload_fileobj(supa, BUCKET, path, spool, content_type="application/zip", cache_control="3600", upsert=True)
+            parts.append({
+                "path": path,
+                "size_bytes": size,
+                "files": result["success_count"],
+                "first_id": first_id,
+                "last_id": last_id,
+                "compression": compression_summary(result["compression_stats"]),
+                "cache": result["cache_stats"],
+            })
+            print(f"[EXPORT_JOBS] ✓ Part {path} ({size} bytes, {result['success_count']} files)")
+    finally:
+        spool.close()
+
+    failed = list(state.get("failed_files") or []) + result["failed_files"] + result["skipped_pendaftar"]
+    state.update({
+        "last_id": last_id,
+        "parts": parts,
+        "files": (state.get("files") or 0) + result["success_count"],
+        "failed_count": (state.get("failed_count") or 0) + len(result["failed_files"]) + len(result["skipped_pendaftar"]),
+        "failed_files": failed[:MAX_FAILED_DETAILS],
+        "attempts": 0,
+    })
+    changes = {"state": state, "processed": processed, "error": None}
+    if exhausted:
+        changes["status"] = "done"
+        changes["result"] = {"parts": len(parts), "files": state["files"], "failed_count": state["failed_count"]}
+    return changes
+
+
+def _download_part(supa, path):
+    """Unduh satu part NDJSON ke file temp (bukan ke list di memori)."""
+    data = supa.storage.from_(BUCKET).download(path)
+    part_file = tempfile.TemporaryFile(mode="w+b", dir=TEMP_DIR)
+    part_file.write(data)
+    part_file.seek(0)
+    return part_file
+
+
+def _iter_part(part_file):
+    for line in part_file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _finalize_xlsx(supa, job, state):
+    """
+    Merge semua part NDJSON (masing-masing sudah terurut) → satu workbook.
+    heapq.merge stabil, jadi urutan sama dengan sort_rows pada export langsung;
+    lebar kolom sudah diakumulasi per langkah di state["widths"].
+    """
+    parts = state.get("parts") or []
+    widths = state.get("widths") or new_widths()
+    part_files = []
+    counter = {"rows": 0}
+
+    def value_rows():
+        for row in heapq.merge(*(_iter_part(f) for f in part_files), key=sort_key):
+            counter["rows"] += 1
+            yield row_values(row)
+
+    path = f"{FOLDER}/{job['id']}/pendaftar_{_now().strftime('%Y%m%d')}.xlsx"
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY, dir=TEMP_DIR)
+    try:
+        for part in parts:
+            part_files.append(_download_part(supa, part["path"]))
+        write_workbook(value_rows(), widths, spool)
+        spool.seek(0)
+        size = upload_fileobj(supa, BUCKET, path, spool, content_type=XLSX_CONTENT_TYPE, cache_control="3600", upsert=True)
+    finally:
+        spool.close()
+        for part_file in part_files:
+            part_file.close()
+
+    # Part NDJSON tidak diperlukan lagi (best effort)
+    try:
+        supa.storage.from_(BUCKET).remove([part["path"] for part in parts])
+    except Exception as e:
+        print(f"[EXPORT_JOBS] Warning: gagal hapus part NDJSON: {e}")
+
+    print(f"[EXPORT_JOBS] ✓ Workbook {path} ({counter['rows']} rows, {size} bytes)")
+    return {"path": path, "rows": counter["rows"], "size_bytes": size}
+
+
+def _xlsx_step(supa, job, deadline):
+    state = dict(job.get("state") or {})
+    params = job.get("params") or {}
+    parts = list(state.get("parts") or [])
+    last_id = state.get("last_id")
+    processed = job.get("processed") or 0
+    changes = {"error": None}
+
+    if job["status"] != "finalizing":
+        rows = []
+        widths = state.get("widths") or new_widths()
+        exhausted = False
+        while True:
+            chunk = _fetch_chunk(supa, f"id,{EXPORT_COLUMNS}", params, last_id, XLSX_CHUNK_SIZE)
+            for item in chunk:
+                row = transform_row(item)
+                update_widths(widths, row_values(row))
+                rows.append(row)
+            if chunk:
+                last_id = chunk[-1]["id"]
+                processed += len(chunk)
+            if len(chunk) < XLSX_CHUNK_SIZE:
+                exhausted = True
+                break
+            if deadline.expired(XLSX_RESERVE_SEC):
+                break
+
+        if rows:
+            # Part diurutkan dulu supaya finalisasi cukup merge streaming
+            sort_rows(rows)
+            lines = [json.dumps(row, ensure_ascii=False, default=str) for row in rows]
+            path = _part_path(job, len(parts) + 1, "ndjson")
+            supa.storage.from_(BUCKET).upload(
+                path=path,
+                file=("\n".join(lines) + "\n").encode("utf-8"),
+                file_options={"content-type": "application/x-ndjson", "x-upsert": "true"},
+            )
+            parts.append({"path": path, "rows": len(lines)})
+
+        state.update({"last_id": last_id, "parts": parts, "widths": widths, "attempts": 0})
+        changes.update({"state": state, "processed": processed})
+        if not exhausted:
+            return changes
+        changes["status"] = "finalizing"
+        if deadline.expired(XLSX_RESERVE_SEC):
+            # Gabung workbook di langkah berikutnya dengan budget penuh
+            return changes
+
+    changes["result"] = _finalize_xlsx(supa, job, state)
+    changes["state"] = state
+    changes["status"] = "done"
+    return changes
+
+
+def run_job_step(supa, job_id, deadline=None):
+    """
+    Jalankan satu langkah job. Return (job, ran):
+    ran=False jika job sudah selesai / sedang dipegang invocation lain.
+    Return (None, False) jika job tidak ditemukan.
+    """
+    job = get_job(supa, job_id)
+    if job is None:
+        return None, False
+    if job["status"] in ("done", "failed"):
+        return job, False
+
+    claimed = _claim(supa, job)
+    if claimed is None:
+        return job, False
+
+    deadline = deadline or Deadline()
+    try:
+        if claimed["kind"] == "zip":
+            changes = _zip_step(supa, claimed, deadline)
+        else:
+            changes = _xlsx_step(supa, claimed, deadline)
+    except Exception as e:
+        print(f"[EXPORT_JOBS] ❌ Langkah job {job_id} gagal: {e}")
+        state = dict(claimed.get("state") or {})
+        state["attempts"] = (state.get("attempts") or 0) + 1
+        changes = {"state": state, "error": str(e)}
+        if state["attempts"] >= MAX_ATTEMPTS:
+            changes["status"] = "failed"
+
+    saved = _save(supa, claimed, changes)
+    print(
+        f"[EXPORT_JOBS] Job {job_id}: status={saved['status']}, "
+        f"processed={saved['processed']}/{saved['total']} ({deadline.elapsed():.1f}s)"
+    )
+    return saved, True
+
+
+def job_status(supa, job):
+    """Payload status untuk client: progress + signed URL hasil jika sudah selesai."""
+    total = job.get("total") or 0
+    processed = job.get("processed") or 0
+    state = job.get("state") or {}
+    payload = {
+        "id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "params": job.get("params") or {},
+        "total": total,
+        "processed": processed,
+        "progress": round(min(processed, total) / total * 100, 1) if total else (100.0 if job["status"] == "done" else 0.0),
+        "parts": len(state.get("parts") or []),
+        "failed_count": state.get("failed_count", 0),
+        "failed_details": state.get("failed_files", [])[:10],
+        "error": job.get("error"),
+        "created_at": job.get("created_at"),
+        "updated_at": job.get("updated_at"),
+    }
+
+    if job["status"] == "done":
+        result = job.get("result") or {}
+        if job["kind"] == "xlsx" and result.get("path"):
+            payload["download_url"] = create_download_url(supa, BUCKET, result["path"], URL_EXPIRES_IN)
+            payload["rows"] = result.get("rows")
+        elif job["kind"] == "zip":
+            # Arsip besar dibagi per part (satu part per langkah), masing-masing ZIP utuh
+            payload["files"] = state.get("files", 0)
+            payload["downloads"] = [
+                {
+                    "download_url": create_download_url(supa, BUCKET, part["path"], URL_EXPIRES_IN),
+                    "filename": f"semua-berkas_part-{index:04d}.zip",
+                    "size_bytes": part.get("size_bytes"),
+                    "files": part.get("files"),
+                }
+                for index, part in enumerate(state.get("parts") or [], start=1)
+            ]
+        payload["expires_in"] = "1 hour"
+    return payload
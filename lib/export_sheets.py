@@ -0,0 +1,325 @@
+"""
+Sheet tambahan untuk export XLSX pendaftar (?sheets=...).
+
+- pembayaran : semua pembayaran yang ter-join ke pendaftar hasil filter
+               (nisn / nik pembayaran ↔ nisn / nikcalon pendaftar, prioritas
+               sama dengan cek status), plus program & status berkas pendaftar
+- program    : satu sheet per rencanaprogram (kolom sama dengan sheet utama)
+- summary    : pivot per rencanaprogram: jenis kelamin, status berkas,
+               status pembayaran terbaru dan total pembayaran VERIFIED
+
+Semua dihitung dalam satu pass: pembayaran diambil sekali (iter_rows) lalu
+di-index per nisn / nik, pendaftar di-stream sekali dan setiap baris langsung
+diakumulasi ke sheet utama, sheet program dan pivot. Modul ini hanya menyiapkan
+nilai sel; penulisan workbook tetap di handler export_pendaftar_xlsx.
+"""
+from collections import Counter
+
+from lib.export_filters import normalize_status
+from lib.handlers._pagination import iter_rows
+from lib.handlers.pendaftar_cek_status import PEMBAYARAN_ID_FIELDS, PENDAFTAR_ID_FIELDS
+
+SHEET_OPTIONS = ("pembayaran", "program", "summary")
+
+# Kolom pendaftar tambahan yang dibutuhkan untuk join & pivot
+PENDAFTAR_EXTRA_COLUMNS = "nikcalon,jeniskelamin,statusberkas"
+
+PEMBAYARAN_COLUMNS = (
+    "id,nisn,nik,nama_lengkap,jumlah,metode_pembayaran,status_pembayaran,"
+    "verified_by,catatan_admin,tanggal_upload,tanggal_verifikasi,created_at,updated_at"
+)
+
+PEMBAYARAN_HEADERS = [
+    'nisn',
+    'nik',
+    'nama_pembayar',
+    'nama_pendaftar',
+    'rencana_program',
+    'status_berkas',
+    'jumlah',
+    'metode_pembayaran',
+    'status_pembayaran',
+    'tanggal_upload',
+    'tanggal_verifikasi',
+    'verified_by',
+    'catatan_admin',
+]
+
+BERKAS_STATUSES = ("PENDING", "REVISI", "DITERIMA", "DITOLAK")
+PEMBAYARAN_STATUSES = ("PENDING", "VERIFIED", "REJECTED")
+
+SUMMARY_HEADERS = (
+    ['rencana_program', 'total_pendaftar', 'laki_laki', 'perempuan']
+    + [f'berkas_{status.lower()}' for status in BERKAS_STATUSES]
+    + ['berkas_lainnya']
+    + [f'bayar_{status.lower()}' for status in PEMBAYARAN_STATUSES]
+    + ['belum_bayar', 'total_bayar_verified']
+)
+
+# Karakter yang tidak boleh ada di judul sheet Excel (maks 31 karakter)
+INVALID_TITLE_CHARS = set('[]:*?/\\')
+MAX_TITLE_LENGTH = 31
+
+NO_PROGRAM = "(tanpa program)"
+
+
+def parse_sheets(value):
+    """
+    Baca ?sheets= (dipisah koma; "all" = semua). Return tuple opsi urut SHEET_OPTIONS.
+    Raise ValueError untuk opsi yang tidak dikenal.
+    """
+    requested = {part.strip().lower() for part in str(value or "").split(",") if part.strip()}
+    if "all" in requested:
+        return SHEET_OPTIONS
+    unknown = requested - set(SHEET_OPTIONS)
+    if unknown:
+        raise ValueError(
+            f"sheets tidak dikenal: {', '.join(sorted(unknown))} "
+            f"(pilihan: all, {', '.join(SHEET_OPTIONS)})"
+        )
+    return tuple(option for option in SHEET_OPTIONS if option in requested)
+
+
+def _newer(a, b):
+    """True jika baris a lebih baru (updated_at) dari b."""
+    return str(a.get("updated_at") or "") > str(b.get("updated_at") or "")
+
+
+def _identifiers(pendaftar):
+    return [
+        str(pendaftar.get(field)).strip()
+        for field in PENDAFTAR_ID_FIELDS
+        if pendaftar.get(field)
+    ]
+
+
+def index_pembayaran(rows):
+    """index[field][nilai] = pembayaran terbaru untuk nilai identitas itu (nisn / nik)."""
+    index = {field: {} for field in PEMBAYARAN_ID_FIELDS}
+    for row in rows:
+        for field in PEMBAYARAN_ID_FIELDS:
+            value = str(row.get(field) or "").strip()
+            if not value:
+                continue
+            current = index[field].get(value)
+            if current is None or _newer(row, current):
+                index[field][value] = row
+    return index
+
+
+def fetch_pembayaran(supa, chunk_size=1000):
+    """Satu pass pembayaran → (rows, index_pembayaran(rows))."""
+    rows = list(iter_rows(supa, "pembayaran", PEMBAYARAN_COLUMNS, chunk_size=chunk_size))
+    return rows, index_pembayaran(rows)
+
+
+def match_pembayaran(index, pendaftar):
+    """Pembayaran terbaru milik pendaftar (prioritas field pembayaran, lalu identitas)."""
+    identifiers = _identifiers(pendaftar)
+    for field in PEMBAYARAN_ID_FIELDS:
+        for candidate in identifiers:
+            row = index[field].get(candidate)
+            if row is not None:
+                return row
+    return None
+
+
+def program_name(item):
+    return (item.get("rencanaprogram") or "").strip() or NO_PROGRAM
+
+
+def program_key(item):
+    """Key grup program; sama dengan urutan sort sheet utama (case-insensitive)."""
+    return program_name(item).lower()
+
+
+def new_state(options, pembayaran_rows=None, pembayaran_index=None):
+    """Akumulator satu pass pendaftar untuk sheet tambahan."""
+    return {
+        "options": options,
+        "pembayaran_rows": pembayaran_rows or [],
+        "pembayaran_index": pembayaran_index or {field: {} for field in PEMBAYARAN_ID_FIELDS},
+        # identitas pendaftar → (nama, program, status berkas) untuk join pembayaran
+        "pendaftar_by_id": {},
+        "program_names": {},
+        "program_widths": {},
+        "pivot": {},
+    }
+
+
+def _pivot_row(state, key, name):
+    pivot = state["pivot"].get(key)
+    if pivot is None:
+        pivot = state["pivot"][key] = {"name": name, "counts": Counter(), "verified_amount": 0.0}
+    return pivot
+
+
+def _amount(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def add_pendaftar(state, item, values, update_widths, new_widths):
+    """
+    Akumulasi satu baris pendaftar (item mentah + nilai sel sheet utama).
+    update_widths / new_widths: helper lebar kolom milik handler XLSX.
+    """
+    options = state["options"]
+    key = program_key(item)
+    name = program_name(item)
+    state["program_names"].setdefault(key, name)
+    status = ((item.get("statusberkas") or "").strip() or "PENDING").upper()
+
+    if "program" in options:
+        widths = state["program_widths"].get(key)
+        if widths is None:
+            widths = state["program_widths"][key] = new_widths()
+        update_widths(widths, values)
+
+    if "pembayaran" in options:
+        info = (item.get("namalengkap") or "", name, status)
+        for identifier in _identifiers(item):
+            state["pendaftar_by_id"].setdefault(identifier, info)
+
+    if "summary" in options:
+        pivot = _pivot_row(state, key, name)
+        counts = pivot["counts"]
+        counts["total"] += 1
+        gender = (item.get("jeniskelamin") or "").strip().upper()
+        if gender in ("L", "LAKI-LAKI"):
+            counts["laki_laki"] += 1
+        elif gender in ("P", "PEREMPUAN"):
+            counts["perempuan"] += 1
+        # Status lama / tidak dikenal (mis. MENUNGGU) masuk berkas_lainnya agar total tetap cocok
+        berkas = normalize_status(status)
+        counts[f"berkas_{berkas.lower()}" if berkas else "berkas_lainnya"] += 1
+
+        pembayaran = match_pembayaran(state["pembayaran_index"], item)
+        if pembayaran is None:
+            counts["belum_bayar"] += 1
+        else:
+            pay_status = (pembayaran.get("status_pembayaran") or "PENDING").strip().upper()
+            counts[f"bayar_{pay_status.lower()}"] += 1
+            if pay_status == "VERIFIED":
+                pivot["verified_amount"] += _amount(pembayaran.get("jumlah"))
+
+
+def sheet_title(name, used):
+    """Judul sheet valid & unik (karakter terlarang dibuang, maks 31 karakter)."""
+    base = "".join(ch for ch in name if ch not in INVALID_TITLE_CHARS).strip() or "Sheet"
+    base = base[:MAX_TITLE_LENGTH]
+    title = base
+    suffix = 2
+    while title.lower() in used:
+        tail = f" ({suffix})"
+        title = base[:MAX_TITLE_LENGTH - len(tail)] + tail
+        suffix += 1
+    used.add(title.lower())
+    return title
+
+
+def program_sheets(state, keyed_rows, headers, used_titles):
+    """
+    Sheet per program dari keyed_rows yang sudah diurutkan ((program, nama), values):
+    baris satu program berurutan sehingga cukup dipotong per grup.
+    Return list (judul, headers, rows_iterable, widths).
+    """
+    sheets = []
+    start = 0
+    while start < len(keyed_rows):
+        key = keyed_rows[start][0][0]
+        end = start
+        while end < len(keyed_rows) and keyed_rows[end][0][0] == key:
+            end += 1
+        sheets.append((
+            sheet_title(state["program_names"].get(key, key), used_titles),
+            headers,
+            (values for _, values in keyed_rows[start:end]),
+            state["program_widths"][key],
+        ))
+        start = end
+    return sheets
+
+
+def pembayaran_values(state, joined_only):
+    """
+    Baris sheet pembayaran (urut program, nama pendaftar, nama pembayar).
+    joined_only=True (export difilter): hanya pembayaran milik pendaftar hasil filter.
+    """
+    by_id = state["pendaftar_by_id"]
+    rows = []
+    for pembayaran in state["pembayaran_rows"]:
+        info = None
+        for field in PEMBAYARAN_ID_FIELDS:
+            value = str(pembayaran.get(field) or "").strip()
+            if value and value in by_id:
+                info = by_id[value]
+                break
+        if info is None and joined_only:
+            continue
+        nama_pendaftar, program, status = info or ("", "", "")
+        rows.append([
+            pembayaran.get("nisn") or "",
+            pembayaran.get("nik") or "",
+            pembayaran.get("nama_lengkap") or "",
+            nama_pendaftar,
+            program,
+            status,
+            _amount(pembayaran.get("jumlah")),
+            pembayaran.get("metode_pembayaran") or "",
+            (pembayaran.get("status_pembayaran") or "").upper(),
+            str(pembayaran.get("tanggal_upload") or pembayaran.get("created_at") or "")[:19].replace("T", " "),
+            str(pembayaran.get("tanggal_verifikasi") or "")[:19].replace("T", " "),
+            pembayaran.get("verified_by") or "",
+            pembayaran.get("catatan_admin") or "",
+        ])
+    rows.sort(key=lambda row: (str(row[4]).lower(), str(row[3]).lower(), str(row[2]).lower()))
+    return rows
+
+
+def summary_values(state):
+    """Baris pivot per program (urut nama program) + baris TOTAL."""
+    keys = SUMMARY_HEADERS[1:-1]
+    count_keys = ["total"] + keys[1:]
+    totals = Counter()
+    total_amount = 0.0
+    rows = []
+    for key in sorted(state["pivot"]):
+        pivot = state["pivot"][key]
+        counts = pivot["counts"]
+        totals.update(counts)
+        total_amount += pivot["verified_amount"]
+        rows.append([pivot["name"]] + [counts.get(name, 0) for name in count_keys] + [pivot["verified_amount"]])
+    rows.append(["TOTAL"] + [totals.get(name, 0) for name in count_keys] + [total_amount])
+    return rows
+
+
+def extra_sheets(state, keyed_rows, main_headers, joined_only, new_widths, update_widths):
+    """
+    Susun sheet tambahan setelah pass pendaftar selesai & keyed_rows diurutkan.
+    Return list (judul, headers, value_rows, widths) untuk write_workbook.
+    """
+    options = state["options"]
+    used_titles = {"pendaftar", "ringkasan", "pembayaran"}
+    sheets = []
+
+    if "summary" in options:
+        rows = summary_values(state)
+        widths = new_widths(SUMMARY_HEADERS)
+        for values in rows:
+            update_widths(widths, values)
+        sheets.append(("Ringkasan", SUMMARY_HEADERS, rows, widths))
+
+    if "pembayaran" in options:
+        rows = pembayaran_values(state, joined_only)
+        widths = new_widths(PEMBAYARAN_HEADERS)
+        for values in rows:
+            update_widths(widths, values)
+        sheets.append(("Pembayaran", PEMBAYARAN_HEADERS, rows, widths))
+
+    if "program" in options:
+        sheets.extend(program_sheets(state, keyed_rows, main_headers, used_titles))
+
+    return sheets
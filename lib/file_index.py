@@ -0,0 +1,129 @@
+"""
+Index berkas pendaftar dari kolom file_* di tabel pendaftar.
+
+Saat upload, URL publik berkas disimpan di kolom file_ijazah / file_akta /
+file_foto / file_bpjs (lihat pendaftar_update_files). Kolom itu cukup sebagai
+index: satu query untuk seluruh pendaftar, tanpa storage.list per NISN.
+
+Listing storage hanya dipakai sebagai mode verifikasi / perbaikan
+(verify_against_storage), mis. untuk berkas lama yang belum tercatat di kolom.
+"""
+import mimetypes
+import os
+from urllib.parse import unquote, urlparse
+
+BUCKET = "pendaftar-files"
+
+# Kolom file_* → label jenis berkas (sama dengan folder di ZIP)
+FILE_COLUMNS = {
+    "file_ijazah": "Ijazah",
+    "file_akta": "Akta Kelahiran",
+    "file_foto": "Pas Foto 3x4",
+    "file_bpjs": "BPJS",
+}
+
+# Keyword nama file → kolom (untuk mencocokkan hasil listing storage)
+COLUMN_KEYWORDS = {
+    "file_ijazah": ["ijazah", "raport", "sttb"],
+    "file_akta": ["akta", "akte", "kelahiran"],
+    "file_foto": ["foto", "pasfoto", "pas-foto", "3x4"],
+    "file_bpjs": ["bpjs", "kartu-bpjs"],
+}
+
+INDEX_COLUMNS = "id,nisn,namalengkap,updatedat," + ",".join(FILE_COLUMNS)
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
+
+
+def storage_path_from_url(value, bucket=BUCKET):
+    """
+    Ambil path object storage dari nilai kolom file_*.
+    Mendukung URL publik / signed (.../object/public|sign/<bucket>/<path>) dan path polos.
+    """
+    if not value:
+        return None
+    text = str(value).strip()
+    if text.lower() in ("", "null", "none", "undefined"):
+        return None
+    if not text.startswith(("http://", "https://")):
+        return text.lstrip("/")
+
+    path = unquote(urlparse(text).path)
+    marker = f"/{bucket}/"
+    if marker not in path:
+        return None
+    return path.split(marker, 1)[1] or None
+
+
+def column_for_name(file_name):
+    """Tebak kolom file_* dari nama file storage (None jika tidak cocok)."""
+    name = file_name.lower()
+    for column, keywords in COLUMN_KEYWORDS.items():
+        if any(keyword in name for keyword in keywords):
+            return column
+    return None
+
+
+def files_for_row(row):
+    """
+    Berkas satu pendaftar dari kolom file_*, dalam bentuk yang sama dengan item
+    storage.list (name, updated_at, metadata) + path, type, column.
+    Size tidak tersimpan di database → None.
+    """
+    entries = []
+    for column, label in FILE_COLUMNS.items():
+        path = storage_path_from_url(row.get(column))
+        if not path:
+            continue
+        name = os.path.basename(path)
+        mime_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        entries.append({
+            "name": name,
+            "path": path,
+            "column": column,
+            "type": label,
+            "updated_at": row.get("updatedat") or "",
+            "metadata": {"size": None, "mimetype": mime_type},
+        })
+    return entries
+
+
+def is_image(file_name):
+    return os.path.splitext(file_name.lower())[1] in IMAGE_EXTENSIONS
+
+
+def verify_against_storage(row, storage_files, public_url_for=None):
+    """
+    Bandingkan index kolom file_* dengan listing storage folder NISN.
+    Return dict:
+    - missing_in_storage: berkas tercatat di kolom tapi object tidak ada
+    - untracked_in_storage: object di storage yang tidak tercatat di kolom mana pun
+    - repairs: {kolom: url} untuk kolom kosong yang bisa diisi dari storage
+      (hanya jika public_url_for diberikan dan tepat satu file cocok)
+    """
+    nisn = str(row.get("nisn") or "").strip()
+    indexed = {entry["path"]: entry for entry in files_for_row(row)}
+    stored = {
+        f"{nisn}/{item.get('name')}": item
+        for item in storage_files or []
+        if isinstance(item, dict) and item.get("name")
+    }
+
+    untracked = [path for path in stored if path not in indexed]
+    candidates = {}
+    for path in untracked:
+        column = column_for_name(os.path.basename(path))
+        if column:
+            candidates.setdefault(column, []).append(path)
+
+    repairs = {}
+    if public_url_for is not None:
+        for column, paths in candidates.items():
+            if not storage_path_from_url(row.get(column)) and len(paths) == 1:
+                repairs[column] = public_url_for(paths[0])
+
+    return {
+        "missing_in_storage": [path for path in indexed if path not in stored],
+        "untracked_in_storage": untracked,
+        "repairs": repairs,
+    }
@@ -0,0 +1,85 @@
+import base64
+import json
+
+
+def encode_cursor(sort_value, row_id):
+    """Encode posisi (sort_value, id) baris terakhir jadi token opaque (base64url)."""
+    raw = json.dumps([sort_value, row_id], separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """Decode token dari encode_cursor. Raise ValueError jika token rusak."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception as exc:
+        raise ValueError("Cursor tidak valid") from exc
+    if sort_value is None or row_id is None:
+        raise ValueError("Cursor tidak valid")
+    return sort_value, row_id
+
+
+def _quote(value):
+    """Quote nilai untuk filter or=(...) PostgREST (timestamp berisi ':' dan '+')."""
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+def keyset_filter(sort_column, sort_value, row_id, id_column="id"):
+    """
+    Filter keyset untuk urutan (sort_column DESC, id DESC):
+    baris sesudah cursor = sort < v OR (sort = v AND id < i).
+    Dipakai dengan query.or_(...).
+    """
+    v = _quote(sort_value)
+    i = _quote(row_id)
+    return f"{sort_column}.lt.{v},and({sort_column}.eq.{v},{id_column}.lt.{i})"
+
+
+def apply_keyset(query, sort_column, cursor, limit, id_column="id"):
+    """
+    Terapkan urutan (sort_column DESC, id DESC), filter cursor, dan limit+1
+    (baris ekstra hanya untuk mendeteksi apakah masih ada halaman berikutnya).
+    """
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        query = query.or_(keyset_filter(sort_column, sort_value, row_id, id_column))
+    return (
+        query.order(sort_column, desc=True)
+        .order(id_column, desc=True)
+        .limit(limit + 1)
+    )
+
+
+def split_page(rows, sort_column, limit, id_column="id"):
+    """Potong hasil apply_keyset jadi (rows, next_cursor). next_cursor None jika halaman terakhir."""
+    rows = list(rows or [])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last.get(sort_column), last.get(id_column))
+
+
+def iter_rows(supa, table, columns="*", chunk_size=1000, id_column="id", apply_filters=None):
+    """
+    Generator semua baris tabel, diambil per chunk dengan keyset id ASC
+    (tidak terpotong limit default PostgREST, memori tetap per chunk).
+    apply_filters: fungsi opsional query -> query untuk menambah filter.
+    Berhenti saat chunk kosong, jadi tetap lengkap walau max-rows server < chunk_size.
+    """
+    last_id = None
+    while True:
+        query = supa.table(table).select(columns)
+        if apply_filters is not None:
+            query = apply_filters(query)
+        if last_id is not None:
+            query = query.gt(id_column, last_id)
+        result = query.order(id_column, desc=False).limit(chunk_size).execute()
+        chunk = result.data or []
+        if not chunk:
+            return
+        for row in chunk:
+            yield row
+        last_id = chunk[-1].get(id_column)
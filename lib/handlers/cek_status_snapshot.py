@@ -0,0 +1,65 @@
+"""
+API Handler untuk snapshot statis cek status (hari pengumuman)
+"""
+from http.server import BaseHTTPRequestHandler
+
+from lib._supabase import supabase_client
+from lib import status_snapshot
+from ._crud_helpers import send_json, allow_cors
+
+
+class handler(BaseHTTPRequestHandler):
+    @staticmethod
+    def do_GET(request_handler):
+        """
+        GET /api/cek_status_snapshot
+        Response: { ok: true, data: manifest | null, fresh: bool }
+        """
+        try:
+            supa = supabase_client(service_role=True)
+            manifest = status_snapshot.read_manifest(supa, use_cache=False)
+            send_json(
+                request_handler,
+                200,
+                {"ok": True, "data": manifest, "fresh": status_snapshot.is_fresh(manifest)},
+            )
+        except Exception as exc:
+            print(f"[CEK_STATUS_SNAPSHOT][GET] Error: {exc}")
+            send_json(
+                request_handler,
+                500,
+                {"ok": False, "error": f"Gagal membaca snapshot: {exc}"},
+            )
+
+    @staticmethod
+    def do_POST(request_handler):
+        """
+        POST /api/cek_status_snapshot
+        Build ulang snapshot semua pendaftar (jalankan setelah hasil diumumkan).
+        Ditolak (400) jika STATUS_SNAPSHOT_SALT belum di-set.
+        """
+        try:
+            supa = supabase_client(service_role=True)
+            manifest = status_snapshot.build_snapshot(supa)
+            send_json(
+                request_handler,
+                200,
+                {
+                    "ok": True,
+                    "message": f"Snapshot cek status dibuat untuk {manifest['total_pendaftar']} pendaftar",
+                    "data": manifest,
+                },
+            )
+        except ValueError as exc:
+            send_json(request_handler, 400, {"ok": False, "error": str(exc)})
+        except Exception as exc:
+            print(f"[CEK_STATUS_SNAPSHOT][POST] Error: {exc}")
+            send_json(
+                request_handler,
+                500,
+                {"ok": False, "error": f"Gagal membuat snapshot: {exc}"},
+            )
+
+    @staticmethod
+    def do_OPTIONS(request_handler):
+        allow_cors(request_handler, ["GET", "POST", "OPTIONS"])
@@ -0,0 +1,101 @@
+"""
+API Handler untuk job export background (ZIP berkas / XLSX pendaftar)
+"""
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+from lib._supabase import supabase_client
+from lib import export_jobs
+from ._crud_helpers import read_json_body, send_json, allow_cors
+
+
+class handler(BaseHTTPRequestHandler):
+    @staticmethod
+    def do_GET(request_handler):
+        """
+        GET /api/export_jobs?id=<job_id>
+        Response: { ok: true, data: { status, processed, total, progress, download_url | downloads } }
+        """
+        try:
+            params = parse_qs(urlparse(request_handler.path).query)
+            job_id = (params.get("id", [""])[0] or "").strip()
+            if not job_id:
+                send_json(request_handler, 400, {"ok": False, "error": "Parameter id wajib diisi"})
+                return
+
+            supa = supabase_client(service_role=True)
+            job = export_jobs.get_job(supa, job_id)
+            if job is None:
+                send_json(request_handler, 404, {"ok": False, "error": "Export job tidak ditemukan"})
+                return
+
+            send_json(request_handler, 200, {"ok": True, "data": export_jobs.job_status(supa, job)})
+        except Exception as exc:
+            print(f"[EXPORT_JOBS][GET] Error: {exc}")
+            send_json(request_handler, 500, {"ok": False, "error": f"Gagal membaca export job: {exc}"})
+
+    @staticmethod
+    def do_POST(request_handler):
+        """
+        POST /api/export_jobs
+        Body: { kind: "zip" | "xlsx", only?: "all" | "images", status?, date_from?, date_to?,
+                gelombang?, source?: "db" | "storage" }
+        Response: { ok: true, data: { id, status: "pending", total, ... } }
+        Setelah dibuat, panggil PUT berulang kali sampai status = "done".
+        """
+        try:
+            body = read_json_body(request_handler)
+            kind = (body.get("kind") or "").strip().lower()
+
+            supa = supabase_client(service_role=True)
+            job = export_jobs.create_job(supa, kind, body)
+            send_json(
+                request_handler,
+                200,
+                {
+                    "ok": True,
+                    "message": f"Export job dibuat untuk {job['total']} pendaftar",
+                    "data": export_jobs.job_status(supa, job),
+                },
+            )
+        except ValueError as exc:
+            send_json(request_handler, 400, {"ok": False, "error": str(exc)})
+        except Exception as exc:
+            print(f"[EXPORT_JOBS][POST] Error: {exc}")
+            send_json(request_handler, 500, {"ok": False, "error": f"Gagal membuat export job: {exc}"})
+
+    @staticmethod
+    def do_PUT(request_handler):
+        """
+        PUT /api/export_jobs
+        Body: { id }
+        Jalankan satu langkah job (dibatasi time budget), lalu kembalikan progress.
+        ran=false berarti job sedang diproses invocation lain atau sudah selesai.
+        """
+        try:
+            body = read_json_body(request_handler)
+            job_id = str(body.get("id") or "").strip()
+            if not job_id:
+                send_json(request_handler, 400, {"ok": False, "error": "id wajib diisi"})
+                return
+
+            supa = supabase_client(service_role=True)
+            job, ran = export_jobs.run_job_step(supa, job_id)
+            if job is None:
+                send_json(request_handler, 404, {"ok": False, "error": "Export job tidak ditemukan"})
+                return
+
+            send_json(
+                request_handler,
+                200,
+                {"ok": True, "ran": ran, "data": export_jobs.job_status(supa, job)},
+            )
+        except ValueError as exc:
+            send_json(request_handler, 400, {"ok": False, "error": str(exc)})
+        except Exception as exc:
+            print(f"[EXPORT_JOBS][PUT] Error: {exc}")
+            send_json(request_handler, 500, {"ok": False, "error": f"Gagal menjalankan export job: {exc}"})
+
+    @staticmethod
+    def do_OPTIONS(request_handler):
+        allow_cors(request_handler, ["GET", "POST", "PUT", "OPTIONS"])
@@ -1,47 +1,594 @@
 from http.server import BaseHTTPRequestHandler
-from io import BytesIO
+import csv
+import json
+import shutil
+import tempfile
+from io import BytesIO, StringIO
 from datetime import datetime
+from urllib.parse import parse_qs, urlparse
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 from openpyxl.utils import get_column_letter
 from lib._supabase import supabase_client
+from lib import export_cache, export_sheets
+from lib.export_filters import filters_from_params, filter_fn
+from lib.handlers._pagination import iter_rows
+from lib.storage_upload import upload_fileobj
+
+
+EXPORT_COLUMNS = """
+    nisn,
+    namalengkap,
+    tanggallahir,
+    tempatlahir,
+    namaayah,
+    namaibu,
+    telepon_orang_tua,
+    rencanatingkat,
+    rencanaprogram,
+    alamatjalan,
+    desa,
+    file_akta,
+    file_ijazah,
+    file_foto,
+    file_bpjs
+"""
+
+# Define headers (EXACT ORDER)
+EXPORT_HEADERS = [
+    'nisn',
+    'nama',
+    'tanggal_lahir',
+    'tempat_lahir',
+    'nama_ayah',
+    'nama_ibu',
+    'nomor_orangtua',
+    'rencana_tingkat',
+    'rencana_program',
+    'alamat_lengkap',
+    'file_akta',  # FIXED: was 'file_akte', should be 'file_akta' to match database
+    'file_ijazah',
+    'file_foto',
+    'file_bpjs'
+]
+
+
+def has_file(field_value):
+    """Check if file exists: not null, not empty, not 'null' string"""
+    if not field_value:
+        return False
+    str_value = str(field_value).strip().lower()
+    # Exclude common "empty" values
+    if str_value in ['', 'null', 'none', 'undefined']:
+        return False
+    return True
+
+
+def transform_row(item):
+    """Transform satu baris pendaftar ke format export (alamat_lengkap, has_file_*)."""
+    # Build alamat_lengkap (alamatjalan + desa separated by comma)
+    alamat_parts = []
+    if item.get('alamatjalan'):
+        alamat_parts.append(item['alamatjalan'].strip())
+    if item.get('desa'):
+        alamat_parts.append(item['desa'].strip())
+    alamat_lengkap = ', '.join(filter(None, alamat_parts))
+    
+    return {
+        'nisn': item.get('nisn', ''),
+        'nama': item.get('namalengkap', ''),
+        'tanggal_lahir': item.get('tanggallahir', ''),
+        'tempat_lahir': item.get('tempatlahir', ''),
+        'nama_ayah': item.get('namaayah', ''),
+        'nama_ibu': item.get('namaibu', ''),
+        'nomor_orangtua': item.get('telepon_orang_tua', ''),
+        'rencana_tingkat': item.get('rencanatingkat', ''),
+        'rencana_program': item.get('rencanaprogram', ''),
+        'alamat_lengkap': alamat_lengkap,
+        # Check if files exist (any non-empty value counts as file exists)
+        'has_file_akta': has_file(item.get('file_akta')),
+        'has_file_ijazah': has_file(item.get('file_ijazah')),
+        'has_file_foto': has_file(item.get('file_foto')),
+        'has_file_bpjs': has_file(item.get('file_bpjs')),
+    }
+
+
+def sort_key(row):
+    """
+    Key urutan export: rencana_program (case-insensitive, A-Z), lalu nama.
+    Program memakai export_sheets.program_key supaya export langsung dan export job
+    (heapq.merge) menghasilkan urutan yang sama.
+    """
+    program = export_sheets.program_key({'rencanaprogram': row.get('rencana_program')})
+    return (program, str(row.get('nama', '')))
+
+
+def sort_rows(rows):
+    """Sort by rencana_program (case-insensitive, A-Z), then by nama"""
+    rows.sort(key=sort_key)
+    return rows
+
+
+# Lebar kolom (karakter): panjang nilai terpanjang + 2, dibatasi 10..50
+MIN_COLUMN_WIDTH = 10
+MAX_COLUMN_WIDTH = 50
+
+# Workbook di-spool ke /tmp setelah melewati batas ini, lalu di-stream per chunk
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Baris pendaftar per request ke PostgREST
+FETCH_CHUNK_SIZE = 1000
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Format export (?format=); csv & ndjson di-stream tanpa membangun workbook
+EXPORT_FORMATS = ("xlsx", "csv", "ndjson")
+CONTENT_TYPES = {
+    "xlsx": XLSX_CONTENT_TYPE,
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson; charset=utf-8",
+}
+
+# Kolom yang harus tetap teks di CSV (leading zero NISN / nomor HP)
+CSV_TEXT_COLUMNS = {"nisn", "nomor_orangtua"}
+
+# Jumlah baris per chunk yang dikirim ke client saat streaming
+STREAM_BATCH_ROWS = 500
+
+
+def row_values(row_data):
+    """Nilai sel satu baris (urut EXPORT_HEADERS) dari hasil transform_row."""
+    values = []
+    for header in EXPORT_HEADERS:
+        # Map has_file_* to file_* with YA/TIDAK
+        if header.startswith('file_'):
+            value = 'YA' if row_data.get('has_' + header, False) else 'TIDAK'
+        else:
+            value = row_data.get(header, '')
+
+        # Handle None
+        if value is None:
+            value = ''
+
+        # Handle date formatting
+        if header == 'tanggal_lahir' and value and isinstance(value, str):
+            try:
+                # Try YYYY-MM-DD format
+                value = datetime.strptime(value[:10], '%Y-%m-%d')
+            except ValueError:
+                pass
+
+        values.append(value)
+    return values
+
+
+def new_widths(headers=EXPORT_HEADERS):
+    """Panjang awal per kolom = panjang header."""
+    return [len(header) for header in headers]
+
+
+def update_widths(widths, values):
+    """Update panjang maksimum per kolom secara incremental (dipanggil per baris)."""
+    for index, value in enumerate(values):
+        if value:
+            length = len(str(value))
+            if length > widths[index]:
+                widths[index] = length
+    return widths
+
+
+# Format sel per nama kolom (berlaku di semua sheet)
+TEXT_COLUMNS = {'nisn', 'nik', 'nomor_orangtua'}
+WRAP_COLUMNS = {'alamat_lengkap', 'nama'}
+AMOUNT_COLUMNS = {'jumlah', 'total_bayar_verified'}
+
+
+def write_sheet(wb, title, headers, value_rows, widths):
+    """
+    Tambah satu sheet write-only: sel di-style saat ditulis, lebar kolom sudah
+    dihitung sebelumnya (tanpa iterasi ulang ws.columns).
+    """
+    ws = wb.create_sheet(title)
+
+    # Lebar kolom & freeze pane harus di-set sebelum baris pertama ditulis
+    for col_idx, width in enumerate(widths, start=1):
+        adjusted_width = min(max(width + 2, MIN_COLUMN_WIDTH), MAX_COLUMN_WIDTH)
+        ws.column_dimensions[get_column_letter(col_idx)].width = adjusted_width
+
+    # Freeze pane at A2 (header row visible when scrolling)
+    ws.freeze_panes = 'A2'
+
+    # Style header row
+    header_fill = PatternFill(start_color="0F9D58", end_color="0F9D58", fill_type="solid")
+    header_font = Font(bold=True, color="FFFFFF")
+    header_alignment = Alignment(horizontal="center", vertical="center")
+    wrap_alignment = Alignment(wrap_text=True, vertical='top')
+    thin_border = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = header_alignment
+        cell.border = thin_border
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    for values in value_rows:
+        cells = []
+        for header_name, value in zip(headers, values):
+            cell = WriteOnlyCell(ws, value=value)
+            cell.border = thin_border
+
+            # Text format for NISN / NIK and phone number (preserve leading zeros)
+            if header_name in TEXT_COLUMNS:
+                cell.number_format = '@'  # Text format
+
+            # Date format
+            elif isinstance(value, datetime):
+                cell.number_format = 'DD/MM/YYYY'
+
+            # Nominal rupiah
+            elif header_name in AMOUNT_COLUMNS:
+                cell.number_format = '#,##0'
+
+            # Wrap text for long text columns
+            if header_name in WRAP_COLUMNS:
+                cell.alignment = wrap_alignment
+
+            cells.append(cell)
+        ws.append(cells)
+
+
+def write_workbook(value_rows, widths, fileobj, extra_sheets=()):
+    """
+    Tulis workbook mode write-only ke fileobj: sheet "Pendaftar" lalu
+    extra_sheets berupa (judul, headers, value_rows, widths).
+    """
+    wb = Workbook(write_only=True)
+    write_sheet(wb, "Pendaftar", EXPORT_HEADERS, value_rows, widths)
+    for title, headers, rows, sheet_widths in extra_sheets:
+        write_sheet(wb, title, headers, rows, sheet_widths)
+    wb.save(fileobj)
+
+
+def build_workbook_bytes(rows):
+    """Bangun workbook XLSX dari baris hasil transform_row, return bytes."""
+    widths = new_widths()
+    value_rows = []
+    for row in rows:
+        values = row_values(row)
+        update_widths(widths, values)
+        value_rows.append(values)
+    excel_buffer = BytesIO()
+    write_workbook(value_rows, widths, excel_buffer)
+    return excel_buffer.getvalue()
+
+
+def csv_values(row_data, excel_text=True):
+    """
+    Nilai CSV satu baris (urut EXPORT_HEADERS), dari transform yang sama dengan XLSX.
+    excel_text=True: NISN & nomor HP ditulis sebagai ="..." agar Excel tidak
+    membuang leading zero / mengubahnya jadi notasi ilmiah.
+    """
+    values = []
+    for header, value in zip(EXPORT_HEADERS, row_values(row_data)):
+        if isinstance(value, datetime):
+            value = value.strftime('%Y-%m-%d')
+        elif header in CSV_TEXT_COLUMNS and value != '':
+            value = f'="{value}"' if excel_text else str(value)
+        values.append(value)
+    return values
+
+
+def iter_csv(rows, excel_text=True):
+    """Generator chunk bytes CSV (header + baris) dari iterable hasil transform_row."""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    if excel_text:
+        # BOM agar Excel membaca UTF-8 dengan benar
+        buffer.write('\ufeff')
+    writer.writerow(EXPORT_HEADERS)
+
+    count = 0
+    for row in rows:
+        writer.writerow(csv_values(row, excel_text))
+        count += 1
+        if count % STREAM_BATCH_ROWS == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue().encode('utf-8')
+
+
+def iter_ndjson(rows):
+    """Generator chunk bytes NDJSON: satu objek hasil transform_row per baris."""
+    batch = []
+    for row in rows:
+        batch.append(json.dumps(row, ensure_ascii=False, default=str))
+        if len(batch) >= STREAM_BATCH_ROWS:
+            yield ('\n'.join(batch) + '\n').encode('utf-8')
+            batch = []
+    if batch:
+        yield ('\n'.join(batch) + '\n').encode('utf-8')
+
+
+def stream_response(request_handler, chunks, content_type, filename):
+    """
+    Kirim chunk ke client begitu dihasilkan. Router (api/index.py) berjalan
+    dengan protocol HTTP/1.0, jadi body diakhiri dengan menutup koneksi
+    (Connection: close), tanpa Content-Length.
+    Error setelah header terkirim hanya bisa dicatat (response terpotong) → return None.
+    """
+    request_handler.send_response(200)
+    request_handler.send_header('Content-Type', content_type)
+    request_handler.send_header('Content-Disposition', f'attachment; filename="{filename}"')
+    request_handler.send_header('Access-Control-Allow-Origin', '*')
+    request_handler.send_header('Cache-Control', 'no-cache')
+    request_handler.send_header('Connection', 'close')
+    request_handler.close_connection = True
+    request_handler.end_headers()
+
+    total = 0
+    try:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            request_handler.wfile.write(chunk)
+            request_handler.wfile.flush()
+            total += len(chunk)
+    except Exception as e:
+        print(f"Error while streaming {filename} after {total} bytes: {e}")
+        return None
+    return total
+
+
+def upload_export(supa, fileobj, export_format, storage_path):
+    """Upload file export (posisi fileobj di akhir data) ke temp-downloads. Return ukuran."""
+    size = fileobj.tell()
+    fileobj.seek(0)
+    upload_fileobj(
+        supa,
+        "temp-downloads",
+        storage_path,
+        fileobj,
+        content_type=CONTENT_TYPES[export_format],
+        cache_control="3600",
+        upsert=True,
+    )
+    return size
+
+
+def send_download_url(request_handler, download_url, filename, export_format, extra=None):
+    """Kirim JSON berisi signed URL file export (expires 1 jam)."""
+    payload = {
+        "ok": True,
+        "download_url": download_url,
+        "filename": filename,
+        "format": export_format,
+        "expires_in": "1 hour",
+    }
+    payload.update(extra or {})
+
+    request_handler.send_response(200)
+    request_handler.send_header("Content-Type", "application/json")
+    request_handler.send_header("Access-Control-Allow-Origin", "*")
+    request_handler.end_headers()
+    request_handler.wfile.write(json.dumps(payload).encode())
+
+
+def send_storage_export(request_handler, supa, fileobj, export_format, filename, storage_path, extra=None):
+    """Upload file export ke storage_path lalu kirim JSON berisi signed URL."""
+    # Lazy import: helper signed URL milik export ZIP
+    from lib.handlers.pendaftar_download_zip import create_download_url
+
+    size = upload_export(supa, fileobj, export_format, storage_path)
+    payload = {"size_bytes": size, "cached": False}
+    payload.update(extra or {})
+    send_download_url(
+        request_handler,
+        create_download_url(supa, "temp-downloads", storage_path, 3600),
+        filename,
+        export_format,
+        payload,
+    )
+    return size
+
+
+def tee_chunks(chunks, fileobj):
+    """Teruskan chunk apa adanya sambil menyalinnya ke fileobj (untuk disimpan ke cache)."""
+    for chunk in chunks:
+        fileobj.write(chunk)
+        yield chunk
 
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
         """
-        GET /api/export_pendaftar_xlsx
+        GET /api/export_pendaftar_xlsx?status=DITERIMA&date_from=2025-01-01&date_to=2025-03-31&gelombang=1
         Response: Excel file download (.xlsx)
+        
+        ?format=xlsx|csv|ndjson (default xlsx)
+        - csv / ndjson di-stream per chunk langsung dari pagination (urut id),
+          memakai transform baris yang sama dengan XLSX
+        - csv: NISN & nomor HP ditulis ="..." (teks di Excel), ?csv_text=raw untuk
+          nilai polos tanpa BOM (konsumsi sistem lain)
+        
+        Data diambil per chunk (keyset id ASC) sehingga tidak terpotong batas baris
+        PostgREST; tiap chunk langsung di-transform jadi nilai sel yang ringkas.
+        
+        Workbook ditulis mode write-only (style saat sel ditulis, lebar kolom
+        dihitung incremental saat transform), di-spool ke /tmp lalu di-stream.
+        ?delivery=storage → upload ke bucket temp-downloads, response JSON berisi
+        signed URL (expires 1 jam) alih-alih file langsung.
+        
+        Cache (lib/export_cache.py): hasil disimpan per data version (jumlah baris +
+        max(updatedat) + filter + format). Request ulang tanpa perubahan data →
+        redirect 302 ke file cache (delivery=storage: JSON dengan cached=true).
+        ?force=1 → bangun ulang.
+        
+        ?sheets=pembayaran,program,summary (atau all), khusus xlsx: sheet tambahan
+        Pembayaran (join nisn/nik), satu sheet per rencanaprogram dan Ringkasan
+        (pivot) — lihat lib/export_sheets.py. Pembayaran diambil sekali, pendaftar
+        tetap satu pass; semua sheet diakumulasi dari pass yang sama.
         """
         try:
+            params = parse_qs(urlparse(self.path).query)
+            delivery = (params.get("delivery", [""])[0] or "").strip().lower()
+            export_format = (params.get("format", ["xlsx"])[0] or "xlsx").strip().lower()
+            if export_format not in EXPORT_FORMATS:
+                self.send_response(400)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.end_headers()
+                self.wfile.write(json.dumps({
+                    "ok": False,
+                    "error": f"format tidak dikenal: {export_format} (pilihan: {', '.join(EXPORT_FORMATS)})",
+                }).encode())
+                return
+
             # Get Supabase client with service role for full access
             supa = supabase_client(service_role=True)
 
-            # Query pendaftar table with computed boolean fields
-            # Using CASE to create boolean flags for file existence
-            result = (
-                supa.table("pendaftar")
-                .select("""
-                    nisn,
-                    namalengkap,
-                    tanggallahir,
-                    tempatlahir,
-                    namaayah,
-                    namaibu,
-                    telepon_orang_tua,
-                    rencanatingkat,
-                    rencanaprogram,
-                    alamatjalan,
-                    desa,
-                    file_akta,
-                    file_ijazah,
-                    file_foto,
-                    file_bpjs
-                """)
-                .execute()
+            try:
+                filters = filters_from_params(supa, {key: values[0] for key, values in params.items()})
+            except ValueError as e:
+                self.send_response(400)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.end_headers()
+                self.wfile.write(json.dumps({"ok": False, "error": str(e)}).encode())
+                return
+
+            try:
+                sheets = export_sheets.parse_sheets(params.get("sheets", [""])[0])
+                if sheets and export_format != "xlsx":
+                    raise ValueError("sheets hanya berlaku untuk format xlsx")
+            except ValueError as e:
+                self.send_response(400)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.end_headers()
+                self.wfile.write(json.dumps({"ok": False, "error": str(e)}).encode())
+                return
+            needs_pembayaran = "pembayaran" in sheets or "summary" in sheets
+
+            # Lazy import: helper signed URL milik export ZIP
+            from lib.handlers.pendaftar_download_zip import create_download_url
+
+            force = (params.get("force", [""])[0] or "").strip().lower() in ("1", "true")
+            csv_text = (params.get("csv_text", [""])[0] or "").strip().lower()
+            filename = f"pendaftar_{datetime.now().strftime('%Y%m%d')}.{export_format}"
+            version = export_cache.data_version(supa, filter_fn(filters))
+            if needs_pembayaran:
+                # Sheet pembayaran / ringkasan ikut berubah saat pembayaran berubah
+                version["pembayaran"] = export_cache.data_version(
+                    supa, table="pembayaran", column="updated_at"
+                )
+            cache_path = export_cache.cache_path(
+                "pendaftar",
+                export_format,
+                "pendaftar",
+                {
+                    "format": export_format,
+                    "csv_text": csv_text if export_format == "csv" else "",
+                    "sheets": ",".join(sheets),
+                },
+                filters,
+                version,
             )
+
+            cached_url = None if force else export_cache.cached_url(supa, cache_path, create_download_url)
+            if cached_url:
+                print(f"✓ Export cache hit: {cache_path} (version={version})")
+                if delivery == "storage":
+                    send_download_url(self, cached_url, filename, export_format, {
+                        "cached": True,
+                        "rows": version["count"],
+                        "data_version": version,
+                    })
+                else:
+                    self.send_response(302)
+                    self.send_header("Location", cached_url)
+                    self.send_header("Access-Control-Allow-Origin", "*")
+                    self.send_header("Cache-Control", "no-cache")
+                    self.end_headers()
+                return
+
+            if export_format != "xlsx":
+                rows = (
+                    transform_row(item)
+                    for item in iter_rows(
+                        supa,
+                        "pendaftar",
+                        f"id,{EXPORT_COLUMNS}",
+                        chunk_size=FETCH_CHUNK_SIZE,
+                        apply_filters=filter_fn(filters),
+                    )
+                )
+                if export_format == "csv":
+                    chunks = iter_csv(rows, csv_text != "raw")
+                else:
+                    chunks = iter_ndjson(rows)
+
+                export_file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY, dir="/tmp")
+                try:
+                    if delivery == "storage":
+                        for chunk in chunks:
+                            export_file.write(chunk)
+                        send_storage_export(self, supa, export_file, export_format, filename, cache_path, {
+                            "data_version": version,
+                        })
+                    else:
+                        # Stream ke client sambil disalin ke spool untuk cache
+                        size = stream_response(
+                            self, tee_chunks(chunks, export_file), CONTENT_TYPES[export_format], filename
+                        )
+                        if size is not None:
+                            print(f"✓ {export_format.upper()} streamed: {filename} ({size} bytes)")
+                            try:
+                                upload_export(supa, export_file, export_format, cache_path)
+                            except Exception as e:
+                                print(f"Warning: gagal simpan export ke cache: {e}")
+                finally:
+                    export_file.close()
+                return
+
+            sheet_state = None
+            columns = f"id,{EXPORT_COLUMNS}"
+            if sheets:
+                pembayaran_rows, pembayaran_index = (
+                    export_sheets.fetch_pembayaran(supa, FETCH_CHUNK_SIZE) if needs_pembayaran else (None, None)
+                )
+                sheet_state = export_sheets.new_state(sheets, pembayaran_rows, pembayaran_index)
+                columns = f"{columns},{export_sheets.PENDAFTAR_EXTRA_COLUMNS}"
+
+            # Transform + hitung lebar kolom dalam satu pass, per chunk
+            widths = new_widths()
+            keyed_rows = []
+            for item in iter_rows(
+                supa,
+                "pendaftar",
+                columns,
+                chunk_size=FETCH_CHUNK_SIZE,
+                apply_filters=filter_fn(filters),
+            ):
+                row = transform_row(item)
+                values = row_values(row)
+                update_widths(widths, values)
+                if sheet_state is not None:
+                    export_sheets.add_pendaftar(sheet_state, item, values, update_widths, new_widths)
+                keyed_rows.append((sort_key(row), values))
             
-            if not result.data:
+            if not keyed_rows:
                 self.send_response(404)
                 self.send_header("Content-Type", "application/json")
                 self.send_header("Access-Control-Allow-Origin", "*")
@@ -51,189 +598,47 @@ class handler(BaseHTTPRequestHandler):
                 )
                 return
 
-            # Transform data to match expected format
-            rows = []
-            for item in result.data:
-                # Build alamat_lengkap (alamatjalan + desa separated by comma)
-                alamat_parts = []
-                if item.get('alamatjalan'):
-                    alamat_parts.append(item['alamatjalan'].strip())
-                if item.get('desa'):
-                    alamat_parts.append(item['desa'].strip())
-                alamat_lengkap = ', '.join(filter(None, alamat_parts))
-                
-                # Check if files exist (any non-empty value counts as file exists)
-                def has_file(field_value):
-                    """Check if file exists: not null, not empty, not 'null' string"""
-                    if not field_value:
-                        return False
-                    str_value = str(field_value).strip().lower()
-                    # Exclude common "empty" values
-                    if str_value in ['', 'null', 'none', 'undefined']:
-                        return False
-                    return True
-                
-                has_file_akta = has_file(item.get('file_akta'))
-                has_file_ijazah = has_file(item.get('file_ijazah'))
-                has_file_foto = has_file(item.get('file_foto'))
-                has_file_bpjs = has_file(item.get('file_bpjs'))
-                
-                rows.append({
-                    'nisn': item.get('nisn', ''),
-                    'nama': item.get('namalengkap', ''),
-                    'tanggal_lahir': item.get('tanggallahir', ''),
-                    'tempat_lahir': item.get('tempatlahir', ''),
-                    'nama_ayah': item.get('namaayah', ''),
-                    'nama_ibu': item.get('namaibu', ''),
-                    'nomor_orangtua': item.get('telepon_orang_tua', ''),
-                    'rencana_tingkat': item.get('rencanatingkat', ''),
-                    'rencana_program': item.get('rencanaprogram', ''),
-                    'alamat_lengkap': alamat_lengkap,
-                    'has_file_akta': has_file_akta,
-                    'has_file_ijazah': has_file_ijazah,
-                    'has_file_foto': has_file_foto,
-                    'has_file_bpjs': has_file_bpjs,
-                })
-            
             # Sort by rencana_program (case-insensitive, A-Z), then by nama
-            rows.sort(key=lambda x: (str(x.get('rencana_program', '')).lower(), str(x.get('nama', ''))))
-
-            # Create Excel workbook
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Pendaftar"
-
-            # Define headers (EXACT ORDER)
-            headers = [
-                'nisn',
-                'nama',
-                'tanggal_lahir',
-                'tempat_lahir',
-                'nama_ayah',
-                'nama_ibu',
-                'nomor_orangtua',
-                'rencana_tingkat',
-                'rencana_program',
-                'alamat_lengkap',
-                'file_akta',  # FIXED: was 'file_akte', should be 'file_akta' to match database
-                'file_ijazah',
-                'file_foto',
-                'file_bpjs'
-            ]
-
-            # Write headers
-            ws.append(headers)
-
-            # Style header row
-            header_fill = PatternFill(start_color="0F9D58", end_color="0F9D58", fill_type="solid")
-            header_font = Font(bold=True, color="FFFFFF")
-            header_alignment = Alignment(horizontal="center", vertical="center")
-            thin_border = Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
+            keyed_rows.sort(key=lambda item: item[0])
 
-            for cell in ws[1]:
-                cell.fill = header_fill
-                cell.font = header_font
-                cell.alignment = header_alignment
-                cell.border = thin_border
-
-            # Write data rows
-            for row_data in rows:
-                row_values = []
-                for header in headers:
-                    # Map has_file_* to file_* with YA/TIDAK
-                    if header.startswith('file_'):
-                        boolean_key = 'has_' + header
-                        value = 'YA' if row_data.get(boolean_key, False) else 'TIDAK'
-                        
-                    else:
-                        value = row_data.get(header, '')
-                    
-                    # Handle None
-                    if value is None:
-                        value = ''
-                    
-                    # Handle date formatting
-                    if header == 'tanggal_lahir' and value and value != '':
-                        try:
-                            # Parse date if string
-                            if isinstance(value, str):
-                                # Try YYYY-MM-DD format
-                                date_obj = datetime.strptime(value[:10], '%Y-%m-%d')
-                                value = date_obj
-                        except:
-                            pass
-                    
-                    row_values.append(value)
-                
-                ws.append(row_values)
-
-            # Apply styling to all cells
-            for row_idx, row in enumerate(ws.iter_rows(min_row=2, max_row=ws.max_row), start=2):
-                for col_idx, cell in enumerate(row, start=1):
-                    cell.border = thin_border
-                    
-                    header_name = headers[col_idx - 1]
-                    
-                    # Text format for NISN and phone number (preserve leading zeros)
-                    if header_name in ['nisn', 'nomor_orangtua']:
-                        cell.number_format = '@'  # Text format
-                    
-                    # Date format
-                    elif header_name == 'tanggal_lahir':
-                        if isinstance(cell.value, datetime):
-                            cell.number_format = 'DD/MM/YYYY'
-                    
-                    # Wrap text for long text columns
-                    if header_name in ['alamat_lengkap', 'nama']:
-                        cell.alignment = Alignment(wrap_text=True, vertical='top')
-
-            # Auto-fit columns
-            for col_idx, col in enumerate(ws.columns, start=1):
-                column_letter = get_column_letter(col_idx)
-                max_length = 0
-                
-                for cell in col:
+            extra = []
+            if sheet_state is not None:
+                joined_only = any(filters.get(key) for key in ("status", "date_from", "date_to", "gelombang"))
+                extra = export_sheets.extra_sheets(
+                    sheet_state, keyed_rows, EXPORT_HEADERS, joined_only, new_widths, update_widths
+                )
+
+            excel_file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY, dir="/tmp")
+            try:
+                write_workbook((values for _, values in keyed_rows), widths, excel_file, extra)
+                excel_size = excel_file.tell()
+
+                if delivery == "storage":
+                    send_storage_export(self, supa, excel_file, "xlsx", filename, cache_path, {
+                        "rows": len(keyed_rows),
+                        "sheets": ["Pendaftar"] + [sheet[0] for sheet in extra],
+                        "data_version": version,
+                    })
+                else:
+                    # Send Excel response (stream per chunk dari spool)
+                    self.send_response(200)
+                    self.send_header('Content-Type', XLSX_CONTENT_TYPE)
+                    self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
+                    self.send_header('Content-Length', str(excel_size))
+                    self.send_header('Access-Control-Allow-Origin', '*')
+                    self.send_header('Cache-Control', 'no-cache')
+                    self.end_headers()
+                    excel_file.seek(0)
+                    shutil.copyfileobj(excel_file, self.wfile, STREAM_CHUNK_SIZE)
+                    # Simpan juga ke cache untuk request berikutnya
                     try:
-                        if cell.value:
-                            cell_length = len(str(cell.value))
-                            if cell_length > max_length:
-                                max_length = cell_length
-                    except:
-                        pass
-                
-                # Set column width with limits
-                adjusted_width = min(max(max_length + 2, 10), 50)
-                ws.column_dimensions[column_letter].width = adjusted_width
-
-            # Freeze pane at A2 (header row visible when scrolling)
-            ws.freeze_panes = 'A2'
-
-            # Save to BytesIO
-            excel_buffer = BytesIO()
-            wb.save(excel_buffer)
-            excel_buffer.seek(0)
-            excel_data = excel_buffer.read()
-
-            # Generate filename
-            today = datetime.now().strftime('%Y%m%d')
-            filename = f"pendaftar_{today}.xlsx"
-
-            # Send Excel response
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-            self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
-            self.send_header('Content-Length', str(len(excel_data)))
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.send_header('Cache-Control', 'no-cache')
-            self.end_headers()
-            self.wfile.write(excel_data)
+                        upload_export(supa, excel_file, "xlsx", cache_path)
+                    except Exception as e:
+                        print(f"Warning: gagal simpan export ke cache: {e}")
+            finally:
+                excel_file.close()
 
-            print(f"✓ Excel exported: {filename} ({len(rows)} rows)")
+            print(f"✓ Excel exported: {filename} ({len(keyed_rows)} rows, {excel_size} bytes)")
 
         except Exception as e:
             print(f"Error in export_pendaftar_xlsx: {e}")
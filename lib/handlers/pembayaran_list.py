@@ -1,56 +1,291 @@
 from http.server import BaseHTTPRequestHandler
 import json
+import re
+import time
+from datetime import date, timedelta
+from urllib.parse import parse_qs, urlparse
 from lib._supabase import supabase_client
+from lib.export_filters import apply_date_range, is_plain_date
+from lib.handlers._pagination import apply_keyset, iter_rows, split_page
+
+MAX_PAGE_SIZE = 200
+DEFAULT_PAGE_SIZE = 50
+
+# Mode hitung total yang didukung PostgREST (Prefer: count=...)
+COUNT_MODES = ("exact", "planned", "estimated")
+
+STATUS_VALUES = ("PENDING", "VERIFIED", "REJECTED")
+
+# Cache ringkasan per proses (warm invocation), key = filter
+SUMMARY_CACHE_TTL = 30
+SUMMARY_CACHE_MAX = 100
+_summary_cache = {}
+
+# Field output (?fields=...) -> kolom DB yang dibutuhkan
+FIELD_COLUMNS = {
+    "id": ("id",),
+    "nisn": ("nisn",),
+    "nik": ("nik",),
+    "nikcalon": ("nik",),
+    "nama_lengkap": ("nama_lengkap",),
+    "jumlah": ("jumlah",),
+    "status": ("status_pembayaran",),
+    "tanggal_upload": ("tanggal_upload",),
+    "tanggal_verifikasi": ("tanggal_verifikasi",),
+    "verified_by": ("verified_by",),
+    "catatan_admin": ("catatan_admin",),
+    "bukti_pembayaran": ("bukti_pembayaran",),
+    "metode_pembayaran": ("metode_pembayaran",),
+    "created_at": ("created_at",),
+    "updated_at": ("updated_at",),
+}
+
+# Karakter yang punya arti di filter or=(...) PostgREST
+SEARCH_RESERVED = re.compile(r'[,()*"\\:]')
+
+
+def _resolve_fields(fields_param):
+    """Field proyeksi dari ?fields=; default semua field."""
+    if not fields_param:
+        return list(FIELD_COLUMNS)
+    fields = list(dict.fromkeys(f.strip() for f in fields_param.split(",") if f.strip()))
+    invalid = [f for f in fields if f not in FIELD_COLUMNS]
+    if invalid:
+        raise ValueError(f"Field tidak dikenal: {', '.join(invalid)} (pilihan: {', '.join(FIELD_COLUMNS)})")
+    return fields
+
+
+def _select_columns(fields):
+    """Kolom DB minimal untuk field proyeksi (+ id & created_at untuk urutan / cursor)."""
+    columns = {"id", "created_at"}
+    for field in fields:
+        columns.update(FIELD_COLUMNS[field])
+    return ",".join(sorted(columns))
+
+
+def _project_value(field, row):
+    if field in ("nik", "nikcalon"):
+        return row.get("nik")
+    if field == "status":
+        return row.get("status_pembayaran")
+    if field == "jumlah":
+        return float(row.get("jumlah") or 0)
+    return row.get(field)
+
+
+def read_filters(params):
+    """
+    Filter dari query string:
+    - status   : status_pembayaran (PENDING / VERIFIED / REJECTED)
+    - metode   : metode_pembayaran (exact)
+    - date_from / date_to : rentang created_at (tanggal polos date_to = inklusif)
+    - q        : cari di nisn / nik / nama_lengkap (ilike)
+    - nisn     : lookup exact nisn ATAU nik (untuk detail satu pendaftar)
+    """
+    def param(name):
+        return params.get(name, [""])[0].strip()
+
+    status = param("status").upper()
+    if status and status not in STATUS_VALUES:
+        raise ValueError(f"status tidak dikenal: {status} (pilihan: {', '.join(STATUS_VALUES)})")
+    identifier = param("nisn") or param("nik")
+    if identifier and not identifier.isalnum():
+        raise ValueError("nisn / nik hanya boleh huruf & angka")
+    return {
+        "status": status,
+        "metode": param("metode"),
+        "date_from": param("date_from"),
+        "date_to": param("date_to"),
+        "q": SEARCH_RESERVED.sub(" ", param("q")).strip(),
+        "identifier": identifier,
+    }
+
+
+def apply_filters(query, filters, include_status=True):
+    """Terapkan filter read_filters ke query pembayaran."""
+    if include_status and filters.get("status"):
+        query = query.eq("status_pembayaran", filters["status"])
+    if filters.get("metode"):
+        query = query.eq("metode_pembayaran", filters["metode"])
+    query = apply_date_range(query, "created_at", filters.get("date_from"), filters.get("date_to"))
+    if filters.get("identifier"):
+        value = filters["identifier"]
+        query = query.or_(f"nisn.eq.{value},nik.eq.{value}")
+    if filters.get("q"):
+        pattern = f"*{filters['q']}*"
+        query = query.or_(f"nisn.ilike.{pattern},nik.ilike.{pattern},nama_lengkap.ilike.{pattern}")
+    return query
+
+
+def _summary_params(filters):
+    """Parameter RPC pembayaran_summary dari read_filters (semantik sama dengan apply_filters)."""
+    date_to = filters.get("date_to") or None
+    before = until = None
+    if date_to:
+        if is_plain_date(date_to):
+            before = (date.fromisoformat(date_to) + timedelta(days=1)).isoformat()
+        else:
+            until = date_to
+    return {
+        "p_metode": filters.get("metode") or None,
+        "p_created_from": filters.get("date_from") or None,
+        "p_created_before": before,
+        "p_created_until": until,
+        "p_identifier": filters.get("identifier") or None,
+        "p_q": filters.get("q") or None,
+    }
+
+
+def _summarize_with_queries(supa, filters):
+    """Fallback tanpa RPC: satu count head query per status + nominal VERIFIED saja."""
+    def filtered(columns, **kwargs):
+        query = supa.table("pembayaran").select(columns, **kwargs)
+        return apply_filters(query, filters, include_status=False)
+
+    by_status = {}
+    for status in STATUS_VALUES:
+        result = filtered("id", count="exact").eq("status_pembayaran", status).limit(1).execute()
+        by_status[status] = result.count or 0
+    total = filtered("id", count="exact").limit(1).execute().count or 0
+
+    revenue = 0.0
+    for row in iter_rows(
+        supa,
+        "pembayaran",
+        "id,jumlah",
+        apply_filters=lambda query: apply_filters(query, filters, include_status=False).eq("status_pembayaran", "VERIFIED"),
+    ):
+        revenue += float(row.get("jumlah") or 0)
+    return {"total": total, "by_status": by_status, "verified_revenue": revenue}
+
+
+def summarize(supa, filters):
+    """
+    Statistik kartu pembayaran untuk filter yang sama (tanpa filter status):
+    jumlah per status + total nominal VERIFIED.
+    Utama: RPC pembayaran_summary (sql/create_rpc_pembayaran_summary.sql), satu
+    query GROUP BY. Hasil di-cache per proses SUMMARY_CACHE_TTL detik per filter,
+    jadi auto-refresh admin tidak mengulang agregasi.
+    """
+    params = _summary_params(filters)
+    cache_key = tuple(sorted(params.items()))
+    now = time.monotonic()
+    entry = _summary_cache.get(cache_key)
+    if entry and now < entry["expires_at"]:
+        return entry["data"]
+
+    data = None
+    try:
+        result = supa.rpc("pembayaran_summary", params).execute()
+        if isinstance(result.data, dict):
+            data = result.data
+            data["verified_revenue"] = float(data.get("verified_revenue") or 0)
+        else:
+            print(f"[PEMBAYARAN_LIST] Unexpected RPC result: {type(result.data)}")
+    except Exception as e:
+        print(f"[PEMBAYARAN_LIST] RPC pembayaran_summary gagal, pakai fallback: {e}")
+    if data is None:
+        data = _summarize_with_queries(supa, filters)
+
+    if len(_summary_cache) >= SUMMARY_CACHE_MAX:
+        _summary_cache.clear()
+    _summary_cache[cache_key] = {"data": data, "expires_at": now + SUMMARY_CACHE_TTL}
+    return data
+
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
+        """
+        GET /api/pembayaran_list?page=1&pageSize=50&status=PENDING&q=budi
+        Response: { success: true, data: [...], count: N, total: T, page, limit }
+
+        Filter: status, metode, date_from, date_to (created_at), q (nisn / nik / nama),
+        nisn (lookup exact nisn atau nik). Urut (created_at DESC, id DESC).
+        count: exact | planned | estimated (default exact) — total dari query terfilter
+        yang sama, dalam satu round trip.
+
+        Proyeksi: ?fields=id,nisn,nama_lengkap,status — hanya kolom itu yang di-select.
+        ?summary=1 → tambah { summary: { total, by_status, verified_revenue } } untuk
+        filter yang sama (tanpa filter status), untuk kartu statistik.
+
+        Cursor (keyset) mode: ?mode=cursor&pageSize=50&cursor=<next_cursor>
+        - response berisi next_cursor (null = habis), total hanya di halaman pertama
+        """
         try:
-            # Get all pembayaran from pembayaran table, ordered by newest first
+            params = parse_qs(urlparse(self.path).query)
+            cursor = params.get('cursor', [''])[0].strip()
+            cursor_mode = bool(cursor) or params.get('mode', [''])[0].strip().lower() == 'cursor'
+            page = max(1, int(params.get('page', ['1'])[0]))
+            page_size = max(1, min(MAX_PAGE_SIZE, int(params.get('pageSize', [str(DEFAULT_PAGE_SIZE)])[0])))
+            count_mode = params.get('count', ['exact'])[0].strip().lower()
+            if count_mode not in COUNT_MODES:
+                count_mode = 'exact'
+            fields = _resolve_fields(params.get('fields', [''])[0])
+            filters = read_filters(params)
+            with_summary = params.get('summary', [''])[0].strip().lower() in ('1', 'true')
+
             supa = supabase_client(service_role=True)
-            result = supa.table('pembayaran').select("*").order('created_at', desc=True).execute()
+            if cursor:
+                # Halaman lanjutan: total sudah didapat di halaman pertama
+                query = supa.table('pembayaran').select(_select_columns(fields))
+            else:
+                query = supa.table('pembayaran').select(_select_columns(fields), count=count_mode)  # type: ignore
+            query = apply_filters(query, filters)
+
+            next_cursor = None
+            if cursor_mode:
+                result = apply_keyset(query, 'created_at', cursor, page_size).execute()
+                raw_data, next_cursor = split_page(result.data, 'created_at', page_size)
+                total = result.count if getattr(result, 'count', None) is not None else None  # type: ignore
+            else:
+                from_ = (page - 1) * page_size
+                result = (
+                    query.order('created_at', desc=True)
+                    .order('id', desc=True)
+                    .range(from_, from_ + page_size - 1)
+                    .execute()
+                )
+                raw_data = result.data or []
+                total = result.count if getattr(result, 'count', None) is not None else len(raw_data)  # type: ignore
 
-            # Get data safely
-            raw_data = result.data if result else []
             # Map fields for frontend compatibility dengan field yang konsisten
-            result_data = []
-            for item in raw_data:
-                # Get identifier - try nisn first, fallback to nik, then nikcalon
-                nisn = item.get('nisn')
-                nik = item.get('nik') or item.get('nikcalon')
-                
-                mapped = {
-                    'id': item.get('id'),
-                    'nisn': nisn,
-                    'nik': nik,
-                    'nikcalon': nik,  # Add nikcalon for compatibility
-                    'nama_lengkap': item.get('nama_lengkap'),
-                    'jumlah': float(item.get('jumlah', 0)),
-                    'status': item.get('status_pembayaran'),  # Gunakan field yang benar
-                    'tanggal_upload': item.get('tanggal_upload'),
-                    'tanggal_verifikasi': item.get('tanggal_verifikasi'),
-                    'verified_by': item.get('verified_by'),
-                    'catatan_admin': item.get('catatan_admin'),
-                    'bukti_pembayaran': item.get('bukti_pembayaran'),
-                    'metode_pembayaran': item.get('metode_pembayaran'),
-                    'created_at': item.get('created_at'),
-                    'updated_at': item.get('updated_at')
-                }
-                result_data.append(mapped)
+            result_data = [{field: _project_value(field, item) for field in fields} for item in raw_data]
+
+            response_data = {
+                'success': True,
+                'data': result_data,
+                'count': len(result_data),
+                'total': total,
+                'page': page,
+                'limit': page_size,
+                'count_mode': count_mode,
+                'mode': 'cursor' if cursor_mode else 'offset',
+            }
+            if cursor_mode:
+                response_data['next_cursor'] = next_cursor
+            if with_summary:
+                response_data['summary'] = summarize(supa, filters)
 
             # Send response
             self.send_response(200)
             self.send_header('Content-Type', 'application/json')
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
+            self.wfile.write(json.dumps(response_data, default=str).encode())
 
-            response_data = {
-                'success': True,
-                'data': result_data if result_data else [],
-                'count': len(result_data) if result_data else 0
-            }
+        except ValueError as e:
+            # Parameter tidak valid (page/pageSize bukan angka, cursor rusak, filter salah)
+            self.send_response(400)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            self.wfile.write(json.dumps({
+                'success': False,
+                'error': str(e),
+                'data': [],
+                'count': 0
+            }).encode())
 
-            self.wfile.write(json.dumps(response_data).encode())
-            
         except Exception as e:
             print(f"Error in pembayaran_list: {str(e)}")
             self.send_response(500)
@@ -63,10 +298,10 @@ class handler(BaseHTTPRequestHandler):
                 'data': [],
                 'count': 0
             }).encode())
-    
+
     def do_OPTIONS(self):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
\ No newline at end of file
+        self.end_headers()
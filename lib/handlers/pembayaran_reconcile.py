@@ -0,0 +1,116 @@
+"""
+API Handler: rekonsiliasi mutasi rekening (CSV / XLSX) dengan pembayaran PENDING.
+
+Satu fetch terpaginasi pembayaran PENDING → index hash di memori
+(lib/bank_reconcile.py), lalu setiap baris mutasi dicocokkan lewat lookup index,
+bukan query per baris. Handler ini TIDAK mengubah data: hasilnya laporan usulan
++ verify_items yang bisa langsung dikirim ke /api/pembayaran_verify_bulk.
+"""
+import base64
+import binascii
+from http.server import BaseHTTPRequestHandler
+
+from lib._supabase import supabase_client
+from lib import bank_reconcile
+from ._crud_helpers import read_json_body, send_json, allow_cors
+
+# Body JSON berisi base64 (~4/3 ukuran file) harus di bawah batas request Vercel 4.5 MB
+MAX_FILE_BYTES = 3 * 1024 * 1024
+MAX_DATE_WINDOW_DAYS = 31
+CONFIDENCE_OPTIONS = ("high", "medium", "low")
+# Tahun default untuk tanggal mutasi tanpa tahun
+MIN_YEAR, MAX_YEAR = 2000, 2100
+
+
+def decode_file(body):
+    """Body { file: base64 | data URL, fileName } → (bytes, nama file)."""
+    file_base64 = body.get("file")
+    file_name = str(body.get("fileName") or body.get("file_name") or "").strip()
+    if not file_base64 or not file_name:
+        raise ValueError("Missing required fields: file, fileName")
+    if isinstance(file_base64, str) and file_base64.startswith("data:"):
+        file_base64 = file_base64.split(",", 1)[-1]
+    try:
+        data = base64.b64decode(file_base64, validate=False)
+    except (binascii.Error, TypeError, ValueError):
+        raise ValueError("File bukan base64 yang valid")
+    if not data:
+        raise ValueError("File mutasi kosong")
+    if len(data) > MAX_FILE_BYTES:
+        raise ValueError(f"Ukuran file mutasi maksimal {MAX_FILE_BYTES // (1024 * 1024)} MB")
+    return data, file_name
+
+
+def read_options(body):
+    """Opsi: date_window_days (0-31, default 3), min_confidence (default high), year (2000-2100)."""
+    try:
+        window = int(body.get("date_window_days", bank_reconcile.DEFAULT_DATE_WINDOW_DAYS))
+    except (TypeError, ValueError):
+        raise ValueError("date_window_days harus berupa angka")
+    window = max(0, min(window, MAX_DATE_WINDOW_DAYS))
+
+    min_confidence = str(body.get("min_confidence") or "high").strip().lower()
+    if min_confidence not in CONFIDENCE_OPTIONS:
+        raise ValueError(f"min_confidence harus salah satu dari: {', '.join(CONFIDENCE_OPTIONS)}")
+
+    year = body.get("year")
+    try:
+        year = int(year) if year not in (None, "") else None
+    except (TypeError, ValueError):
+        raise ValueError("year harus berupa angka")
+    if year is not None and not MIN_YEAR <= year <= MAX_YEAR:
+        raise ValueError(f"year harus antara {MIN_YEAR} dan {MAX_YEAR}")
+    return window, min_confidence, year
+
+
+class handler(BaseHTTPRequestHandler):
+    @staticmethod
+    def do_POST(request_handler):
+        """
+        POST /api/pembayaran_reconcile
+        Body: { file: base64 CSV/XLSX, fileName, date_window_days?: 3,
+                min_confidence?: "high" | "medium" | "low", year? (mutasi tanpa tahun) }
+        Response: { ok: true, statement, summary, matches, unmatched_transactions,
+                    unmatched_pembayaran, verify_items }
+        """
+        try:
+            body = read_json_body(request_handler)
+            if not isinstance(body, dict):
+                raise ValueError("Body harus berupa object JSON")
+            data, file_name = decode_file(body)
+            window, min_confidence, year = read_options(body)
+
+            transactions, statement = bank_reconcile.read_statement(data, file_name, default_year=year)
+
+            supa = supabase_client(service_role=True)
+            index = bank_reconcile.PendingIndex.fetch(supa)
+            report = bank_reconcile.reconcile(transactions, index, window_days=window)
+            report["verify_items"] = bank_reconcile.verify_items(report["matches"], min_confidence)
+
+            summary = report["summary"]
+            print(
+                f"[PEMBAYARAN_RECONCILE] {file_name}: {summary['transactions']} transaksi masuk, "
+                f"{summary['matched']} cocok, {len(report['verify_items'])} diusulkan verifikasi"
+            )
+            send_json(request_handler, 200, {
+                "ok": True,
+                "statement": {
+                    "file_name": file_name,
+                    "rows": statement["rows"],
+                    "header_line": statement["header_line"],
+                    "skipped_debit": statement["skipped_debit"],
+                    "skipped_invalid": statement["skipped_invalid"],
+                    "date_window_days": window,
+                    "min_confidence": min_confidence,
+                },
+                **report,
+            })
+        except ValueError as exc:
+            send_json(request_handler, 400, {"ok": False, "error": str(exc)})
+        except Exception as exc:
+            print(f"[PEMBAYARAN_RECONCILE][POST] Error: {exc}")
+            send_json(request_handler, 500, {"ok": False, "error": f"Gagal rekonsiliasi mutasi: {exc}"})
+
+    @staticmethod
+    def do_OPTIONS(request_handler):
+        allow_cors(request_handler, ["POST", "OPTIONS"])
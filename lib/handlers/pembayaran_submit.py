@@ -1,10 +1,76 @@
 from http.server import BaseHTTPRequestHandler
 import json
-from lib._supabase import supabase_client
-import datetime
-import time
+from lib._supabase import supabase_client, is_missing_function
 import re
 
+# Nilai default pembayaran baru (sama dengan RPC submit_pembayaran)
+DEFAULT_JUMLAH = 500000.00
+DEFAULT_METODE = 'Transfer Bank BRI'
+
+
+def _submit_with_queries(supa, nisn, nama_lengkap, bukti_pembayaran, catatan):
+    """
+    Fallback tanpa RPC: cek pendaftar, lalu update (return=representation);
+    insert hanya jika update tidak mengenai baris mana pun.
+    """
+    pendaftar = supa.table('pendaftar').select('id').eq('nisn', nisn).limit(1).execute()
+    if not getattr(pendaftar, 'data', None):
+        return {'ok': False, 'code': 'pendaftar_not_found', 'message': 'NISN tidak ditemukan di database pendaftar'}
+
+    updated = supa.table('pembayaran').update({
+        'bukti_pembayaran': bukti_pembayaran,
+        'status_pembayaran': 'PENDING',
+        'catatan_admin': catatan,
+        'updated_at': 'now()'  # Update timestamp
+    }).eq('nisn', nisn).execute()
+    if updated.data:
+        return {'ok': True, 'result': 'updated', 'pembayaran': updated.data[0]}
+
+    inserted = supa.table('pembayaran').insert({
+        'nisn': nisn,
+        'nik': None,  # NIK tidak wajib, set NULL untuk avoid constraint violation
+        'nama_lengkap': nama_lengkap,
+        'jumlah': DEFAULT_JUMLAH,
+        'metode_pembayaran': DEFAULT_METODE,
+        'bukti_pembayaran': bukti_pembayaran,
+        'status_pembayaran': 'PENDING',
+        'catatan_admin': catatan,
+        'tanggal_upload': 'now()',  # Set timestamp upload
+        'created_at': 'now()',       # Set timestamp dibuat
+        'updated_at': 'now()'        # Set timestamp diupdate
+    }).execute()
+    return {'ok': True, 'result': 'created', 'pembayaran': (inserted.data or [None])[0]}
+
+
+def submit_pembayaran(supa, nisn, nama_lengkap, bukti_pembayaran, catatan=''):
+    """
+    Submit pembayaran. Utama: RPC `submit_pembayaran` (validasi pendaftar + upsert
+    dalam satu transaksi, lihat sql/create_rpc_submit_pembayaran.sql).
+    Return { ok, result: created|updated, pembayaran } atau { ok: false, code, message }.
+
+    Fallback query biasa HANYA jika fungsi RPC belum dibuat. Error lain (constraint,
+    timeout, koneksi putus) diteruskan ke caller: fungsi mungkin sudah rollback atau
+    commit, jadi mengulang lewat jalur tanpa lock bisa membuat data ganda.
+    """
+    try:
+        rpc_result = supa.rpc('submit_pembayaran', {
+            'p_nisn': nisn,
+            'p_nama_lengkap': nama_lengkap,
+            'p_bukti_pembayaran': bukti_pembayaran,
+            'p_catatan': catatan or '',
+            'p_jumlah': DEFAULT_JUMLAH,
+            'p_metode_pembayaran': DEFAULT_METODE,
+        }).execute()
+    except Exception as e:
+        if not is_missing_function(e):
+            raise
+        print(f"[PEMBAYARAN_SUBMIT] RPC submit_pembayaran belum dibuat, pakai fallback: {e}")
+        return _submit_with_queries(supa, nisn, nama_lengkap, bukti_pembayaran, catatan or '')
+    if isinstance(rpc_result.data, dict):
+        return rpc_result.data
+    raise RuntimeError(f"Hasil RPC submit_pembayaran tidak valid: {type(rpc_result.data)}")
+
+
 class handler(BaseHTTPRequestHandler):
     def do_POST(self):
         try:
@@ -68,72 +134,34 @@ class handler(BaseHTTPRequestHandler):
             # Get Supabase client with service role for admin operations
             supa = supabase_client(service_role=True)
             
-            # Check if pendaftar exists berdasarkan NISN
-            pendaftar = supa.table('pendaftar').select('*').eq('nisn', nisn).execute()
+            # Validasi pendaftar + update/insert pembayaran dalam satu round trip
+            submit_result = submit_pembayaran(supa, nisn, nama_lengkap, bukti_pembayaran, data.get('catatan', ''))
             
-            pendaftar_data = getattr(pendaftar, 'data', None)
-            if not pendaftar_data:
+            if not submit_result.get('ok'):
                 self.send_response(404)
                 self.send_header('Content-Type', 'application/json')
+                self.send_header('Access-Control-Allow-Origin', '*')
                 self.end_headers()
                 self.wfile.write(json.dumps({
-                    'error': 'NISN tidak ditemukan di database pendaftar'
+                    'error': submit_result.get('message') or 'NISN tidak ditemukan di database pendaftar'
                 }).encode())
                 return
             
-            # Check if payment already exists berdasarkan NISN
-            existing_payment = supa.table('pembayaran').select('*').eq('nisn', nisn).execute()
-            
-            existing_data = getattr(existing_payment, 'data', None)
-            if existing_data:
-                # Update existing payment
-                print(f"[PEMBAYARAN_SUBMIT] Updating existing payment for NISN: {nisn}")
-                result = supa.table('pembayaran').update({
-                    'bukti_pembayaran': bukti_pembayaran,
-                    'status_pembayaran': 'PENDING',
-                    'catatan_admin': data.get('catatan', ''),
-                    'updated_at': 'now()'  # Update timestamp
-                }).eq('nisn', nisn).execute()
-                
-                print(f"[PEMBAYARAN_SUBMIT] Payment updated successfully for NISN: {nisn}")
-                response_data = {
-                    'message': 'Pembayaran berhasil diupdate',
-                    'nisn': nisn,
-                    'status': 'updated'
-                }
-            else:
-                # Insert new payment dengan field yang konsisten
-                print(f"[PEMBAYARAN_SUBMIT] Creating new payment for NISN: {nisn}")
-                payment_data = {
-                    'nisn': nisn,
-                    'nik': None,  # NIK tidak wajib, set NULL untuk avoid constraint violation
-                    'nama_lengkap': nama_lengkap,
-                    'jumlah': 500000.00,
-                    'metode_pembayaran': 'Transfer Bank BRI',
-                    'bukti_pembayaran': bukti_pembayaran,
-                    'status_pembayaran': 'PENDING',
-                    'catatan_admin': data.get('catatan', ''),
-                    'tanggal_upload': 'now()',  # Set timestamp upload
-                    'created_at': 'now()',       # Set timestamp dibuat
-                    'updated_at': 'now()'        # Set timestamp diupdate
-                }
-                
-                print(f"[PEMBAYARAN_SUBMIT] Payment data: nisn={nisn}, nik=None, nama={nama_lengkap}")
-                result = supa.table('pembayaran').insert(payment_data).execute()
-                
-                print(f"[PEMBAYARAN_SUBMIT] Payment created successfully for NISN: {nisn}")
-                response_data = {
-                    'message': 'Pembayaran berhasil disubmit',
-                    'nisn': nisn,
-                    'status': 'created'
-                }
+            status = submit_result.get('result')
+            print(f"[PEMBAYARAN_SUBMIT] Payment {status} for NISN: {nisn}")
+            response_data = {
+                'message': 'Pembayaran berhasil diupdate' if status == 'updated' else 'Pembayaran berhasil disubmit',
+                'nisn': nisn,
+                'status': status,
+                'data': submit_result.get('pembayaran'),
+            }
             
             # Send success response
             self.send_response(200)
             self.send_header('Content-Type', 'application/json')
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
-            self.wfile.write(json.dumps(response_data).encode())
+            self.wfile.write(json.dumps(response_data, default=str).encode())
             
         except Exception as e:
             print(f"Error in pembayaran_submit: {str(e)}")
@@ -1,8 +1,72 @@
 from http.server import BaseHTTPRequestHandler
 import json
-from lib._supabase import supabase_client
+from lib._supabase import supabase_client, is_missing_function
 import re
 
+VALID_STATUSES = ['VERIFIED', 'REJECTED']
+
+
+def _verify_with_queries(supa, identifier, status, catatan, verified_by):
+    """
+    Fallback tanpa RPC (dua request, TIDAK transaksional): update pembayaran
+    (return=representation), lalu pendaftar jika VERIFIED. Kegagalan langkah
+    kedua tidak disembunyikan: dikembalikan sebagai warning di response.
+    """
+    result = supa.table('pembayaran').update({
+        'status_pembayaran': status,
+        'verified_by': verified_by,
+        'catatan_admin': catatan,
+        'tanggal_verifikasi': 'now()',  # Set timestamp verifikasi
+        'updated_at': 'now()'           # Update timestamp
+    }).or_(f'nisn.eq.{identifier},nik.eq.{identifier}').execute()
+    if not result.data:
+        return {'ok': False, 'code': 'pembayaran_not_found', 'message': 'Pembayaran dengan NISN tersebut tidak ditemukan'}
+
+    verified = {'ok': True, 'pembayaran': result.data[0], 'pembayaran_count': len(result.data), 'pendaftar': None}
+    if status != 'VERIFIED':
+        return verified
+
+    try:
+        pendaftar = supa.table('pendaftar').update({
+            'statusberkas': 'DITERIMA',
+            'verifiedby': verified_by,
+            'verifiedat': 'now()',
+            'updatedat': 'now()'
+        }).or_(f'nisn.eq.{identifier},nikcalon.eq.{identifier}').execute()
+        verified['pendaftar'] = (pendaftar.data or [None])[0]
+    except Exception as e:
+        print(f"[PEMBAYARAN_VERIFY] ⚠️ Pembayaran {status} tapi gagal update pendaftar: {e}")
+        verified['warning'] = f'Status pendaftar belum diperbarui: {e}'
+    return verified
+
+
+def verify_pembayaran(supa, identifier, status, catatan='', verified_by='admin'):
+    """
+    Verifikasi pembayaran + update pendaftar. Utama: RPC `verify_pembayaran`
+    (satu round trip, satu transaksi; lihat sql/create_rpc_verify_pembayaran.sql).
+    Return { ok, pembayaran, pendaftar } atau { ok: false, code, message }.
+
+    Fallback query biasa (tidak transaksional) HANYA jika fungsi RPC belum dibuat;
+    error lain diteruskan ke caller agar perubahan yang sudah rollback / commit
+    tidak diulang sebagai dua UPDATE terpisah.
+    """
+    try:
+        rpc_result = supa.rpc('verify_pembayaran', {
+            'p_identifier': identifier,
+            'p_status': status,
+            'p_catatan': catatan or '',
+            'p_verified_by': verified_by or 'admin',
+        }).execute()
+    except Exception as e:
+        if not is_missing_function(e):
+            raise
+        print(f"[PEMBAYARAN_VERIFY] RPC verify_pembayaran belum dibuat, pakai fallback: {e}")
+        return _verify_with_queries(supa, identifier, status, catatan or '', verified_by or 'admin')
+    if isinstance(rpc_result.data, dict):
+        return rpc_result.data
+    raise RuntimeError(f"Hasil RPC verify_pembayaran tidak valid: {type(rpc_result.data)}")
+
+
 class handler(BaseHTTPRequestHandler):
     def do_POST(self):
         try:
@@ -42,80 +106,49 @@ class handler(BaseHTTPRequestHandler):
                 return
             
             # Validasi status dengan lebih ketat
-            valid_statuses = ['VERIFIED', 'REJECTED']
             status = str(data['status']).upper()
             
-            if status not in valid_statuses:
+            if status not in VALID_STATUSES:
                 self.send_response(400)
                 self.send_header('Content-Type', 'application/json')
                 self.end_headers()
                 self.wfile.write(json.dumps({
-                    'error': f'Invalid status. Must be one of: {", ".join(valid_statuses)}'
+                    'error': f'Invalid status. Must be one of: {", ".join(VALID_STATUSES)}'
                 }).encode())
                 return
             
             # Get Supabase client with service role for admin operations
             supa = supabase_client(service_role=True)
             
-            # Cek apakah pembayaran dengan NISN tersebut ada
-            existing_payment = supa.table('pembayaran').select('*').or_(f'nisn.eq.{nisn},nik.eq.{nisn}').execute()
+            verified_by = data.get('verified_by', data.get('verifiedBy', 'admin'))
+            verify_result = verify_pembayaran(supa, nisn, status, data.get('catatan_admin', ''), verified_by)
             
-            if not existing_payment.data:
-                self.send_response(404)
+            if not verify_result.get('ok'):
+                self.send_response(404 if verify_result.get('code') == 'pembayaran_not_found' else 400)
                 self.send_header('Content-Type', 'application/json')
+                self.send_header('Access-Control-Allow-Origin', '*')
                 self.end_headers()
                 self.wfile.write(json.dumps({
-                    'error': 'Pembayaran dengan NISN tersebut tidak ditemukan'
+                    'error': verify_result.get('message') or 'Pembayaran tidak ditemukan'
                 }).encode())
                 return
             
-            # Update payment status dengan field yang konsisten
-            update_data = {
-                'status_pembayaran': status,
-                'verified_by': data.get('verified_by', data.get('verifiedBy', 'admin')),
-                'catatan_admin': data.get('catatan_admin', ''),
-                'tanggal_verifikasi': 'now()',  # Set timestamp verifikasi
-                'updated_at': 'now()'           # Update timestamp
+            # Send success response
+            response_data = {
+                'message': f'Pembayaran berhasil di{status.lower()}',
+                'nisn': nisn,
+                'status': status,
+                'pembayaran': verify_result.get('pembayaran'),
+                'pendaftar': verify_result.get('pendaftar'),
             }
+            if verify_result.get('warning'):
+                response_data['warning'] = verify_result['warning']
             
-            result = supa.table('pembayaran').update(update_data).or_(f'nisn.eq.{nisn},nik.eq.{nisn}').execute()
-            
-            # Validasi hasil update
-            if not result.data:
-                self.send_response(404)
-                self.send_header('Content-Type', 'application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({
-                    'error': 'Pembayaran tidak ditemukan'
-                }).encode())
-                return
-            
-            # Jika pembayaran VERIFIED, update juga status pendaftar terkait
-            if status == 'VERIFIED':
-                try:
-                    # Update status pendaftar berdasarkan NISN
-                    pendaftar_update = {
-                        'statusberkas': 'DITERIMA',
-                        'verifiedby': data.get('verified_by', data.get('verifiedBy', 'admin')),
-                        'verifiedat': 'now()',
-                        'updatedat': 'now()'
-                    }
-                    
-                    supa.table('pendaftar').update(pendaftar_update).or_(f'nisn.eq.{nisn},nikcalon.eq.{nisn}').execute()
-                except Exception as e:
-                    # Jika terjadi error saat update pendaftar, log error tapi tidak menggagalkan request
-                    print(f"Warning: Gagal update status pendaftar: {str(e)}")
-            
-            # Send success response
             self.send_response(200)
             self.send_header('Content-Type', 'application/json')
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
-            self.wfile.write(json.dumps({
-                'message': f'Pembayaran berhasil di{status.lower()}',
-                'nisn': nisn,
-                'status': status
-            }).encode())
+            self.wfile.write(json.dumps(response_data, default=str).encode())
             
         except Exception as e:
             print(f"Error in pembayaran_verify: {str(e)}")
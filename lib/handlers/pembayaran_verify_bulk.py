@@ -0,0 +1,193 @@
+"""
+API Handler: verifikasi / tolak banyak pembayaran sekaligus.
+
+Utama: RPC verify_pembayaran_bulk (sql/create_rpc_verify_pembayaran_bulk.sql),
+satu UPDATE set-based per tabel dalam satu transaksi untuk seluruh item.
+Fallback tanpa RPC: satu UPDATE pembayaran (+ satu UPDATE pendaftar untuk
+VERIFIED) per kombinasi status & catatan, tetap set-based lewat filter in.().
+"""
+from http.server import BaseHTTPRequestHandler
+
+from lib._supabase import supabase_client, is_missing_function
+from ._crud_helpers import read_json_body, send_json, allow_cors
+
+VALID_STATUSES = ("VERIFIED", "REJECTED")
+MAX_ITEMS = 500
+
+CODE_MESSAGES = {
+    "invalid_identifier": "NISN / NIK kosong atau tidak valid",
+    "invalid_status": "Status harus VERIFIED atau REJECTED",
+    "duplicate": "NISN / NIK ganda dalam batch, hanya item terakhir yang diproses",
+    "pembayaran_not_found": "Pembayaran dengan NISN / NIK tersebut tidak ditemukan",
+}
+
+
+def normalize_items(body):
+    """
+    Body: { items: [ { nisn | nik | identifier, status?, catatan? } | "nisn", ... ],
+            status?, catatan?, verified_by? }
+    status / catatan di level body jadi default untuk item yang tidak mengisinya.
+    Return list item { identifier, status, catatan } (urut input).
+    """
+    if not isinstance(body, dict):
+        raise ValueError("Body harus berupa object JSON")
+    items = body.get("items")
+    if items is None:
+        items = body.get("nisn_list") or []
+    if not isinstance(items, list) or not items:
+        raise ValueError("items wajib berupa list dan tidak boleh kosong")
+    if len(items) > MAX_ITEMS:
+        raise ValueError(f"Maksimal {MAX_ITEMS} item per batch")
+
+    default_status = str(body.get("status") or "").strip().upper()
+    default_catatan = str(body.get("catatan_admin") or body.get("catatan") or "")
+
+    normalized = []
+    for item in items:
+        if not isinstance(item, dict):
+            item = {"identifier": item}
+        identifier = str(item.get("identifier") or item.get("nisn") or item.get("nik") or "").strip()
+        if identifier and not identifier.isalnum():
+            # Tetap dikirim sebagai item tidak valid agar hasil per item lengkap
+            identifier = ""
+        normalized.append({
+            "identifier": identifier,
+            "status": str(item.get("status") or default_status).strip().upper(),
+            "catatan": str(item.get("catatan_admin") or item.get("catatan") or default_catatan),
+        })
+    return normalized
+
+
+def _count_matches(rows, identifiers, fields):
+    """Jumlah baris hasil UPDATE per identifier (cocok di salah satu field)."""
+    counts = {identifier: 0 for identifier in identifiers}
+    for row in rows or []:
+        for field in fields:
+            value = str(row.get(field) or "").strip()
+            if value in counts:
+                counts[value] += 1
+                break
+    return counts
+
+
+def _verify_bulk_with_queries(supa, items, verified_by):
+    """Fallback tanpa RPC: UPDATE set-based per (status, catatan)."""
+    results = [
+        {"index": index, "identifier": item["identifier"], "status": item["status"],
+         "code": None, "pembayaran_count": 0, "pendaftar_count": 0}
+        for index, item in enumerate(items)
+    ]
+
+    # Item terakhir per identifier yang dipakai (sama dengan RPC)
+    latest = {}
+    for result in results:
+        if not result["identifier"]:
+            result["code"] = "invalid_identifier"
+        elif result["status"] not in VALID_STATUSES:
+            result["code"] = "invalid_status"
+        else:
+            previous = latest.get(result["identifier"])
+            if previous is not None:
+                previous["code"] = "duplicate"
+            latest[result["identifier"]] = result
+
+    groups = {}
+    for result in latest.values():
+        key = (result["status"], items[result["index"]]["catatan"])
+        groups.setdefault(key, []).append(result)
+
+    for (status, catatan), group in groups.items():
+        identifiers = [result["identifier"] for result in group]
+        values = ",".join(identifiers)
+        updated = supa.table("pembayaran").update({
+            "status_pembayaran": status,
+            "verified_by": verified_by,
+            "catatan_admin": catatan,
+            "tanggal_verifikasi": "now()",
+            "updated_at": "now()",
+        }).or_(f"nisn.in.({values}),nik.in.({values})").execute()
+        pembayaran_counts = _count_matches(updated.data, identifiers, ("nisn", "nik"))
+
+        found = [identifier for identifier in identifiers if pembayaran_counts[identifier]]
+        pendaftar_counts = {}
+        if status == "VERIFIED" and found:
+            found_values = ",".join(found)
+            pendaftar = supa.table("pendaftar").update({
+                "statusberkas": "DITERIMA",
+                "verifiedby": verified_by,
+                "verifiedat": "now()",
+                "updatedat": "now()",
+            }).or_(f"nisn.in.({found_values}),nikcalon.in.({found_values})").execute()
+            pendaftar_counts = _count_matches(pendaftar.data, found, ("nisn", "nikcalon"))
+
+        for result in group:
+            result["pembayaran_count"] = pembayaran_counts[result["identifier"]]
+            result["pendaftar_count"] = pendaftar_counts.get(result["identifier"], 0)
+            if not result["pembayaran_count"]:
+                result["code"] = "pembayaran_not_found"
+
+    for result in results:
+        result["ok"] = result["code"] is None
+    return results
+
+
+def verify_bulk(supa, items, verified_by="admin"):
+    """
+    Verifikasi batch. Return list hasil per item (urut input):
+    { index, identifier, status, ok, code, message, pembayaran_count, pendaftar_count }.
+    """
+    try:
+        rpc_result = supa.rpc("verify_pembayaran_bulk", {
+            "p_items": items,
+            "p_verified_by": verified_by or "admin",
+        }).execute()
+        results = rpc_result.data
+        if not isinstance(results, list):
+            raise RuntimeError(f"Hasil RPC verify_pembayaran_bulk tidak valid: {type(results)}")
+    except Exception as e:
+        # Fallback non-atomik hanya jika fungsi belum dibuat; error lain bisa
+        # terjadi setelah batch rollback / commit, jadi jangan diulang
+        if not is_missing_function(e):
+            raise
+        print(f"[PEMBAYARAN_VERIFY_BULK] RPC verify_pembayaran_bulk belum dibuat, pakai fallback: {e}")
+        results = _verify_bulk_with_queries(supa, items, verified_by or "admin")
+
+    for result in results:
+        result["message"] = CODE_MESSAGES.get(result.get("code")) if result.get("code") else None
+    return results
+
+
+class handler(BaseHTTPRequestHandler):
+    @staticmethod
+    def do_POST(request_handler):
+        """
+        POST /api/pembayaran_verify_bulk
+        Body: { items: [ { nisn, status?, catatan? }, ... ], status?: "VERIFIED" | "REJECTED",
+                catatan?, verified_by? }
+        Response: { ok: true, summary: { total, success, failed }, results: [...] }
+        Item gagal (tidak ditemukan, status salah, ganda) tidak membatalkan item lain.
+        """
+        try:
+            body = read_json_body(request_handler)
+            items = normalize_items(body)
+            verified_by = str(body.get("verified_by") or body.get("verifiedBy") or "admin")
+
+            supa = supabase_client(service_role=True)
+            results = verify_bulk(supa, items, verified_by)
+
+            success = sum(1 for result in results if result.get("ok"))
+            print(f"[PEMBAYARAN_VERIFY_BULK] {success}/{len(results)} item berhasil (by {verified_by})")
+            send_json(request_handler, 200, {
+                "ok": True,
+                "summary": {"total": len(results), "success": success, "failed": len(results) - success},
+                "results": results,
+            })
+        except ValueError as exc:
+            send_json(request_handler, 400, {"ok": False, "error": str(exc)})
+        except Exception as exc:
+            print(f"[PEMBAYARAN_VERIFY_BULK][POST] Error: {exc}")
+            send_json(request_handler, 500, {"ok": False, "error": f"Gagal verifikasi batch: {exc}"})
+
+    @staticmethod
+    def do_OPTIONS(request_handler):
+        allow_cors(request_handler, ["POST", "OPTIONS"])
@@ -2,8 +2,146 @@ from http.server import BaseHTTPRequestHandler
 import json
 import traceback
 from urllib.parse import parse_qs, urlparse
-from lib._supabase import supabase_client
-from typing import Any, Dict
+from lib._supabase import supabase_client, is_missing_function
+from lib.handlers._pagination import _quote
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+# Kolom identitas per tabel (pendaftar hanya menyimpan nikcalon, bukan nik)
+PENDAFTAR_ID_FIELDS = ("nisn", "nikcalon")
+PEMBAYARAN_ID_FIELDS = ("nisn", "nik")
+
+
+def _or_filter(fields, identifiers) -> str:
+    """Bangun filter or=(...) PostgREST: field.in.(a,b) untuk semua field (nilai di-quote & escape)."""
+    values = ",".join(_quote(value) for value in identifiers)
+    return ",".join(f"{field}.in.({values})" for field in fields)
+
+
+def _pick_best(rows: List[Dict[str, Any]], fields, identifiers) -> Optional[Dict[str, Any]]:
+    """
+    Pilih baris sesuai prioritas lama: field pertama yang cocok, lalu urutan kandidat.
+    None jika tidak ada baris yang identitasnya benar-benar sama dengan kandidat.
+    """
+    for field in fields:
+        for candidate in identifiers:
+            for row in rows:
+                if str(row.get(field) or "").strip() == candidate:
+                    return row
+    return None
+
+
+def _query_by_identifiers(supa, table: str, fields, identifiers, order_field: str) -> Optional[Dict[str, Any]]:
+    """Satu query OR untuk semua kombinasi field x kandidat (bukan loop per kombinasi)."""
+    if not identifiers:
+        return None
+    result = (
+        supa.table(table)
+        .select("*")
+        .or_(_or_filter(fields, identifiers))
+        .order(order_field, desc=True)
+        .limit(10)
+        .execute()
+    )
+    return _pick_best(result.data or [], fields, identifiers)
+
+
+def _lookup_with_queries(supa, identifiers) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """Fallback tanpa RPC: query pendaftar & pembayaran berjalan bersamaan."""
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        pendaftar_future = pool.submit(
+            _query_by_identifiers, supa, "pendaftar", PENDAFTAR_ID_FIELDS, identifiers, "updatedat"
+        )
+        pembayaran_future = pool.submit(
+            _query_by_identifiers, supa, "pembayaran", PEMBAYARAN_ID_FIELDS, identifiers, "updated_at"
+        )
+        row = pendaftar_future.result()
+        try:
+            pembayaran_row = pembayaran_future.result()
+        except Exception as e:
+            print(f"[CEK_STATUS] Warning: Error querying pembayaran: {e}")
+            pembayaran_row = None
+
+    if row is None:
+        return None, None
+
+    # Pendaftar bisa punya identitas lain (mis. ditemukan via nikcalon) → cek pembayaran sekali lagi
+    if pembayaran_row is None:
+        extra = [
+            str(row.get(field)).strip()
+            for field in PENDAFTAR_ID_FIELDS
+            if row.get(field) and str(row.get(field)).strip() not in identifiers
+        ]
+        if extra:
+            try:
+                pembayaran_row = _query_by_identifiers(
+                    supa, "pembayaran", PEMBAYARAN_ID_FIELDS, list(dict.fromkeys(extra)), "updated_at"
+                )
+            except Exception as e:
+                print(f"[CEK_STATUS] Warning: Error querying pembayaran: {e}")
+
+    return row, pembayaran_row
+
+
+def lookup_status_rows(supa, identifiers) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Cari pendaftar + pembayaran terbaru.
+    Utama: RPC `cek_status` (satu round trip, lihat sql/create_rpc_cek_status.sql).
+    Fallback: satu query OR per tabel, dijalankan paralel — hanya jika fungsi RPC
+    belum dibuat; error lain diteruskan ke caller.
+    """
+    try:
+        rpc_result = supa.rpc("cek_status", {"p_identifiers": identifiers}).execute()
+    except Exception as e:
+        if not is_missing_function(e):
+            raise
+        print(f"[CEK_STATUS] RPC cek_status belum dibuat, pakai fallback: {e}")
+        return _lookup_with_queries(supa, identifiers)
+    if isinstance(rpc_result.data, dict):
+        return rpc_result.data.get("pendaftar"), rpc_result.data.get("pembayaran")
+    raise RuntimeError(f"Hasil RPC cek_status tidak valid: {type(rpc_result.data)}")
+
+
+def build_pembayaran_payload(pembayaran_row: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Transform baris pembayaran ke format publik cek status."""
+    if not pembayaran_row:
+        return None
+    return {
+        "nisn": pembayaran_row.get("nisn", ""),
+        "nik": pembayaran_row.get("nik", ""),
+        "nama": pembayaran_row.get("nama") or pembayaran_row.get("nama_lengkap", ""),
+        "metode_pembayaran": pembayaran_row.get("metode_pembayaran", ""),
+        "jumlah": pembayaran_row.get("jumlah", 0),
+        "bukti_bayar_url": pembayaran_row.get("bukti_bayar_url") or pembayaran_row.get("bukti_pembayaran", ""),
+        "status_pembayaran": pembayaran_row.get("status_pembayaran", "PENDING"),
+        "verified_by": pembayaran_row.get("verified_by", ""),
+        "catatan_admin": pembayaran_row.get("catatan_admin", ""),
+        "tanggal_verifikasi": pembayaran_row.get("tanggal_verifikasi"),
+        "created_at": pembayaran_row.get("created_at"),
+        "updated_at": pembayaran_row.get("updated_at")
+    }
+
+
+def build_status_payload(row: Dict[str, Any], pembayaran_row: Optional[Dict[str, Any]], fallback_nisn: str = "") -> Dict[str, Any]:
+    """Transform baris pendaftar (+ pembayaran) ke format publik cek status."""
+    return {
+        "id": row.get("id"),
+        "nisn": row.get("nisn", "") or fallback_nisn,
+        "nik": row.get("nik"),
+        "nikcalon": row.get("nikcalon"),
+        "nama": row.get("namalengkap", ""),
+        "tanggalLahir": row.get("tanggallahir"),
+        "tempatLahir": row.get("tempatlahir"),
+        "status": row.get("statusberkas") or "PENDING",
+        "alasan": row.get("alasan"),  # Catatan admin
+        "verified_by": row.get("verifiedby"),
+        "verified_at": row.get("verifiedat"),
+        "created_at": row.get("createdat"),
+        "createdat": row.get("createdat"),  # Add both formats for compatibility
+        "updated_at": row.get("updatedat"),
+        "pembayaran": build_pembayaran_payload(pembayaran_row)  # Tambahkan data pembayaran
+    }
+
 
 class handler(BaseHTTPRequestHandler):
     @staticmethod
@@ -11,6 +149,9 @@ class handler(BaseHTTPRequestHandler):
         """
         GET /api/pendaftar_cek_status?nisn=1234567890
         Response: { ok: true, data: {...} | null }
+        
+        Jika snapshot statis (lib/status_snapshot.py) masih fresh, data diambil
+        dari snapshot tanpa query database.
         """
         def send_json(code: int, payload: Dict[str, Any]) -> None:
             """Send JSON response"""
@@ -68,33 +209,22 @@ class handler(BaseHTTPRequestHandler):
                     "detail": str(e)
                 })
 
-            identifiers = []
-            if normalized_nisn:
-                identifiers.append(normalized_nisn)
-            if raw_nisn and raw_nisn != normalized_nisn:
-                identifiers.append(raw_nisn)
-            identifiers = list(dict.fromkeys([candidate for candidate in identifiers if candidate]))
-
-            row = None
-            selected_identifier = None
-            search_fields = ("nisn", "nik", "nikcalon")
-            print(f"[CEK_STATUS] Searching pendaftar using identifiers={identifiers}")
-            for field in search_fields:
-                for candidate in identifiers:
-                    try:
-                        result = supa.table("pendaftar").select("*").eq(field, candidate).order("updatedat", desc=True).limit(1).execute()
-                    except Exception as e:
-                        print(f"[CEK_STATUS] Error querying pendaftar field={field} candidate={candidate}: {e}")
-                        traceback.print_exc()
-                        continue
-
-                    if result.data:
-                        row = result.data[0]
-                        selected_identifier = candidate
-                        print(f"[CEK_STATUS] Match found using field={field}, candidate={candidate}")
-                        break
-                if row is not None:
-                    break
+            # Hari pengumuman: layani dari snapshot statis selama masih fresh
+            try:
+                from lib import status_snapshot
+                served, snapshot_data = status_snapshot.lookup(supa, normalized_nisn)
+            except Exception as e:
+                print(f"[CEK_STATUS] Warning: snapshot tidak bisa dipakai: {e}")
+                served, snapshot_data = False, None
+            if served:
+                print(f"[CEK_STATUS] Served from snapshot (found={snapshot_data is not None})")
+                return send_json(200, {"ok": True, "data": snapshot_data, "source": "snapshot"})
+
+            # Hanya NISN 10 digit yang sudah divalidasi; nilai mentah tidak pernah masuk filter
+            identifiers = [normalized_nisn]
+
+            print(f"[CEK_STATUS] Searching pendaftar + pembayaran using identifiers={identifiers}")
+            row, pembayaran_row = lookup_status_rows(supa, identifiers)
 
             if row is None:
                 print("[CEK_STATUS] NISN tidak ditemukan")
@@ -104,76 +234,13 @@ class handler(BaseHTTPRequestHandler):
                 })
 
             print(f"[CEK_STATUS] Found data for: {row.get('namalengkap')}")
-            print(f"[CEK_STATUS] Catatan Admin (alasan): {row.get('alasan')}")
-
-            # Query data pembayaran juga
-            pembayaran_data = None
-            try:
-                payment_identifiers = identifiers.copy()
-                for field in search_fields:
-                    value = row.get(field)
-                    if value:
-                        payment_identifiers.append(str(value).strip())
-                payment_identifiers = list(dict.fromkeys([val for val in payment_identifiers if val]))
-
-                print(f"[CEK_STATUS] Searching pembayaran using identifiers={payment_identifiers}")
-                pembayaran_row = None
-                for field in ("nisn", "nik"):
-                    for candidate in payment_identifiers:
-                        try:
-                            pembayaran_result = supa.table("pembayaran").select("*").eq(field, candidate).order("updated_at", desc=True).limit(1).execute()
-                        except Exception as e:
-                            print(f"[CEK_STATUS] Error querying pembayaran field={field} candidate={candidate}: {e}")
-                            traceback.print_exc()
-                            continue
-
-                        if pembayaran_result.data:
-                            pembayaran_row = pembayaran_result.data[0]
-                            print(f"[CEK_STATUS] Pembayaran match using field={field}, candidate={candidate}")
-                            break
-                    if pembayaran_row is not None:
-                        break
-
-                if pembayaran_row:
-                    pembayaran_data = {
-                        "nisn": pembayaran_row.get("nisn", ""),
-                        "nik": pembayaran_row.get("nik", ""),
-                        "nama": pembayaran_row.get("nama") or pembayaran_row.get("nama_lengkap", ""),
-                        "metode_pembayaran": pembayaran_row.get("metode_pembayaran", ""),
-                        "jumlah": pembayaran_row.get("jumlah", 0),
-                        "bukti_bayar_url": pembayaran_row.get("bukti_bayar_url") or pembayaran_row.get("bukti_pembayaran", ""),
-                        "status_pembayaran": pembayaran_row.get("status_pembayaran", "PENDING"),
-                        "verified_by": pembayaran_row.get("verified_by", ""),
-                        "catatan_admin": pembayaran_row.get("catatan_admin", ""),
-                        "tanggal_verifikasi": pembayaran_row.get("tanggal_verifikasi"),
-                        "created_at": pembayaran_row.get("created_at"),
-                        "updated_at": pembayaran_row.get("updated_at")
-                    }
-                    print(f"[CEK_STATUS] Pembayaran found: status={pembayaran_data['status_pembayaran']}")
-                else:
-                    print("[CEK_STATUS] Pembayaran belum ada untuk NISN ini")
-            except Exception as e:
-                print(f"[CEK_STATUS] Warning: Error querying pembayaran: {e}")
-                # Continue even if pembayaran query fails
+            if pembayaran_row:
+                print(f"[CEK_STATUS] Pembayaran found: status={pembayaran_row.get('status_pembayaran', 'PENDING')}")
+            else:
+                print("[CEK_STATUS] Pembayaran belum ada untuk NISN ini")
 
             # Transform sesuai spec
-            data = {
-                "id": row.get("id"),
-                "nisn": row.get("nisn", "") or selected_identifier or normalized_nisn,
-                "nik": row.get("nik"),
-                "nikcalon": row.get("nikcalon"),
-                "nama": row.get("namalengkap", ""),
-                "tanggalLahir": row.get("tanggallahir"),
-                "tempatLahir": row.get("tempatlahir"),
-                "status": row.get("statusberkas") or "PENDING",
-                "alasan": row.get("alasan"),  # Catatan admin
-                "verified_by": row.get("verifiedby"),
-                "verified_at": row.get("verifiedat"),
-                "created_at": row.get("createdat"),
-                "createdat": row.get("createdat"),  # Add both formats for compatibility
-                "updated_at": row.get("updatedat"),
-                "pembayaran": pembayaran_data  # Tambahkan data pembayaran
-            }
+            data = build_status_payload(row, pembayaran_row, identifiers[0] if identifiers else normalized_nisn)
 
             print("[CEK_STATUS] Sending success response")
             return send_json(200, {"ok": True, "data": data})
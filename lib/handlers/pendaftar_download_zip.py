@@ -1,11 +1,20 @@
 from http.server import BaseHTTPRequestHandler
 import json
 from urllib.parse import parse_qs, urlparse
-from io import BytesIO
+import tempfile
 import zipfile
+import os
 import re
-from datetime import datetime, timedelta
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from lib._supabase import supabase_client
+from lib.deadline import Deadline
+from lib.export_filters import filters_from_params, filter_fn
+from lib.handlers._pagination import decode_cursor, encode_cursor, iter_rows
+from lib.storage_upload import upload_fileobj
+from lib import export_cache, file_index, zip_cache
 
 
 def slugify(text):
@@ -38,13 +47,412 @@ def detect_file_type(filename):
     return "Lainnya"
 
 
+# Format yang sudah terkompresi (JPEG/PNG/PDF, Office Open XML = ZIP) disimpan apa adanya;
+# deflate hanya untuk format yang memang masih bisa mengecil
+STORED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".pdf", ".docx", ".xlsx"}
+
+
+def compression_for(file_name):
+    """Pilih metode kompresi ZIP berdasarkan ekstensi file."""
+    ext = os.path.splitext(file_name.lower())[1]
+    return zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+
+def compression_summary(stats):
+    """Ringkasan kompresi untuk response: CPU yang dipakai dan byte yang dihemat."""
+    deflate_saved = stats["deflated_input_bytes"] - stats["deflated_output_bytes"]
+    return {
+        "stored_files": stats["stored_files"],
+        "stored_bytes": stats["stored_bytes"],
+        "deflated_files": stats["deflated_files"],
+        "deflated_bytes_saved": deflate_saved,
+        "deflate_cpu_sec": round(stats["deflate_cpu_sec"], 3),
+        "stored_cpu_sec": round(stats["stored_cpu_sec"], 3),
+        # Byte yang tidak perlu melewati deflate sama sekali
+        "bytes_skipped_compression": stats["stored_bytes"],
+    }
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# ZIP di-spool ke /tmp setelah melewati batas ini (memori tetap datar)
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+TEMP_DIR = "/tmp"
+
+# Jumlah worker paralel untuk list/download storage (override via ?concurrency=)
+DEFAULT_CONCURRENCY = _env_int("ZIP_CONCURRENCY", 8)
+MAX_CONCURRENCY = 32
+
+# ZIP parsial: pendaftar diproses per chunk, budget dicek di antara chunk.
+# Sisa waktu PARTIAL_RESERVE_SEC disisakan untuk upload part + signed URL.
+PARTIAL_CHUNK_SIZE = 25
+PARTIAL_RESERVE_SEC = 15
+
+
+def ordered_parallel(fn, items, workers):
+    """
+    Jalankan fn(item) di thread pool dengan jumlah in-flight terbatas,
+    yield (result, error) SESUAI URUTAN items (writer tetap deterministik).
+    Paling banyak workers*2 hasil ditahan di memori sekaligus.
+    """
+    def call(item):
+        try:
+            return fn(item), None
+        except Exception as e:
+            return None, e
+
+    items = list(items)
+    if workers <= 1:
+        for item in items:
+            yield call(item)
+        return
+
+    window = workers * 2
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        index = 0
+        while index < len(items) or pending:
+            while index < len(items) and len(pending) < window:
+                pending.append(pool.submit(call, items[index]))
+                index += 1
+            yield pending.popleft().result()
+
+
+# Image extensions for filtering
+IMAGE_EXTENSIONS = [".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp"]
+ALL_EXTENSIONS = IMAGE_EXTENSIONS + [".pdf", ".doc", ".docx", ".xlsx", ".xls"]
+
+
+def target_extensions_for(only_type):
+    """Ekstensi yang dimasukkan ke ZIP (?only=images → hanya gambar)."""
+    return IMAGE_EXTENSIONS if only_type == "images" else ALL_EXTENSIONS
+
+
+def create_download_url(supa, bucket, storage_path, expires_in=3600):
+    """Buat signed URL (fallback ke public URL) untuk file hasil export."""
+    signed_url_result = supa.storage.from_(bucket).create_signed_url(
+        path=storage_path,
+        expires_in=expires_in
+    )
+    
+    # Handle different response formats
+    if isinstance(signed_url_result, dict) and 'signedURL' in signed_url_result:
+        return signed_url_result['signedURL']
+    if isinstance(signed_url_result, dict) and 'signedUrl' in signed_url_result:
+        return signed_url_result['signedUrl']
+    if hasattr(signed_url_result, 'signed_url'):
+        return signed_url_result.signed_url
+    
+    # Fallback: construct public URL
+    print(f"[ZIP_DOWNLOAD] ⚠️ Unexpected signed_url format: {signed_url_result}")
+    return supa.storage.from_(bucket).get_public_url(storage_path)
+
+
+def cleanup_old_exports(supa, folder, max_age_hours=24):
+    """Hapus file export di temp-downloads/<folder> yang lebih tua dari max_age_hours (non-critical)."""
+    try:
+        print(f"[ZIP_DOWNLOAD] Cleaning up old export files in {folder}...")
+        old_files = supa.storage.from_("temp-downloads").list(path=folder)
+        
+        if isinstance(old_files, list):
+            files_list = old_files
+        elif hasattr(old_files, 'data'):
+            files_list = old_files.data or []
+        else:
+            files_list = []
+        
+        cutoff_time = datetime.now(timezone.utc) - timedelta(hours=max_age_hours)
+        files_to_delete = []
+        
+        for file_obj in files_list:
+            if not isinstance(file_obj, dict):
+                continue
+            
+            file_name = file_obj.get("name", "")
+            created_at = file_obj.get("created_at", "")
+            
+            if not file_name or not created_at:
+                continue
+            
+            try:
+                file_time = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+                if file_time.tzinfo is None:
+                    file_time = file_time.replace(tzinfo=timezone.utc)
+                if file_time < cutoff_time:
+                    files_to_delete.append(f"{folder}/{file_name}")
+            except ValueError:
+                continue
+        
+        if files_to_delete:
+            print(f"[ZIP_DOWNLOAD] Deleting {len(files_to_delete)} old files...")
+            try:
+                supa.storage.from_("temp-downloads").remove(files_to_delete)
+            except Exception as e:
+                print(f"[ZIP_DOWNLOAD]   ⚠️ Failed to delete old files: {e}")
+        else:
+            print("[ZIP_DOWNLOAD] No old files to clean up")
+    except Exception as e:
+        print(f"[ZIP_DOWNLOAD] ⚠️ Cleanup error (non-critical): {e}")
+
+
+def list_storage_files(supa, nisn):
+    """List file di folder NISN pada bucket pendaftar-files."""
+    storage_result = supa.storage.from_("pendaftar-files").list(path=nisn)
+    
+    # Handle different response formats
+    if isinstance(storage_result, list):
+        return storage_result
+    if hasattr(storage_result, 'data'):
+        return storage_result.data or []
+    if isinstance(storage_result, dict) and 'data' in storage_result:
+        return storage_result['data'] or []
+    return []
+
+
+def download_storage_file(supa, file_path):
+    """Download satu file dari bucket pendaftar-files."""
+    return supa.storage.from_("pendaftar-files").download(file_path)
+
+
+def new_zip_result():
+    """Akumulator hasil penulisan ZIP (dipakai write_zip / add_to_zip)."""
+    return {
+        "total_files": 0,
+        "success_count": 0,
+        "failed_files": [],
+        "skipped_pendaftar": [],
+        "compression_stats": {
+            "stored_files": 0,
+            "stored_bytes": 0,
+            "stored_cpu_sec": 0.0,
+            "deflated_files": 0,
+            "deflated_input_bytes": 0,
+            "deflated_output_bytes": 0,
+            "deflate_cpu_sec": 0.0,
+        },
+        "cache_stats": {"hits": 0, "misses": 0, "files_from_cache": 0},
+    }
+
+
+def _write_member(zip_file, zip_path, file_bytes, result):
+    """Tulis satu entry ke ZIP utama (STORED/DEFLATED sesuai ekstensi) + catat statistik."""
+    compression_stats = result["compression_stats"]
+    compress_type = compression_for(zip_path)
+    cpu_start = time.thread_time()
+    zip_file.writestr(zip_path, file_bytes, compress_type=compress_type)
+    info = zip_file.infolist()[-1]
+    if compress_type == zipfile.ZIP_STORED:
+        compression_stats["stored_files"] += 1
+        compression_stats["stored_bytes"] += info.file_size
+        compression_stats["stored_cpu_sec"] += time.thread_time() - cpu_start
+    else:
+        compression_stats["deflated_files"] += 1
+        compression_stats["deflated_input_bytes"] += info.file_size
+        compression_stats["deflated_output_bytes"] += info.compress_size
+        compression_stats["deflate_cpu_sec"] += time.thread_time() - cpu_start
+    result["success_count"] += 1
+
+
+def _download_applicant(supa, unit):
+    """
+    Berkas satu pendaftar untuk mode cache: sub-arsip cache jika fingerprint sama,
+    kalau tidak unduh tiap berkas lalu simpan sub-arsip baru (hanya jika lengkap).
+    Return (members [(zip_path, bytes)], errors [(job, pesan)], from_cache).
+    """
+    members = zip_cache.load_members(supa, unit["cache_path"])
+    if members is not None:
+        return members, [], True
+
+    members = []
+    errors = []
+    for job in unit["jobs"]:
+        try:
+            file_bytes = download_storage_file(supa, job["file_path"])
+        except Exception as e:
+            errors.append((job, f"error: {str(e)[:50]}"))
+            continue
+        if not file_bytes:
+            errors.append((job, "empty"))
+            continue
+        members.append((job["zip_path"], file_bytes))
+
+    if members and not errors:
+        zip_cache.store_members(supa, unit["nisn"], unit["cache_path"], members)
+    return members, errors, False
+
+
+# Sumber daftar berkas: "db" = kolom file_* (lib/file_index.py, tanpa round trip),
+# "storage" = storage.list per NISN (mode verifikasi, juga menangkap berkas tak tercatat)
+FILE_SOURCES = ("db", "storage")
+
+
+def add_to_zip(supa, zip_file, pendaftar_list, target_extensions, concurrency, result, use_cache=False, source="db"):
+    """
+    Tambahkan berkas pendaftar_list ke zip_file yang sudah terbuka, akumulasi ke result.
+    Phase 1: daftar berkas dari kolom file_* (source="db", baris harus berisi
+    file_index.INDEX_COLUMNS) atau list storage paralel (source="storage").
+    Phase 2: download paralel (bounded),
+    satu writer menulis entry ZIP sesuai urutan pendaftar → isi arsip deterministik.
+    use_cache=True: Phase 2 per pendaftar lewat cache sub-arsip (lib/zip_cache.py),
+    jadi export berulang hanya mengunduh ulang pendaftar yang berkasnya berubah.
+    """
+    failed_files = result["failed_files"]
+    download_jobs = []
+    units = []
+
+    # Phase 1: daftar berkas semua pendaftar (hasil tetap berurutan)
+    listable = []
+    for pendaftar in pendaftar_list:
+        nisn = pendaftar.get("nisn", "")
+        nama = pendaftar.get("namalengkap", "Unknown")
+        if not nisn:
+            print(f"[ZIP_DOWNLOAD]   ⚠️ Skipping {nama} - no NISN")
+            result["skipped_pendaftar"].append(f"{nama} (no NISN)")
+            continue
+        listable.append(pendaftar)
+
+    if source == "storage":
+        listings = ordered_parallel(
+            lambda p: list_storage_files(supa, p.get("nisn", "")),
+            listable,
+            concurrency,
+        )
+    else:
+        listings = ((file_index.files_for_row(p), None) for p in listable)
+    for pendaftar, (storage_files, list_error) in zip(listable, listings):
+        nisn = pendaftar.get("nisn", "")
+        nama = pendaftar.get("namalengkap", "Unknown")
+        slug_name = slugify(nama)
+
+        if list_error is not None:
+            print(f"[ZIP_DOWNLOAD]   ❌ Error listing files for {nisn}: {list_error}")
+            failed_files.append(f"{nama} (list error: {str(list_error)})")
+            continue
+
+        jobs = []
+        signatures = []
+        for file_obj in storage_files:
+            if not isinstance(file_obj, dict):
+                continue
+
+            file_name = file_obj.get("name", "")
+            if not file_name:
+                continue
+
+            # Check if file type matches filter
+            if not any(file_name.lower().endswith(ext) for ext in target_extensions):
+                continue
+
+            result["total_files"] += 1
+            folder = file_obj.get("type") or detect_file_type(file_name)
+            signatures.append(zip_cache.file_signature(file_obj))
+            jobs.append({
+                "nama": nama,
+                "folder": folder,
+                "file_name": file_name,
+                "file_path": file_obj.get("path") or f"{nisn}/{file_name}",
+                "zip_path": f"{slug_name}/{folder}/{file_name}",
+            })
+
+        download_jobs.extend(jobs)
+        if use_cache and jobs:
+            fingerprint = zip_cache.listing_fingerprint(slug_name, signatures)
+            units.append({
+                "nisn": nisn,
+                "jobs": jobs,
+                "cache_path": zip_cache.cache_path(nisn, fingerprint),
+            })
+
+    print(f"[ZIP_DOWNLOAD] ✓ Listing done, {len(download_jobs)} files to download")
+
+    if use_cache:
+        # Phase 2 (cache): satu unit = satu pendaftar, hasil tetap berurutan
+        cache_stats = result["cache_stats"]
+        downloads = ordered_parallel(lambda unit: _download_applicant(supa, unit), units, concurrency)
+        for unit, (outcome, unit_error) in zip(units, downloads):
+            if unit_error is not None:
+                print(f"[ZIP_DOWNLOAD]   ❌ Error downloading files for {unit['nisn']}: {unit_error}")
+                failed_files.extend(
+                    f"{job['nama']}/{job['folder']}/{job['file_name']} (error: {str(unit_error)[:50]})"
+                    for job in unit["jobs"]
+                )
+                continue
+
+            members, errors, from_cache = outcome
+            if from_cache:
+                cache_stats["hits"] += 1
+                cache_stats["files_from_cache"] += len(members)
+            else:
+                cache_stats["misses"] += 1
+            for zip_path, file_bytes in members:
+                _write_member(zip_file, zip_path, file_bytes, result)
+            for job, reason in errors:
+                print(f"[ZIP_DOWNLOAD]   ❌ Error adding {job['file_path']} to ZIP: {reason}")
+                failed_files.append(f"{job['nama']}/{job['folder']}/{job['file_name']} ({reason})")
+        return result
+
+    # Phase 2: download paralel (bounded), satu writer menulis ZIP sesuai urutan job
+    downloads = ordered_parallel(
+        lambda job: download_storage_file(supa, job["file_path"]),
+        download_jobs,
+        concurrency,
+    )
+    for job, (file_bytes, download_error) in zip(download_jobs, downloads):
+        label = f"{job['nama']}/{job['folder']}/{job['file_name']}"
+        if download_error is not None:
+            print(f"[ZIP_DOWNLOAD]   ❌ Error adding {job['file_path']} to ZIP: {download_error}")
+            failed_files.append(f"{label} (error: {str(download_error)[:50]})")
+            continue
+
+        if not file_bytes:
+            print(f"[ZIP_DOWNLOAD]   ⚠️ Empty file: {job['file_name']}")
+            failed_files.append(f"{label} (empty)")
+            continue
+
+        _write_member(zip_file, job["zip_path"], file_bytes, result)
+
+    return result
+
+
+def write_zip(supa, pendaftar_list, target_extensions, concurrency, fileobj, use_cache=False, source="db"):
+    """Tulis berkas semua pendaftar ke ZIP baru di fileobj, return ringkasan hasil."""
+    result = new_zip_result()
+    with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        add_to_zip(supa, zip_file, pendaftar_list, target_extensions, concurrency, result, use_cache, source)
+    return result
+
+
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
         """
-        GET /api/pendaftar_download_zip?only=all&status=verified
+        GET /api/pendaftar_download_zip?only=all&status=DITERIMA&gelombang=1&concurrency=8
         
         Response: JSON with signed download URL (expires in 1 hour)
         
+        ZIP parsial (deadline-aware):
+        - pendaftar diproses per chunk; jika time budget (EXPORT_TIME_BUDGET_SEC,
+          maks maxDuration 60 detik) hampir habis, proses berhenti rapi dan yang
+          sudah jadi di-upload sebagai part N
+        - response berisi continuation_token + next_pendaftar; panggil lagi dengan
+          ?continue=<token>&part=N+1 (filter yang sama) untuk part berikutnya
+        - continuation_token null = semua pendaftar sudah masuk
+        
+        Cache sub-arsip per pendaftar (default aktif, ?cache=0 untuk menonaktifkan):
+        pendaftar yang listing berkasnya tidak berubah diambil dari
+        temp-downloads/zip-cache, hanya yang berubah diunduh & dibangun ulang
+        
+        Cache export: ZIP lengkap disimpan per data version (jumlah pendaftar +
+        max(updatedat) + filter + only/source); request ulang tanpa perubahan data
+        langsung mendapat signed URL yang sama (cached=true). ?force=1 → bangun ulang.
+        
+        Daftar berkas diambil dari kolom file_* (satu query, tanpa storage.list).
+        ?source=storage → list storage per NISN (verifikasi / berkas yang tidak tercatat)
+        
         SETUP REQUIRED:
         - Create Supabase Storage bucket: "temp-downloads" 
         - Set bucket to PUBLIC or enable signed URLs
@@ -68,38 +476,109 @@ class handler(BaseHTTPRequestHandler):
             status_filter = (params.get("status", [""])[0] or "").strip()
             date_from = (params.get("date_from", [""])[0] or "").strip()
             date_to = (params.get("date_to", [""])[0] or "").strip()
+            gelombang = (params.get("gelombang", [""])[0] or "").strip()
+            continuation_token = (params.get("continue", [""])[0] or "").strip()
+            use_cache = (params.get("cache", ["1"])[0] or "1").strip().lower() not in ("0", "false", "no")
+            force = (params.get("force", [""])[0] or "").strip().lower() in ("1", "true")
+            source = (params.get("source", ["db"])[0] or "db").strip().lower()
+            if source not in FILE_SOURCES:
+                source = "db"
+            deadline = Deadline()
+            
+            try:
+                part = max(1, int(params.get("part", ["1"])[0]))
+            except (TypeError, ValueError):
+                part = 1
+            
+            try:
+                concurrency = int(params.get("concurrency", [DEFAULT_CONCURRENCY])[0])
+            except (TypeError, ValueError):
+                concurrency = DEFAULT_CONCURRENCY
+            concurrency = max(1, min(MAX_CONCURRENCY, concurrency))
             
-            print(f"[ZIP_DOWNLOAD] Filters: only={only_type}, status={status_filter}, date_from={date_from}, date_to={date_to}")
+            print(f"[ZIP_DOWNLOAD] Filters: only={only_type}, status={status_filter}, date_from={date_from}, date_to={date_to}, gelombang={gelombang}, part={part}")
 
             # Get Supabase client with SERVICE_ROLE
             print("[ZIP_DOWNLOAD] Initializing Supabase client...")
             supa = supabase_client(service_role=True)
             print("[ZIP_DOWNLOAD] ✓ Supabase client initialized")
 
-            # Build query for pendaftar
-            query = supa.table("pendaftar").select("*")
-            
-            # Apply filters
-            if status_filter in ["pending", "verified", "rejected"]:
-                query = query.eq("status", status_filter)
-            
-            if date_from:
-                query = query.gte("created_at", date_from)
-            
-            if date_to:
-                query = query.lte("created_at", date_to)
+            # Filter export (gelombang → rentang tanggal)
+            try:
+                filters = filters_from_params(supa, {
+                    "status": status_filter,
+                    "date_from": date_from,
+                    "date_to": date_to,
+                    "gelombang": gelombang,
+                })
+            except ValueError as e:
+                self.send_response(400)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.end_headers()
+                self.wfile.write(json.dumps({"ok": False, "error": str(e)}).encode())
+                return
+            apply_filters = filter_fn(filters)
+
+            # Cache export utuh per data version (hanya untuk request part pertama)
+            cache_path = None
+            version = None
+            if not continuation_token and part == 1:
+                version = export_cache.data_version(supa, apply_filters)
+                cache_path = export_cache.cache_path(
+                    "semua-berkas", "zip", "zip", {"only": only_type, "source": source}, filters, version
+                )
+                cached_url = None if force else export_cache.cached_url(supa, cache_path, create_download_url)
+                if cached_url:
+                    print(f"[ZIP_DOWNLOAD] ✓ Cache hit: {cache_path} (version={version})")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Access-Control-Allow-Origin", "*")
+                    self.end_headers()
+                    self.wfile.write(json.dumps({
+                        "ok": True,
+                        "download_url": cached_url,
+                        "filename": cache_path.rsplit("/", 1)[-1],
+                        "cached": True,
+                        "data_version": version,
+                        "expires_in": "1 hour",
+                        "part": 1,
+                        "partial": False,
+                        "continuation_token": None,
+                        "next_pendaftar": None,
+                        "message": "ZIP diambil dari cache (data tidak berubah sejak export terakhir)",
+                    }).encode())
+                    return
+
+            if continuation_token:
+                try:
+                    _, resume_id = decode_cursor(continuation_token)
+                except ValueError:
+                    self.send_response(400)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Access-Control-Allow-Origin", "*")
+                    self.end_headers()
+                    self.wfile.write(
+                        json.dumps({"ok": False, "error": "continuation token tidak valid"}).encode()
+                    )
+                    return
+                base_filters = apply_filters
+                apply_filters = lambda query: base_filters(query).gte("id", resume_id)
             
-            # Execute query
+            # Ambil pendaftar per chunk (keyset id ASC → tidak terpotong max-rows PostgREST,
+            # urutan id membuat continuation token stabil antar part)
             print("[ZIP_DOWNLOAD] Querying pendaftar table...")
             try:
-                pendaftar_result = query.order("namalengkap").execute()
+                pendaftar_rows = list(iter_rows(
+                    supa, "pendaftar", file_index.INDEX_COLUMNS, apply_filters=apply_filters
+                ))
             except Exception as e:
                 print(f"[ZIP_DOWNLOAD] ❌ Error querying database: {e}")
                 raise Exception(f"Database query failed: {str(e)}")
 
-            print(f"[ZIP_DOWNLOAD] ✓ Query successful, found {len(pendaftar_result.data) if pendaftar_result.data else 0} pendaftar")
+            print(f"[ZIP_DOWNLOAD] ✓ Query successful, found {len(pendaftar_rows)} pendaftar")
 
-            if not pendaftar_result.data:
+            if not pendaftar_rows:
                 print("[ZIP_DOWNLOAD] ⚠️ No pendaftar found with current filters")
                 self.send_response(404)
                 self.send_header("Content-Type", "application/json")
@@ -110,114 +589,51 @@ class handler(BaseHTTPRequestHandler):
                 )
                 return
 
-            pendaftar_list = pendaftar_result.data
-            
-            # Image extensions for filtering
-            image_extensions = [".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp"]
-            all_extensions = image_extensions + [".pdf", ".doc", ".docx", ".xlsx", ".xls"]
+            pendaftar_list = pendaftar_rows
             
             # Determine which extensions to include
-            target_extensions = image_extensions if only_type == "images" else all_extensions
-
-            # Create ZIP in memory with streaming
-            print("[ZIP_DOWNLOAD] Creating ZIP file...")
-            zip_buffer = BytesIO()
-            total_files = 0
-            success_count = 0
-            failed_files = []
-            skipped_pendaftar = []
-            
+            target_extensions = target_extensions_for(only_type)
+
+            # Arsip ditulis ke spooled temp file (/tmp), bukan BytesIO + getvalue()
+            # Per chunk: berhenti sebelum budget habis, sisa pendaftar → part berikutnya
+            print(f"[ZIP_DOWNLOAD] Creating ZIP file (concurrency={concurrency}, budget={deadline.budget_sec:.0f}s)...")
+            zip_buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY, dir=TEMP_DIR)
+            zip_result = new_zip_result()
+            processed_count = 0
             with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                for idx, pendaftar in enumerate(pendaftar_list, 1):
-                    nisn = pendaftar.get("nisn", "")
-                    nama = pendaftar.get("namalengkap", "Unknown")
-                    slug_name = slugify(nama)
-                    
-                    print(f"[ZIP_DOWNLOAD] [{idx}/{len(pendaftar_list)}] Processing: {nama} (NISN: {nisn})")
-                    
-                    if not nisn:
-                        print(f"[ZIP_DOWNLOAD]   ⚠️ Skipping {nama} - no NISN")
-                        skipped_pendaftar.append(f"{nama} (no NISN)")
-                        continue
-                    
-                    # List files from storage for this pendaftar
-                    try:
-                        print(f"[ZIP_DOWNLOAD]   → Listing files from storage path: {nisn}")
-                        storage_result = supa.storage.from_("pendaftar-files").list(path=nisn)
-                        
-                        # Handle different response formats
-                        if isinstance(storage_result, list):
-                            storage_files = storage_result
-                        elif hasattr(storage_result, 'data'):
-                            storage_files = storage_result.data or []
-                        elif isinstance(storage_result, dict) and 'data' in storage_result:
-                            storage_files = storage_result['data'] or []
-                        else:
-                            storage_files = []
-                        
-                        print(f"[ZIP_DOWNLOAD]   → Found {len(storage_files)} files")
-                        
-                    except Exception as e:
-                        print(f"[ZIP_DOWNLOAD]   ❌ Error listing files for {nisn}: {e}")
-                        failed_files.append(f"{nama} (list error: {str(e)})")
-                        continue
-                    
-                    # Process each file
-                    for file_obj in storage_files:
-                        if not isinstance(file_obj, dict):
-                            print(f"[ZIP_DOWNLOAD]   ⚠️ Skipping non-dict file object: {type(file_obj)}")
-                            continue
-                        
-                        file_name = file_obj.get("name", "")
-                        
-                        if not file_name:
-                            print(f"[ZIP_DOWNLOAD]   ⚠️ Skipping file with no name")
-                            continue
-                        
-                        # Check if file type matches filter
-                        if not any(file_name.lower().endswith(ext) for ext in target_extensions):
-                            print(f"[ZIP_DOWNLOAD]   ⊘ Skipping {file_name} (not in target extensions)")
-                            continue
-                        
-                        total_files += 1
-                        
-                        # Determine folder
-                        folder = detect_file_type(file_name)
-                        
-                        # Build file path
-                        file_path = f"{nisn}/{file_name}"
-                        zip_path = f"{slug_name}/{folder}/{file_name}"
-                        
-                        try:
-                            print(f"[ZIP_DOWNLOAD]   ↓ Downloading {file_name}...")
-                            # Download file from storage
-                            file_bytes = supa.storage.from_("pendaftar-files").download(file_path)
-                            
-                            if not file_bytes:
-                                print(f"[ZIP_DOWNLOAD]   ⚠️ Empty file: {file_name}")
-                                failed_files.append(f"{nama}/{folder}/{file_name} (empty)")
-                                continue
-                            
-                            # Add to ZIP
-                            zip_file.writestr(zip_path, file_bytes)
-                            success_count += 1
-                            print(f"[ZIP_DOWNLOAD]   ✓ Added to ZIP: {zip_path} ({len(file_bytes)} bytes)")
-                            
-                        except Exception as e:
-                            print(f"[ZIP_DOWNLOAD]   ❌ Error adding {file_path} to ZIP: {e}")
-                            failed_files.append(f"{nama}/{folder}/{file_name} (error: {str(e)[:50]})")
-                            # Continue with other files
+                while processed_count < len(pendaftar_list):
+                    chunk = pendaftar_list[processed_count:processed_count + PARTIAL_CHUNK_SIZE]
+                    add_to_zip(supa, zip_file, chunk, target_extensions, concurrency, zip_result, use_cache, source)
+                    processed_count += len(chunk)
+                    if deadline.expired(PARTIAL_RESERVE_SEC):
+                        break
+            
+            next_pendaftar = None
+            next_token = None
+            if processed_count < len(pendaftar_list):
+                next_row = pendaftar_list[processed_count]
+                next_pendaftar = {"id": next_row.get("id"), "nama": next_row.get("namalengkap", "")}
+                next_token = encode_cursor(next_row.get("namalengkap") or "", next_row.get("id"))
+                print(f"[ZIP_DOWNLOAD] ⏱️ Time budget low after {deadline.elapsed():.1f}s, next part starts at {next_pendaftar}")
+            
+            total_files = zip_result["total_files"]
+            success_count = zip_result["success_count"]
+            failed_files = zip_result["failed_files"]
+            skipped_pendaftar = zip_result["skipped_pendaftar"]
+            compression_stats = zip_result["compression_stats"]
 
             print(f"[ZIP_DOWNLOAD] ========================================")
             print(f"[ZIP_DOWNLOAD] ZIP Creation Summary:")
-            print(f"[ZIP_DOWNLOAD]   Total pendaftar: {len(pendaftar_list)}")
+            print(f"[ZIP_DOWNLOAD]   Total pendaftar: {len(pendaftar_list)} (processed in this part: {processed_count})")
             print(f"[ZIP_DOWNLOAD]   Skipped pendaftar: {len(skipped_pendaftar)}")
             print(f"[ZIP_DOWNLOAD]   Total files found: {total_files}")
             print(f"[ZIP_DOWNLOAD]   Successfully added: {success_count}")
+            print(f"[ZIP_DOWNLOAD]   Compression: {compression_summary(compression_stats)}")
+            print(f"[ZIP_DOWNLOAD]   Cache: {zip_result['cache_stats'] if use_cache else 'disabled'}")
             print(f"[ZIP_DOWNLOAD]   Failed: {len(failed_files)}")
             print(f"[ZIP_DOWNLOAD] ========================================")
             
-            if success_count == 0:
+            if success_count == 0 and next_token is None:
                 print("[ZIP_DOWNLOAD] ❌ No files successfully downloaded")
                 if failed_files:
                     print(f"[ZIP_DOWNLOAD] Failed files (first 5): {failed_files[:5]}")
@@ -240,53 +656,50 @@ class handler(BaseHTTPRequestHandler):
 
             # Get ZIP data
             print("[ZIP_DOWNLOAD] Preparing ZIP data for upload to storage...")
+            zip_buffer.seek(0, 2)
+            zip_size = zip_buffer.tell()
             zip_buffer.seek(0)
-            zip_data = zip_buffer.getvalue()
             
-            zip_size_mb = len(zip_data) / 1024 / 1024
-            print(f"[ZIP_DOWNLOAD] ZIP size: {len(zip_data)} bytes ({zip_size_mb:.2f} MB)")
+            zip_size_mb = zip_size / 1024 / 1024
+            print(f"[ZIP_DOWNLOAD] ZIP size: {zip_size} bytes ({zip_size_mb:.2f} MB)")
 
             # Generate unique filename with timestamp
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"semua-berkas_{timestamp}.zip"
+            if part == 1 and next_token is None:
+                filename = f"semua-berkas_{timestamp}.zip"
+            else:
+                filename = f"semua-berkas_{timestamp}_part-{part}.zip"
             storage_path = f"exports/{filename}"
+            if cache_path and next_token is None and not failed_files:
+                # ZIP lengkap dalam satu part tanpa berkas gagal → simpan sebagai cache data version ini
+                storage_path = cache_path
+            elif cache_path and failed_files:
+                print(f"[ZIP_DOWNLOAD] ⚠️ {len(failed_files)} berkas gagal, ZIP tidak disimpan sebagai cache")
 
             # Upload to Supabase Storage (temp bucket)
             print(f"[ZIP_DOWNLOAD] Uploading ZIP to storage: {storage_path}")
             try:
-                # Upload file to storage bucket "temp-downloads"
-                upload_result = supa.storage.from_("temp-downloads").upload(
-                    path=storage_path,
-                    file=zip_data,
-                    file_options={
-                        "content-type": "application/zip",
-                        "cache-control": "3600"
-                    }
+                # Upload file to storage bucket "temp-downloads" (per chunk untuk file besar)
+                upload_fileobj(
+                    supa,
+                    "temp-downloads",
+                    storage_path,
+                    zip_buffer,
+                    content_type="application/zip",
+                    cache_control="3600",
+                    upsert=True,
                 )
-                print(f"[ZIP_DOWNLOAD] ✓ Upload successful: {upload_result}")
+                print(f"[ZIP_DOWNLOAD] ✓ Upload successful: {storage_path}")
             except Exception as e:
                 print(f"[ZIP_DOWNLOAD] ❌ Upload failed: {e}")
                 raise Exception(f"Failed to upload ZIP to storage: {str(e)}")
+            finally:
+                zip_buffer.close()
 
             # Generate signed URL (expires in 1 hour)
             print(f"[ZIP_DOWNLOAD] Generating signed URL...")
             try:
-                signed_url_result = supa.storage.from_("temp-downloads").create_signed_url(
-                    path=storage_path,
-                    expires_in=3600  # 1 hour
-                )
-                
-                # Handle different response formats
-                if isinstance(signed_url_result, dict) and 'signedURL' in signed_url_result:
-                    download_url = signed_url_result['signedURL']
-                elif isinstance(signed_url_result, dict) and 'signedUrl' in signed_url_result:
-                    download_url = signed_url_result['signedUrl']
-                elif hasattr(signed_url_result, 'signed_url'):
-                    download_url = signed_url_result.signed_url
-                else:
-                    # Fallback: construct public URL
-                    print(f"[ZIP_DOWNLOAD] ⚠️ Unexpected signed_url format: {signed_url_result}")
-                    download_url = supa.storage.from_("temp-downloads").get_public_url(storage_path)
+                download_url = create_download_url(supa, "temp-downloads", storage_path, 3600)
                 
                 print(f"[ZIP_DOWNLOAD] ✓ Signed URL generated: {download_url[:100]}...")
             except Exception as e:
@@ -294,49 +707,11 @@ class handler(BaseHTTPRequestHandler):
                 raise Exception(f"Failed to generate download URL: {str(e)}")
 
             # Cleanup old files (older than 24 hours)
-            try:
-                print("[ZIP_DOWNLOAD] Cleaning up old export files...")
-                old_files = supa.storage.from_("temp-downloads").list(path="exports")
-                
-                if isinstance(old_files, list):
-                    files_list = old_files
-                elif hasattr(old_files, 'data'):
-                    files_list = old_files.data or []
-                else:
-                    files_list = []
-                
-                cutoff_time = datetime.now() - timedelta(hours=24)
-                files_to_delete = []
-                
-                for file_obj in files_list:
-                    if not isinstance(file_obj, dict):
-                        continue
-                    
-                    file_name = file_obj.get("name", "")
-                    created_at = file_obj.get("created_at", "")
-                    
-                    if not file_name or not created_at:
-                        continue
-                    
-                    try:
-                        file_time = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                        if file_time < cutoff_time:
-                            files_to_delete.append(f"exports/{file_name}")
-                    except:
-                        continue
-                
-                if files_to_delete:
-                    print(f"[ZIP_DOWNLOAD] Deleting {len(files_to_delete)} old files...")
-                    for old_file in files_to_delete:
-                        try:
-                            supa.storage.from_("temp-downloads").remove([old_file])
-                            print(f"[ZIP_DOWNLOAD]   ✓ Deleted: {old_file}")
-                        except Exception as e:
-                            print(f"[ZIP_DOWNLOAD]   ⚠️ Failed to delete {old_file}: {e}")
-                else:
-                    print("[ZIP_DOWNLOAD] No old files to clean up")
-            except Exception as e:
-                print(f"[ZIP_DOWNLOAD] ⚠️ Cleanup error (non-critical): {e}")
+            cleanup_old_exports(supa, "exports")
+            cleanup_old_exports(supa, export_cache.FOLDER)
+            zip_cache.cleanup_expired(supa)
+            from lib.export_jobs import cleanup_expired_jobs
+            cleanup_expired_jobs(supa)
 
             # Return JSON with download URL
             print(f"[ZIP_DOWNLOAD] ========================================")
@@ -364,13 +739,25 @@ class handler(BaseHTTPRequestHandler):
                     "ok": True,
                     "download_url": download_url,
                     "filename": filename,
-                    "size_bytes": len(zip_data),
+                    "size_bytes": zip_size,
+                    "compression": compression_summary(compression_stats),
+                    "cache": zip_result["cache_stats"] if use_cache else None,
+                    "file_source": source,
+                    "cached": False,
+                    "data_version": version,
                     "size_mb": round(zip_size_mb, 2),
                     "total_files": total_files,
                     "success_count": success_count,
                     "failed_count": len(failed_files),
                     "expires_in": "1 hour",
+                    "part": part,
+                    "partial": next_token is not None,
+                    "processed_pendaftar": processed_count,
+                    "remaining_pendaftar": len(pendaftar_list) - processed_count,
+                    "continuation_token": next_token,
+                    "next_pendaftar": next_pendaftar,
                     "message": f"ZIP berhasil dibuat! {success_count} file dari {total_files}"
+                    + (f" (part {part}, lanjut dari {next_pendaftar['nama']})" if next_pendaftar else "")
                 }).encode()
             )
 
@@ -2,6 +2,7 @@ from http.server import BaseHTTPRequestHandler
 import json
 from urllib.parse import parse_qs, urlparse
 from lib._supabase import supabase_client
+from lib import file_index
 
 
 class handler(BaseHTTPRequestHandler):
@@ -9,12 +10,18 @@ class handler(BaseHTTPRequestHandler):
         """
         GET /api/pendaftar_files_list?nisn=1234567890
         Response: { ok: true, files: [...], pendaftar: {...} }
+        
+        Berkas dibaca dari kolom file_* pendaftar (tanpa storage.list).
+        ?verify=1 → sertakan "verification" (hasil cocokkan dengan listing storage)
+        ?repair=1 → seperti verify, dan isi kolom file_* yang kosong dari storage
         """
         try:
             # Parse query parameters
             parsed = urlparse(self.path)
             params = parse_qs(parsed.query)
             nisn = (params.get("nisn", [""])[0] or "").strip()
+            repair = (params.get("repair", [""])[0] or "").strip() in ("1", "true")
+            verify = (params.get("verify", [""])[0] or "").strip() in ("1", "true")
 
             if not nisn:
                 self.send_response(400)
@@ -29,10 +36,10 @@ class handler(BaseHTTPRequestHandler):
             # Get Supabase client with service role for storage access
             supa = supabase_client(service_role=True)
 
-            # Get pendaftar data
+            # Get pendaftar data (kolom file_* = index berkas)
             pendaftar_result = (
                 supa.table("pendaftar")
-                .select("*")
+                .select(f"{file_index.INDEX_COLUMNS},nikcalon")
                 .eq("nisn", nisn)
                 .execute()
             )
@@ -49,68 +56,73 @@ class handler(BaseHTTPRequestHandler):
 
             pendaftar = pendaftar_result.data[0]
 
-            # List all files in the NISN folder from storage
-            try:
-                storage_files = supa.storage.from_("pendaftar-files").list(path=nisn)
-                print(f"Storage files for {nisn}:", storage_files)
-            except Exception as e:
-                print(f"Error listing storage files: {e}")
-                storage_files = []
+            # Default: daftar berkas dari kolom file_* (tanpa storage.list)
+            # ?verify=1 → bandingkan dengan listing storage, ?repair=1 → isi kolom kosong
+            indexed_files = file_index.files_for_row(pendaftar)
+            verification = None
+            if verify or repair:
+                try:
+                    storage_files = supa.storage.from_(file_index.BUCKET).list(path=nisn)
+                except Exception as e:
+                    print(f"Error listing storage files: {e}")
+                    storage_files = []
+
+                verification = file_index.verify_against_storage(
+                    pendaftar,
+                    storage_files,
+                    public_url_for=(
+                        (lambda path: supa.storage.from_(file_index.BUCKET).get_public_url(path))
+                        if repair else None
+                    ),
+                )
+                if repair and verification["repairs"]:
+                    supa.table("pendaftar").update(verification["repairs"]).eq("id", pendaftar["id"]).execute()
+                    pendaftar.update(verification["repairs"])
+                    indexed_files = file_index.files_for_row(pendaftar)
+                    print(f"Repaired file columns for {nisn}: {list(verification['repairs'])}")
+
+            # Signed URL semua berkas dalam satu request (fallback per file)
+            paths = [entry["path"] for entry in indexed_files]
+            signed_urls = {}
+            if paths:
+                try:
+                    signed_list = supa.storage.from_(file_index.BUCKET).create_signed_urls(paths, 300)
+                    for item in signed_list or []:
+                        if isinstance(item, dict) and item.get("path") and item.get("signedURL"):
+                            signed_urls[item["path"]] = item["signedURL"]
+                except Exception as e:
+                    print(f"Error creating signed URLs in batch: {e}")
 
-            # Prepare file list with signed URLs and metadata
             files = []
-            
-            # Map of file types to friendly names
-            file_type_map = {
-                "ijazah": "Ijazah",
-                "akta": "Akta Kelahiran",
-                "foto": "Pas Foto 3x4",
-                "bpjs": "BPJS",
-            }
-
-            for file_obj in storage_files:
-                if isinstance(file_obj, dict):
-                    file_name = file_obj.get("name", "")
-                    file_path = f"{nisn}/{file_name}"
-                    
-                    # Determine file type from filename
-                    file_type_key = "Lainnya"
-                    for key, label in file_type_map.items():
-                        if key in file_name.lower():
-                            file_type_key = label
-                            break
-                    
-                    # Check if it's an image
-                    is_image = any(
-                        file_name.lower().endswith(ext)
-                        for ext in [".jpg", ".jpeg", ".png", ".gif", ".webp"]
-                    )
-                    
-                    # Get file extension
-                    ext = file_name.split(".")[-1].lower() if "." in file_name else ""
-                    
+            for entry in indexed_files:
+                file_name = entry["name"]
+                file_path = entry["path"]
+                signed_url = signed_urls.get(file_path)
+                if not signed_url:
                     try:
                         # Create signed URL (expires in 5 minutes = 300 seconds)
-                        signed_url_data = supa.storage.from_("pendaftar-files").create_signed_url(
+                        signed_url_data = supa.storage.from_(file_index.BUCKET).create_signed_url(
                             path=file_path,
                             expires_in=300
                         )
-                        
                         signed_url = signed_url_data.get("signedURL") if isinstance(signed_url_data, dict) else None
-                        
-                        if signed_url:
-                            files.append({
-                                "name": file_name,
-                                "path": file_path,
-                                "url": signed_url,
-                                "type": file_type_key,
-                                "is_image": is_image,
-                                "extension": ext,
-                                "size": file_obj.get("metadata", {}).get("size", 0) if isinstance(file_obj.get("metadata"), dict) else 0,
-                            })
                     except Exception as e:
                         print(f"Error creating signed URL for {file_path}: {e}")
                         # Continue with other files
+                        continue
+
+                if signed_url:
+                    files.append({
+                        "name": file_name,
+                        "path": file_path,
+                        "url": signed_url,
+                        "type": entry["type"],
+                        "is_image": file_index.is_image(file_name),
+                        "extension": file_name.split(".")[-1].lower() if "." in file_name else "",
+                        "mime_type": entry["metadata"]["mimetype"],
+                        # Size tidak tersimpan di database; tersedia lewat ?verify=1
+                        "size": 0,
+                    })
 
             # Return success
             self.send_response(200)
@@ -121,6 +133,7 @@ class handler(BaseHTTPRequestHandler):
                 json.dumps({
                     "ok": True,
                     "files": files,
+                    "verification": verification,
                     "pendaftar": {
                         "nisn": pendaftar.get("nisn"),
                         "nama": pendaftar.get("namalengkap"),
@@ -4,16 +4,112 @@ from urllib.parse import parse_qs, urlparse
 from typing import Any, Dict, List
 from datetime import datetime
 from lib._supabase import supabase_client
+from lib.handlers._pagination import apply_keyset, split_page
+
+# Mode hitung total yang didukung PostgREST (Prefer: count=...)
+COUNT_MODES = ("exact", "planned", "estimated")
+
+# Field output yang bisa diproyeksikan (?fields=...) -> kolom DB yang dibutuhkan
+FIELD_COLUMNS = {
+    "id": ("id",),
+    "nisn": ("nisn",),
+    "nikcalon": ("nikcalon",),
+    "nama": ("namalengkap",),
+    "status": ("statusberkas",),
+    "statusberkas": ("statusberkas",),
+    "tanggal_daftar": ("createdat",),
+    "createdat": ("createdat",),
+    "updatedat": ("updatedat",),
+    "telepon_orang_tua": ("telepon_orang_tua",),
+    "alamat": ("alamatjalan", "desa", "kecamatan"),
+    "alasan": ("alasan",),
+    "rencanaprogram": ("rencanaprogram",),
+    "rencanatingkat": ("rencanatingkat",),
+    "jeniskelamin": ("jeniskelamin",),
+    "tempatlahir": ("tempatlahir",),
+    "tanggallahir": ("tanggallahir",),
+    "verifiedby": ("verifiedby",),
+    "verifiedat": ("verifiedat",),
+}
+
+# Whitelist field per tampilan (?view=...); urutan = urutan kolom di format compact
+VIEW_FIELDS = {
+    "grid": ["id", "nisn", "nama", "status", "tanggal_daftar", "rencanaprogram", "rencanatingkat", "telepon_orang_tua"],
+    "stats": ["id", "status", "rencanaprogram", "rencanatingkat", "jeniskelamin"],
+    "payment": ["id", "nisn", "nikcalon", "nama", "status"],
+    "detail": list(FIELD_COLUMNS.keys()),
+}
+
+
+def _format_tanggal(created_at):
+    """Format ISO timestamp ke DD/MM/YYYY (dipakai kolom tanggal_daftar)."""
+    if not created_at:
+        return ""
+    try:
+        return datetime.fromisoformat(created_at.replace('Z', '+00:00')).strftime("%d/%m/%Y")
+    except ValueError:
+        # If parsing fails, use original value
+        return created_at
+
+
+def _resolve_fields(view, fields_param):
+    """Tentukan field proyeksi dari ?view= dan ?fields=. None = response lengkap (legacy)."""
+    if not view and not fields_param:
+        return None
+    view = view or "detail"
+    if view not in VIEW_FIELDS:
+        raise ValueError(f"view tidak dikenal: {view} (pilihan: {', '.join(VIEW_FIELDS)})")
+    allowed = VIEW_FIELDS[view]
+    if not fields_param:
+        return list(allowed)
+    fields = list(dict.fromkeys(f.strip() for f in fields_param.split(",") if f.strip()))
+    invalid = [f for f in fields if f not in allowed]
+    if invalid:
+        raise ValueError(f"Field tidak diizinkan untuk view '{view}': {', '.join(invalid)}")
+    return fields
+
+
+def _select_columns(fields):
+    """Kolom DB minimal untuk field proyeksi (+ id & createdat untuk cursor)."""
+    columns = {"id", "createdat"}
+    for field in fields:
+        columns.update(FIELD_COLUMNS[field])
+    return ",".join(sorted(columns))
+
+
+def _project_value(field, row):
+    if field == "nama":
+        return row.get("namalengkap", "")
+    if field == "status":
+        return (row.get("statusberkas") or "PENDING").lower()
+    if field == "tanggal_daftar":
+        return _format_tanggal(row.get("createdat", ""))
+    if field == "alamat":
+        return f"{row.get('alamatjalan', '')}, {row.get('desa', '')}, {row.get('kecamatan', '')}"
+    return row.get(field)
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
         """
-        GET /api/pendaftar_list?page=1&pageSize=10&q=&status=
+        GET /api/pendaftar_list?page=1&pageSize=10&q=&status=&count=exact
         Response: { ok: true, rows: [...], page: 1, pageSize: 10 }
         
         Filter by:
         - q: search in namaLengkap
         - status: statusBerkas (MENUNGGU_VERIFIKASI, DITERIMA, DITOLAK)
+        
+        count: exact | planned | estimated (default exact)
+        - total dihitung dari query yang sudah difilter, dalam round trip yang sama
+        - planned/estimated memakai estimasi planner Postgres (lebih cepat untuk tabel besar)
+        
+        Proyeksi: ?view=grid|stats|payment|detail&fields=id,nama,status
+        - hanya kolom yang dibutuhkan yang di-select, tanpa alias ganda
+        - format=compact -> { columns: [...], rows: [[...], ...] }
+        
+        Cursor (keyset) mode: ?mode=cursor&pageSize=50&cursor=<next_cursor>
+        - urut (createdat DESC, id DESC), tiap halaman sama cepatnya dengan halaman 1
+        - stabil walau ada pendaftar baru masuk; response berisi next_cursor (null = habis)
+        - total hanya dihitung di halaman pertama (tanpa cursor)
         """
         try:
             # Parse query parameters
@@ -24,6 +120,19 @@ class handler(BaseHTTPRequestHandler):
             status = params.get('status', [''])[0].strip()
             page = int(params.get('page', ['1'])[0])
             page_size = min(50, int(params.get('pageSize', ['10'])[0]))
+            count_mode = params.get('count', ['exact'])[0].strip().lower()
+            if count_mode not in COUNT_MODES:
+                count_mode = 'exact'
+            cursor = params.get('cursor', [''])[0].strip()
+            cursor_mode = bool(cursor) or params.get('mode', [''])[0].strip().lower() == 'cursor'
+            response_format = params.get('format', [''])[0].strip().lower()
+            fields = _resolve_fields(
+                params.get('view', [''])[0].strip().lower(),
+                params.get('fields', [''])[0],
+            )
+            if response_format == 'compact' and fields is None:
+                fields = list(VIEW_FIELDS["grid"])
+            select_columns = _select_columns(fields) if fields is not None else "*"
             
             # Calculate range
             from_ = (page - 1) * page_size
@@ -31,7 +140,11 @@ class handler(BaseHTTPRequestHandler):
             
             # Query Supabase with service-role for admin operations
             supa = supabase_client(service_role=True)
-            query = supa.table("pendaftar").select("*").order("createdat", desc=True)
+            if cursor_mode and cursor:
+                # Halaman lanjutan: total sudah didapat di halaman pertama
+                query = supa.table("pendaftar").select(select_columns)
+            else:
+                query = supa.table("pendaftar").select(select_columns, count=count_mode)  # type: ignore
             
             # Apply filters
             if status:
@@ -41,29 +154,51 @@ class handler(BaseHTTPRequestHandler):
                 # Search in namaLengkap (case-insensitive)
                 query = query.ilike("namaLengkap", f"%{q}%")
             
-            # Apply pagination
-            res = query.range(from_, to_).execute()
+            next_cursor = None
+            if cursor_mode:
+                # Keyset pagination: (createdat, id) < cursor
+                res = apply_keyset(query, "createdat", cursor, page_size).execute()
+                rows, next_cursor = split_page(res.data, "createdat", page_size)
+                total = res.count if getattr(res, 'count', None) is not None else None  # type: ignore
+            else:
+                # Apply pagination (total ikut dihitung dari query terfilter yang sama)
+                res = query.order("createdat", desc=True).range(from_, to_).execute()
+                rows = res.data
+                total = res.count if getattr(res, 'count', None) is not None else len(res.data)  # type: ignore
             
-            # Get total count
-            count_res = supa.table("pendaftar").select("*", count="exact").execute()  # type: ignore
-            total = count_res.count if hasattr(count_res, 'count') else len(res.data)  # type: ignore
+            meta = {
+                "success": True,
+                "total": total,
+                "page": page,
+                "limit": page_size,
+                "count_mode": count_mode,
+                "mode": "cursor" if cursor_mode else "offset",
+                "next_cursor": next_cursor
+            }
+            
+            if fields is not None:
+                # Response terproyeksi: hanya field yang diminta, tanpa alias ganda
+                if response_format == 'compact':
+                    meta["columns"] = fields
+                    meta["rows"] = [[_project_value(f, row) for f in fields] for row in rows]  # type: ignore
+                else:
+                    meta["data"] = [{f: _project_value(f, row) for f in fields} for row in rows]  # type: ignore
+                
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.end_headers()
+                self.wfile.write(json.dumps(meta, default=str).encode())
+                return
             
             # Transform data untuk admin dashboard
             transformed_data: List[Dict[str, Any]] = []
-            for row in res.data:  # type: ignore
+            for row in rows:  # type: ignore
                 row_dict: Dict[str, Any] = row  # type: ignore
                 # Map createdat to tanggal_daftar for the frontend CSV export
                 created_at = row_dict.get("createdat", "")
                 # Format date to Indonesian format (DD/MM/YYYY) for display
-                tanggal_daftar = ""
-                if created_at:
-                    try:
-                        # Convert ISO format to DD/MM/YYYY format
-                        date_obj = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                        tanggal_daftar = date_obj.strftime("%d/%m/%Y")
-                    except ValueError:
-                        # If parsing fails, use original value
-                        tanggal_daftar = created_at
+                tanggal_daftar = _format_tanggal(created_at)
                 
                 # Get all possible identifiers for payment matching
                 nisn = row_dict.get("nisn", "")
@@ -106,12 +241,18 @@ class handler(BaseHTTPRequestHandler):
             self.send_header('Content-Type', 'application/json')
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
+            meta["data"] = transformed_data
+            self.wfile.write(json.dumps(meta).encode())
+            
+        except ValueError as e:
+            # Parameter tidak valid (page/pageSize bukan angka, cursor rusak)
+            self.send_response(400)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
             self.wfile.write(json.dumps({
-                "success": True,
-                "data": transformed_data,
-                "total": total,
-                "page": page,
-                "limit": page_size
+                "success": False,
+                "error": str(e)
             }).encode())
             
         except Exception as e:
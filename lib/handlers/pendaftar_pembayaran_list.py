@@ -0,0 +1,264 @@
+"""
+API Handler: daftar pendaftar + status pembayaran terbaru dalam satu response.
+
+Sumber data view pendaftar_pembayaran (sql/create_view_pendaftar_pembayaran.sql):
+join LATERAL pembayaran terbaru per pendaftar di database, sehingga paginasi,
+filter, proyeksi dan total cukup satu query.
+
+Hanya jika view belum dibuat (PGRST205 / 42P01), fallback: satu halaman pendaftar + satu query pembayaran
+untuk identitas di halaman itu (nisn.in / nik.in), dicocokkan di Python dengan
+prioritas yang sama. Filter status pembayaran hanya tersedia lewat view.
+"""
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+from lib._supabase import supabase_client, is_missing_relation
+from lib import export_sheets
+from lib.export_filters import apply_date_range, normalize_status
+from lib.handlers._pagination import apply_keyset, split_page
+from ._crud_helpers import send_json, allow_cors
+
+VIEW_NAME = "pendaftar_pembayaran"
+MAX_PAGE_SIZE = 200
+DEFAULT_PAGE_SIZE = 50
+
+# Mode hitung total yang didukung PostgREST (Prefer: count=...)
+COUNT_MODES = ("exact", "planned", "estimated")
+
+# Filter ?pembayaran=: status pembayaran terbaru, BELUM = belum ada pembayaran
+PEMBAYARAN_FILTERS = ("PENDING", "VERIFIED", "REJECTED", "BELUM")
+
+# Field output (?fields=...) -> kolom view
+FIELD_COLUMNS = {
+    "id": "id",
+    "nisn": "nisn",
+    "nikcalon": "nikcalon",
+    "nama": "namalengkap",
+    "statusberkas": "statusberkas",
+    "rencanaprogram": "rencanaprogram",
+    "rencanatingkat": "rencanatingkat",
+    "jeniskelamin": "jeniskelamin",
+    "telepon_orang_tua": "telepon_orang_tua",
+    "createdat": "createdat",
+    "updatedat": "updatedat",
+    "pembayaran_id": "pembayaran_id",
+    "pembayaran_status": "status_pembayaran",
+    "jumlah": "jumlah",
+    "metode_pembayaran": "metode_pembayaran",
+    "bukti_pembayaran": "bukti_pembayaran",
+    "tanggal_upload": "tanggal_upload",
+    "tanggal_verifikasi": "tanggal_verifikasi",
+    "verified_by": "verified_by",
+    "catatan_admin": "catatan_admin",
+    "pembayaran_updated_at": "pembayaran_updated_at",
+}
+
+DEFAULT_FIELDS = [
+    "id", "nisn", "nikcalon", "nama", "statusberkas", "rencanaprogram",
+    "createdat", "pembayaran_status", "jumlah", "tanggal_upload",
+]
+
+# Kolom pendaftar yang ada di view (untuk fallback tanpa view)
+PENDAFTAR_COLUMNS = {
+    "id", "nisn", "nikcalon", "namalengkap", "statusberkas", "rencanaprogram",
+    "rencanatingkat", "jeniskelamin", "telepon_orang_tua", "createdat", "updatedat",
+}
+
+# Kolom view yang berasal dari pembayaran → kolom tabel pembayaran
+PEMBAYARAN_COLUMNS = {
+    "pembayaran_id": "id",
+    "status_pembayaran": "status_pembayaran",
+    "jumlah": "jumlah",
+    "metode_pembayaran": "metode_pembayaran",
+    "bukti_pembayaran": "bukti_pembayaran",
+    "tanggal_upload": "tanggal_upload",
+    "tanggal_verifikasi": "tanggal_verifikasi",
+    "verified_by": "verified_by",
+    "catatan_admin": "catatan_admin",
+    "pembayaran_updated_at": "updated_at",
+}
+
+
+def resolve_fields(fields_param):
+    if not fields_param:
+        return list(DEFAULT_FIELDS)
+    fields = list(dict.fromkeys(f.strip() for f in fields_param.split(",") if f.strip()))
+    invalid = [f for f in fields if f not in FIELD_COLUMNS]
+    if invalid:
+        raise ValueError(f"Field tidak dikenal: {', '.join(invalid)} (pilihan: {', '.join(FIELD_COLUMNS)})")
+    return fields
+
+
+def read_filters(params):
+    """
+    - status     : statusberkas (PENDING / REVISI / DITERIMA / DITOLAK, alias lama diterima)
+    - pembayaran : status pembayaran terbaru (PENDING / VERIFIED / REJECTED / BELUM)
+    - q          : cari di nama / nisn (ilike)
+    - nisn       : lookup exact nisn ATAU nikcalon
+    - date_from / date_to : rentang createdat
+    """
+    def param(name):
+        return params.get(name, [""])[0].strip()
+
+    pembayaran = param("pembayaran").upper()
+    if pembayaran and pembayaran not in PEMBAYARAN_FILTERS:
+        raise ValueError(f"pembayaran tidak dikenal: {pembayaran} (pilihan: {', '.join(PEMBAYARAN_FILTERS)})")
+    identifier = param("nisn")
+    if identifier and not identifier.isalnum():
+        raise ValueError("nisn hanya boleh huruf & angka")
+    return {
+        "status": normalize_status(param("status")),
+        "pembayaran": pembayaran,
+        "q": "".join(ch for ch in param("q") if ch not in ',()*"\\:').strip(),
+        "identifier": identifier,
+        "date_from": param("date_from"),
+        "date_to": param("date_to"),
+    }
+
+
+def apply_filters(query, filters, with_pembayaran=True):
+    if filters.get("status"):
+        query = query.eq("statusberkas", filters["status"])
+    if with_pembayaran and filters.get("pembayaran") == "BELUM":
+        query = query.is_("pembayaran_id", "null")
+    elif with_pembayaran and filters.get("pembayaran"):
+        query = query.eq("status_pembayaran", filters["pembayaran"])
+    if filters.get("identifier"):
+        value = filters["identifier"]
+        query = query.or_(f"nisn.eq.{value},nikcalon.eq.{value}")
+    if filters.get("q"):
+        pattern = f"*{filters['q']}*"
+        query = query.or_(f"namalengkap.ilike.{pattern},nisn.ilike.{pattern}")
+    return apply_date_range(query, "createdat", filters.get("date_from"), filters.get("date_to"))
+
+
+def fetch_page(query, page, page_size, cursor_mode, cursor):
+    """Jalankan query halaman (offset atau keyset createdat). Return (rows, total, next_cursor)."""
+    if cursor_mode:
+        result = apply_keyset(query, "createdat", cursor, page_size).execute()
+        rows, next_cursor = split_page(result.data, "createdat", page_size)
+        return rows, result.count, next_cursor
+
+    from_ = (page - 1) * page_size
+    result = (
+        query.order("createdat", desc=True)
+        .order("id", desc=True)
+        .range(from_, from_ + page_size - 1)
+        .execute()
+    )
+    rows = result.data or []
+    return rows, result.count if result.count is not None else len(rows), None
+
+
+def attach_pembayaran(supa, rows):
+    """
+    Fallback tanpa view: isi kolom pembayaran view untuk satu halaman pendaftar
+    dengan satu query pembayaran (nisn / nik ∈ identitas halaman ini).
+    """
+    identifiers = sorted({
+        str(row.get(field)).strip()
+        for row in rows
+        for field in ("nisn", "nikcalon")
+        if row.get(field) and str(row.get(field)).strip().isalnum()
+    })
+    index = export_sheets.index_pembayaran([])
+    if identifiers:
+        values = ",".join(identifiers)
+        result = (
+            supa.table("pembayaran")
+            .select(",".join(sorted(set(PEMBAYARAN_COLUMNS.values()) | {"nisn", "nik"})))
+            .or_(f"nisn.in.({values}),nik.in.({values})")
+            .execute()
+        )
+        index = export_sheets.index_pembayaran(result.data or [])
+
+    for row in rows:
+        pembayaran = export_sheets.match_pembayaran(index, row) or {}
+        for view_column, column in PEMBAYARAN_COLUMNS.items():
+            row[view_column] = pembayaran.get(column)
+    return rows
+
+
+def project(row, fields):
+    values = {}
+    for field in fields:
+        value = row.get(FIELD_COLUMNS[field])
+        if field == "jumlah" and value is not None:
+            value = float(value)
+        values[field] = value
+    return values
+
+
+class handler(BaseHTTPRequestHandler):
+    @staticmethod
+    def do_GET(request_handler):
+        """
+        GET /api/pendaftar_pembayaran?page=1&pageSize=50&status=PENDING&pembayaran=VERIFIED&q=budi
+        Response: { ok: true, data: [...], total, page, limit, mode, next_cursor, source }
+
+        Setiap baris = pendaftar + pembayaran terbarunya (pembayaran_status null =
+        belum bayar). Proyeksi ?fields=...; count=exact|planned|estimated;
+        cursor mode ?mode=cursor&cursor=<next_cursor> (urut createdat DESC, id DESC).
+        """
+        try:
+            params = parse_qs(urlparse(request_handler.path).query)
+            cursor = params.get("cursor", [""])[0].strip()
+            cursor_mode = bool(cursor) or params.get("mode", [""])[0].strip().lower() == "cursor"
+            page = max(1, int(params.get("page", ["1"])[0]))
+            page_size = max(1, min(MAX_PAGE_SIZE, int(params.get("pageSize", [str(DEFAULT_PAGE_SIZE)])[0])))
+            count_mode = params.get("count", ["exact"])[0].strip().lower()
+            if count_mode not in COUNT_MODES:
+                count_mode = "exact"
+            fields = resolve_fields(params.get("fields", [""])[0])
+            filters = read_filters(params)
+
+            # id & createdat selalu ikut untuk urutan / cursor
+            columns = {"id", "createdat"} | {FIELD_COLUMNS[field] for field in fields}
+            count = None if cursor else count_mode
+
+            supa = supabase_client(service_role=True)
+            source = "view"
+            try:
+                query = supa.table(VIEW_NAME).select(",".join(sorted(columns)), count=count)  # type: ignore
+                rows, total, next_cursor = fetch_page(
+                    apply_filters(query, filters), page, page_size, cursor_mode, cursor
+                )
+            except ValueError:
+                raise
+            except Exception as view_error:
+                if not is_missing_relation(view_error):
+                    raise
+                if filters.get("pembayaran"):
+                    raise RuntimeError(
+                        f"Filter pembayaran butuh view {VIEW_NAME} "
+                        f"(sql/create_view_pendaftar_pembayaran.sql): {view_error}"
+                    )
+                print(f"[PENDAFTAR_PEMBAYARAN] View tidak tersedia, fallback per halaman: {view_error}")
+                source = "fallback"
+                pendaftar_columns = (columns & PENDAFTAR_COLUMNS) | {"nisn", "nikcalon"}
+                query = supa.table("pendaftar").select(",".join(sorted(pendaftar_columns)), count=count)  # type: ignore
+                rows, total, next_cursor = fetch_page(
+                    apply_filters(query, filters, with_pembayaran=False), page, page_size, cursor_mode, cursor
+                )
+                attach_pembayaran(supa, rows)
+
+            send_json(request_handler, 200, {
+                "ok": True,
+                "data": [project(row, fields) for row in rows],
+                "total": total,
+                "page": page,
+                "limit": page_size,
+                "count_mode": count_mode,
+                "mode": "cursor" if cursor_mode else "offset",
+                "next_cursor": next_cursor,
+                "source": source,
+            })
+        except ValueError as exc:
+            send_json(request_handler, 400, {"ok": False, "error": str(exc)})
+        except Exception as exc:
+            print(f"[PENDAFTAR_PEMBAYARAN][GET] Error: {exc}")
+            send_json(request_handler, 500, {"ok": False, "error": f"Gagal memuat data: {exc}"})
+
+    @staticmethod
+    def do_OPTIONS(request_handler):
+        allow_cors(request_handler, ["GET", "OPTIONS"])
@@ -0,0 +1,172 @@
+"""
+API Handler untuk statistik agregat pendaftar (dashboard admin)
+"""
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+from lib._supabase import supabase_client
+from ._crud_helpers import send_json, now_timestamp, allow_cors
+from ._pagination import iter_rows
+
+
+TABLE_NAME = "pendaftar"
+RPC_NAME = "pendaftar_stats"
+CACHE_TTL_SECONDS = 30
+FALLBACK_CHUNK_SIZE = 1000
+DEFAULT_DAYS = 90
+
+# Cache per proses (warm invocation), key = jumlah hari series per-hari
+_cache = {}
+
+
+def _aggregate_rows(rows, days):
+    """Hitung statistik di Python (fallback jika RPC belum dibuat)."""
+    by_status = Counter()
+    by_program = Counter()
+    by_tingkat = Counter()
+    by_gender = Counter()
+    breakdown = Counter()
+    per_day = Counter()
+    total = 0
+
+    # Series per-hari memakai zona waktu WIB, sama seperti RPC
+    wib = timezone(timedelta(hours=7))
+    min_date = (datetime.now(wib) - timedelta(days=days)).date()
+
+    for row in rows:
+        total += 1
+        status = ((row.get("statusberkas") or "").strip() or "PENDING").upper()
+        program = (row.get("rencanaprogram") or "").strip()
+        tingkat = (row.get("rencanatingkat") or "").strip()
+        gender = (row.get("jeniskelamin") or "").strip().upper()
+
+        by_status[status] += 1
+        by_program[program] += 1
+        by_tingkat[tingkat] += 1
+        by_gender[gender] += 1
+        breakdown[(program, tingkat, gender)] += 1
+
+        created_at = row.get("createdat")
+        if created_at:
+            try:
+                tanggal = (
+                    datetime.fromisoformat(str(created_at).replace("Z", "+00:00"))
+                    .astimezone(wib)
+                    .date()
+                )
+            except ValueError:
+                continue
+            if tanggal >= min_date:
+                per_day[tanggal.isoformat()] += 1
+
+    return {
+        "total": total,
+        "by_status": dict(by_status),
+        "by_program": dict(by_program),
+        "by_tingkat": dict(by_tingkat),
+        "by_gender": dict(by_gender),
+        "breakdown": [
+            {
+                "rencanaprogram": program,
+                "rencanatingkat": tingkat,
+                "jeniskelamin": gender,
+                "count": count,
+            }
+            for (program, tingkat, gender), count in sorted(breakdown.items())
+        ],
+        "per_day": [
+            {"date": tanggal, "count": count}
+            for tanggal, count in sorted(per_day.items())
+        ],
+    }
+
+
+def _fetch_stats_fallback(supa, days):
+    """Ambil hanya kolom yang dibutuhkan per chunk (keyset), agregasi sambil streaming."""
+    rows = iter_rows(
+        supa,
+        TABLE_NAME,
+        "id,statusberkas,rencanaprogram,rencanatingkat,jeniskelamin,createdat",
+        chunk_size=FALLBACK_CHUNK_SIZE,
+    )
+    return _aggregate_rows(rows, days)
+
+
+def _fetch_stats(days):
+    supa = supabase_client(service_role=True)
+    try:
+        result = supa.rpc(RPC_NAME, {"p_days": days}).execute()
+        if isinstance(result.data, dict):
+            return result.data, "rpc"
+        print(f"[PENDAFTAR_STATS] Unexpected RPC result: {type(result.data)}")
+    except Exception as exc:
+        print(f"[PENDAFTAR_STATS] RPC '{RPC_NAME}' gagal, pakai fallback: {exc}")
+    return _fetch_stats_fallback(supa, days), "fallback"
+
+
+class handler(BaseHTTPRequestHandler):
+    @staticmethod
+    def do_GET(request_handler):
+        """
+        GET /api/pendaftar_stats?days=90&refresh=1
+        Response: { ok: true, data: { total, by_status, by_program, by_tingkat,
+                    by_gender, breakdown: [...], per_day: [...] }, cached, source }
+        """
+        try:
+            params = parse_qs(urlparse(request_handler.path).query)
+            try:
+                days = max(1, min(366, int(params.get("days", [DEFAULT_DAYS])[0])))
+            except (TypeError, ValueError):
+                days = DEFAULT_DAYS
+            refresh = params.get("refresh", ["0"])[0] in ("1", "true")
+
+            now = time.monotonic()
+            entry = _cache.get(days)
+            if entry and not refresh and now < entry["expires_at"]:
+                send_json(
+                    request_handler,
+                    200,
+                    {
+                        "ok": True,
+                        "data": entry["data"],
+                        "generated_at": entry["generated_at"],
+                        "source": entry["source"],
+                        "cached": True,
+                    },
+                )
+                return
+
+            data, source = _fetch_stats(days)
+            generated_at = now_timestamp()
+            _cache[days] = {
+                "data": data,
+                "source": source,
+                "generated_at": generated_at,
+                "expires_at": now + CACHE_TTL_SECONDS,
+            }
+
+            send_json(
+                request_handler,
+                200,
+                {
+                    "ok": True,
+                    "data": data,
+                    "generated_at": generated_at,
+                    "source": source,
+                    "cached": False,
+                },
+            )
+        except Exception as exc:
+            print(f"[PENDAFTAR_STATS][GET] Error: {exc}")
+            send_json(
+                request_handler,
+                500,
+                {"ok": False, "error": f"Gagal mengambil statistik: {exc}"},
+            )
+
+    @staticmethod
+    def do_OPTIONS(request_handler):
+        allow_cors(request_handler, ["GET", "OPTIONS"])
@@ -0,0 +1,257 @@
+"""
+Snapshot statis untuk halaman cek status (hari pengumuman).
+
+Admin memicu build → semua payload cek status dihitung sekali dengan transform
+yang sama seperti pendaftar_cek_status, lalu ditulis SATU objek JSON per
+pendaftar di bucket Storage publik (bisa di-cache CDN):
+
+    status-snapshot/snapshot/<version>/<hash nisn>.json   payload publik
+    status-snapshot/snapshot/current.json                 manifest versi aktif
+
+Key = HMAC-SHA256(STATUS_SNAPSHOT_SALT, NISN). Manifest tidak memuat daftar key
+dan salt wajib di-set (build ditolak tanpa salt), jadi isi bucket tidak bisa
+di-enumerasi tanpa mengetahui NISN. Payload snapshot juga tanpa NIK, data
+kelahiran dan URL bukti bayar (lihat public_payload).
+
+Endpoint cek status membaca snapshot selama masih fresh
+(STATUS_SNAPSHOT_MAX_AGE detik, default 1800) dan fallback ke database jika tidak.
+"""
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+
+from lib.export_sheets import index_pembayaran, match_pembayaran
+from lib.handlers._pagination import iter_rows
+from lib.handlers.pendaftar_cek_status import build_status_payload
+
+BUCKET = "status-snapshot"
+PREFIX = "snapshot"
+MANIFEST_PATH = f"{PREFIX}/current.json"
+UPLOAD_WORKERS = 16
+LIST_PAGE_SIZE = 1000
+ENTRY_CACHE_MAX = 5000
+HTTP_TIMEOUT_SEC = 3
+MANIFEST_CACHE_SEC = 30
+DEFAULT_MAX_AGE = 1800
+
+PENDAFTAR_COLUMNS = (
+    "id,nisn,nikcalon,namalengkap,tanggallahir,tempatlahir,statusberkas,"
+    "alasan,verifiedby,verifiedat,createdat,updatedat"
+)
+PEMBAYARAN_COLUMNS = (
+    "id,nisn,nik,nama_lengkap,metode_pembayaran,jumlah,bukti_pembayaran,"
+    "status_pembayaran,verified_by,catatan_admin,tanggal_verifikasi,created_at,updated_at"
+)
+
+# Field payload cek status yang TIDAK ikut ke snapshot publik
+PRIVATE_FIELDS = ("nik", "nikcalon", "tanggalLahir", "tempatLahir")
+PRIVATE_PEMBAYARAN_FIELDS = ("nik", "bukti_bayar_url")
+
+# Cache per proses: manifest aktif + entry yang sudah pernah diunduh
+_lock = threading.Lock()
+_manifest_cache = {"manifest": None, "fetched_at": 0.0}
+_entry_cache = {}
+
+
+def _salt():
+    return os.getenv("STATUS_SNAPSHOT_SALT", "").strip()
+
+
+def _max_age():
+    try:
+        return int(os.getenv("STATUS_SNAPSHOT_MAX_AGE", DEFAULT_MAX_AGE))
+    except (TypeError, ValueError):
+        return DEFAULT_MAX_AGE
+
+
+def nisn_key(nisn):
+    """HMAC NISN (digit saja) dengan salt rahasia → key snapshot."""
+    digits = "".join(ch for ch in str(nisn) if ch.isdigit())
+    return hmac.new(_salt().encode("utf-8"), digits.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def _entry_path(version, key):
+    return f"{PREFIX}/{version}/{key}.json"
+
+
+def public_payload(payload):
+    """Payload cek status tanpa data pribadi yang tidak perlu ada di bucket publik."""
+    data = {k: v for k, v in payload.items() if k not in PRIVATE_FIELDS}
+    if data.get("pembayaran"):
+        data["pembayaran"] = {
+            k: v for k, v in data["pembayaran"].items() if k not in PRIVATE_PEMBAYARAN_FIELDS
+        }
+    return data
+
+
+def _upload_json(supa, path, payload, cache_seconds):
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+    supa.storage.from_(BUCKET).upload(
+        path=path,
+        file=body,
+        file_options={
+            "content-type": "application/json; charset=utf-8",
+            "cache-control": str(cache_seconds),
+            "x-upsert": "true",
+        },
+    )
+    return len(body)
+
+
+def _remove_version(supa, version):
+    """Hapus semua objek satu versi snapshot (list per halaman, best effort)."""
+    bucket = supa.storage.from_(BUCKET)
+    folder = f"{PREFIX}/{version}"
+    removed = 0
+    while True:
+        # Selalu offset 0: halaman sebelumnya sudah terhapus
+        items = bucket.list(folder, {"limit": LIST_PAGE_SIZE, "offset": 0}) or []
+        paths = [f"{folder}/{item['name']}" for item in items if item.get("name")]
+        if not paths:
+            break
+        bucket.remove(paths)
+        removed += len(paths)
+        if len(items) < LIST_PAGE_SIZE:
+            break
+    return removed
+
+
+def build_snapshot(supa):
+    """
+    Hitung payload publik semua pendaftar, tulis satu objek per NISN + manifest.
+    Raise ValueError jika STATUS_SNAPSHOT_SALT belum di-set. Return manifest baru.
+    """
+    if not _salt():
+        raise ValueError("STATUS_SNAPSHOT_SALT belum di-set, snapshot publik tidak dibuat")
+
+    started = time.monotonic()
+    # Pembayaran terbaru per nisn / nik, prioritas sama dengan cek status
+    pembayaran_index = index_pembayaran(iter_rows(supa, "pembayaran", PEMBAYARAN_COLUMNS))
+
+    entries = {}
+    total = 0
+    for row in iter_rows(supa, "pendaftar", PENDAFTAR_COLUMNS):
+        nisn = str(row.get("nisn") or "").strip()
+        if not nisn:
+            continue
+        key = nisn_key(nisn)
+        payload = build_status_payload(row, match_pembayaran(pembayaran_index, row), nisn)
+        existing = entries.get(key)
+        # NISN duplikat: pakai data yang paling baru di-update (sama seperti cek status)
+        if existing is None or str(payload.get("updated_at") or "") > str(existing.get("updated_at") or ""):
+            entries[key] = payload
+        total += 1
+
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    # Objek per versi bersifat immutable → boleh di-cache CDN lama
+    with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as pool:
+        sizes = list(pool.map(
+            lambda item: _upload_json(supa, _entry_path(version, item[0]), public_payload(item[1]), 86400),
+            entries.items(),
+        ))
+
+    previous = read_manifest(supa, use_cache=False)
+    manifest = {
+        "version": version,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "total_pendaftar": total,
+        "entries": len(entries),
+        "bytes": sum(sizes),
+    }
+    # Manifest sering berubah → cache pendek
+    _upload_json(supa, MANIFEST_PATH, manifest, 30)
+
+    with _lock:
+        _manifest_cache["manifest"] = manifest
+        _manifest_cache["fetched_at"] = time.monotonic()
+        _entry_cache.clear()
+
+    # Hapus objek versi sebelumnya (best effort)
+    if previous and previous.get("version") and previous.get("version") != version:
+        try:
+            _remove_version(supa, previous["version"])
+        except Exception as e:
+            print(f"[STATUS_SNAPSHOT] Warning: gagal hapus snapshot lama: {e}")
+
+    manifest["duration_sec"] = round(time.monotonic() - started, 2)
+    print(f"[STATUS_SNAPSHOT] ✓ Snapshot {version}: {total} pendaftar, {len(entries)} objek, {manifest['bytes']} bytes")
+    return manifest
+
+
+def _fetch_public_json(supa, path):
+    url = supa.storage.from_(BUCKET).get_public_url(path)
+    if isinstance(url, str):
+        url = url.rstrip("?")
+    response = requests.get(url, timeout=HTTP_TIMEOUT_SEC)
+    # Storage mengembalikan 400/404 untuk objek yang tidak ada
+    if response.status_code in (400, 404):
+        return None
+    response.raise_for_status()
+    return response.json()
+
+
+def read_manifest(supa, use_cache=True):
+    """Baca manifest aktif (di-cache per proses MANIFEST_CACHE_SEC detik)."""
+    now = time.monotonic()
+    with _lock:
+        if use_cache and now - _manifest_cache["fetched_at"] < MANIFEST_CACHE_SEC:
+            return _manifest_cache["manifest"]
+    try:
+        manifest = _fetch_public_json(supa, MANIFEST_PATH)
+    except Exception as e:
+        print(f"[STATUS_SNAPSHOT] Warning: gagal membaca manifest: {e}")
+        manifest = None
+    with _lock:
+        previous = _manifest_cache["manifest"]
+        if previous and (not manifest or previous.get("version") != manifest.get("version")):
+            _entry_cache.clear()
+        _manifest_cache["manifest"] = manifest
+        _manifest_cache["fetched_at"] = now
+    return manifest
+
+
+def is_fresh(manifest):
+    if not manifest or not manifest.get("generated_at"):
+        return False
+    try:
+        generated = datetime.fromisoformat(str(manifest["generated_at"]).replace("Z", "+00:00"))
+    except ValueError:
+        return False
+    age = (datetime.now(timezone.utc) - generated).total_seconds()
+    return age <= _max_age()
+
+
+def lookup(supa, nisn):
+    """
+    Cari payload cek status di snapshot.
+    Return (True, payload | None) jika snapshot fresh dipakai,
+    (False, None) jika harus fallback ke database.
+    """
+    if not _salt():
+        return False, None
+    manifest = read_manifest(supa)
+    if not is_fresh(manifest):
+        return False, None
+
+    cache_key = (manifest["version"], nisn_key(nisn))
+    with _lock:
+        if cache_key in _entry_cache:
+            return True, _entry_cache[cache_key]
+    try:
+        # Objek tidak ada → pendaftar memang tidak ditemukan
+        data = _fetch_public_json(supa, _entry_path(*cache_key))
+    except Exception as e:
+        print(f"[STATUS_SNAPSHOT] Warning: gagal membaca snapshot: {e}")
+        return False, None
+    with _lock:
+        if len(_entry_cache) >= ENTRY_CACHE_MAX:
+            _entry_cache.clear()
+        _entry_cache[cache_key] = data
+    return True, data
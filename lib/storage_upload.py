@@ -0,0 +1,101 @@
+"""
+Upload file besar ke Supabase Storage tanpa memuat seluruh isi ke memori.
+
+- File kecil (<= 1 chunk) → upload biasa lewat storage client
+- File besar → TUS resumable upload (/storage/v1/upload/resumable),
+  dikirim per chunk 6 MB dan dilanjutkan dari offset server jika ada chunk gagal
+"""
+import base64
+
+import requests
+
+from lib._supabase import supabase_settings
+
+# Supabase mewajibkan chunk TUS tepat 6 MB (kecuali chunk terakhir)
+RESUMABLE_CHUNK_SIZE = 6 * 1024 * 1024
+MAX_RETRIES = 3
+TIMEOUT_SEC = 60
+
+
+def _b64(value):
+    return base64.b64encode(str(value).encode("utf-8")).decode("ascii")
+
+
+def _file_size(fileobj):
+    fileobj.seek(0, 2)
+    size = fileobj.tell()
+    fileobj.seek(0)
+    return size
+
+
+def _upload_resumable(bucket, path, fileobj, size, content_type, cache_control, upsert):
+    url, key = supabase_settings(service_role=True)
+    base_headers = {
+        "authorization": f"Bearer {key}",
+        "apikey": key,
+        "tus-resumable": "1.0.0",
+    }
+
+    with requests.Session() as http:
+        create = http.post(
+            f"{url}/storage/v1/upload/resumable",
+            headers={
+                **base_headers,
+                "x-upsert": "true" if upsert else "false",
+                "upload-length": str(size),
+                "upload-metadata": ",".join([
+                    f"bucketName {_b64(bucket)}",
+                    f"objectName {_b64(path)}",
+                    f"contentType {_b64(content_type)}",
+                    f"cacheControl {_b64(cache_control)}",
+                ]),
+            },
+            timeout=TIMEOUT_SEC,
+        )
+        if create.status_code not in (200, 201):
+            raise Exception(f"Resumable upload gagal dibuat ({create.status_code}): {create.text[:200]}")
+        upload_url = create.headers.get("location") or create.headers.get("Location")
+        if not upload_url:
+            raise Exception("Resumable upload tidak mengembalikan Location")
+
+        offset = 0
+        retries = 0
+        while offset < size:
+            fileobj.seek(offset)
+            chunk = fileobj.read(RESUMABLE_CHUNK_SIZE)
+            try:
+                response = http.patch(
+                    upload_url,
+                    headers={
+                        **base_headers,
+                        "upload-offset": str(offset),
+                        "content-type": "application/offset+octet-stream",
+                    },
+                    data=chunk,
+                    timeout=TIMEOUT_SEC,
+                )
+                if response.status_code not in (200, 204):
+                    raise Exception(f"chunk @{offset} gagal ({response.status_code}): {response.text[:200]}")
+                offset = int(response.headers.get("upload-offset", offset + len(chunk)))
+                retries = 0
+            except Exception as e:
+                retries += 1
+                if retries > MAX_RETRIES:
+                    raise Exception(f"Resumable upload gagal: {e}")
+                print(f"[STORAGE_UPLOAD] ⚠️ Retry {retries}/{MAX_RETRIES}: {e}")
+                # Lanjutkan dari offset yang sudah diterima server
+                head = http.head(upload_url, headers=base_headers, timeout=TIMEOUT_SEC)
+                offset = int(head.headers.get("upload-offset", offset))
+
+
+def upload_fileobj(supa, bucket, path, fileobj, content_type, cache_control="3600", upsert=False):
+    """Upload file object (seekable) ke Storage. Return ukuran file dalam byte."""
+    size = _file_size(fileobj)
+    if size <= RESUMABLE_CHUNK_SIZE:
+        file_options = {"content-type": content_type, "cache-control": cache_control}
+        if upsert:
+            file_options["x-upsert"] = "true"
+        supa.storage.from_(bucket).upload(path=path, file=fileobj.read(), file_options=file_options)
+    else:
+        _upload_resumable(bucket, path, fileobj, size, content_type, cache_control, upsert)
+    return size
@@ -0,0 +1,150 @@
+"""
+Cache sub-arsip ZIP per pendaftar untuk export "semua berkas".
+
+Selama masa verifikasi, export harian sebagian besar berisi berkas yang sama.
+Setiap pendaftar punya sub-arsip di Storage (satu folder datar, supaya umur
+semua entry terlihat dari satu listing):
+
+    temp-downloads/zip-cache/<nisn>-<fingerprint>.zip
+
+fingerprint = sha256 dari prefix folder di ZIP + listing storage pendaftar
+(nama, size, updated_at per file yang lolos filter ekstensi). Jika listing tidak
+berubah, path-nya sama → cukup satu download sub-arsip, bukan download ulang
+setiap berkas. Jika berubah, berkas diunduh ulang, sub-arsip baru disimpan dan
+versi lama dihapus.
+
+Sub-arsip disimpan ZIP_STORED: kompresi dilakukan sekali oleh writer ZIP utama.
+Entry yang lebih tua dari MAX_AGE_HOURS dihapus cleanup_expired (dibuat ulang
+saat export berikutnya), jadi salinan berkas pendaftar tidak tersimpan permanen.
+"""
+import hashlib
+import io
+import json
+import zipfile
+from datetime import datetime, timedelta, timezone
+
+BUCKET = "temp-downloads"
+FOLDER = "zip-cache"
+MAX_AGE_HOURS = 72
+LIST_PAGE_SIZE = 1000
+REMOVE_BATCH = 100
+
+
+def listing_fingerprint(zip_prefix, files):
+    """files: iterable (nama, size, updated_at) → hex fingerprint (stabil, urutan tidak berpengaruh)."""
+    payload = json.dumps(
+        [zip_prefix, sorted([str(name), str(size), str(updated_at)] for name, size, updated_at in files)],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def file_signature(file_obj):
+    """(nama, size, updated_at) dari satu item hasil storage.list."""
+    metadata = file_obj.get("metadata") or {}
+    return (
+        file_obj.get("name", ""),
+        metadata.get("size") if isinstance(metadata, dict) else None,
+        file_obj.get("updated_at") or file_obj.get("last_modified") or "",
+    )
+
+
+def cache_path(nisn, fingerprint):
+    return f"{FOLDER}/{nisn}-{fingerprint[:32]}.zip"
+
+
+def load_members(supa, path):
+    """Unduh sub-arsip. Return [(zip_path, bytes)] atau None jika belum ada / rusak."""
+    try:
+        data = supa.storage.from_(BUCKET).download(path)
+    except Exception:
+        return None
+    if not data:
+        return None
+    try:
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            return [(info.filename, archive.read(info)) for info in archive.infolist()]
+    except zipfile.BadZipFile as e:
+        print(f"[ZIP_CACHE] ⚠️ Sub-arsip rusak {path}: {e}")
+        return None
+
+
+def store_members(supa, nisn, path, members):
+    """Simpan sub-arsip baru lalu hapus versi lama pendaftar ini (best effort)."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+        for zip_path, data in members:
+            archive.writestr(zip_path, data)
+
+    try:
+        supa.storage.from_(BUCKET).upload(
+            path=path,
+            file=buffer.getvalue(),
+            file_options={"content-type": "application/zip", "x-upsert": "true"},
+        )
+    except Exception as e:
+        print(f"[ZIP_CACHE] ⚠️ Gagal simpan sub-arsip {path}: {e}")
+        return False
+
+    try:
+        existing = supa.storage.from_(BUCKET).list(FOLDER, {"search": f"{nisn}-", "limit": 100})
+        keep = path.rsplit("/", 1)[-1]
+        stale = [
+            f"{FOLDER}/{item.get('name')}"
+            for item in (existing or [])
+            if isinstance(item, dict)
+            and str(item.get("name") or "").startswith(f"{nisn}-")
+            and item.get("name") != keep
+        ]
+        if stale:
+            supa.storage.from_(BUCKET).remove(stale)
+    except Exception as e:
+        print(f"[ZIP_CACHE] ⚠️ Gagal hapus sub-arsip lama {nisn}: {e}")
+    return True
+
+
+def _list_all(bucket, folder):
+    """Semua item di folder (listing storage per halaman)."""
+    items = []
+    offset = 0
+    while True:
+        page = bucket.list(folder, {"limit": LIST_PAGE_SIZE, "offset": offset}) or []
+        items.extend(item for item in page if isinstance(item, dict) and item.get("name"))
+        if len(page) < LIST_PAGE_SIZE:
+            return items
+        offset += LIST_PAGE_SIZE
+
+
+def _created_at(item):
+    try:
+        created = datetime.fromisoformat(str(item.get("created_at") or "").replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return created if created.tzinfo else created.replace(tzinfo=timezone.utc)
+
+
+def cleanup_expired(supa, max_age_hours=MAX_AGE_HOURS):
+    """
+    Hapus sub-arsip yang lebih tua dari max_age_hours, plus folder per-NISN
+    dari layout lama (zip-cache/<nisn>/...). Non-critical, error hanya di-log.
+    """
+    try:
+        bucket = supa.storage.from_(BUCKET)
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=max_age_hours)
+        expired = []
+        for item in _list_all(bucket, FOLDER):
+            if item.get("id") is None:
+                # Folder layout lama: seluruh isinya dihapus
+                legacy = f"{FOLDER}/{item['name']}"
+                expired.extend(f"{legacy}/{child['name']}" for child in _list_all(bucket, legacy))
+                continue
+            created = _created_at(item)
+            if created is not None and created < cutoff:
+                expired.append(f"{FOLDER}/{item['name']}")
+
+        for start in range(0, len(expired), REMOVE_BATCH):
+            bucket.remove(expired[start:start + REMOVE_BATCH])
+        if expired:
+            print(f"[ZIP_CACHE] ✓ {len(expired)} sub-arsip kadaluarsa dihapus")
+    except Exception as e:
+        print(f"[ZIP_CACHE] ⚠️ Cleanup error (non-critical): {e}")
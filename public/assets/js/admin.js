@@ -75,6 +75,14 @@
   let pageSize = 10; // WAJIB 10 data per halaman
   let totalData = 0;
 
+  // Pagination & filter state untuk pembayaran (diproses di server)
+  let pembayaranPage = 1;
+  const PEMBAYARAN_PAGE_SIZE = 25;
+  let pembayaranTotal = 0;
+  let pembayaranSearchTimer = null;
+  // NISN / NIK pembayaran yang dicentang untuk aksi massal (bertahan saat auto refresh)
+  const selectedPembayaran = new Set();
+
   const CACHE_DURATION = 30_000; // (opsi, saat ingin cache) 30s
   const AUTO_REFRESH_INTERVAL = 30_000; // auto refresh pembayaran tiap 30s
   const MOBILE_BREAKPOINT = 992; // breakpoint untuk mode mobile/tablet
@@ -410,8 +418,7 @@
      3) PENDAFTAR
      ========================= */
   // Cache untuk statistik - jangan fetch ulang terus
-  let cachedAllDataForStats = null;
-  let cachedVerifiedPayments = null;
+  let cachedStats = null;
   let lastStatsFetchTime = 0;
   const STATS_CACHE_DURATION = 60000; // 1 menit
   
@@ -556,43 +563,27 @@
       const now = Date.now();
       
       // Gunakan cache jika masih valid
-      if (cachedAllDataForStats && cachedVerifiedPayments && (now - lastStatsFetchTime < STATS_CACHE_DURATION)) {
+      if (cachedStats && (now - lastStatsFetchTime < STATS_CACHE_DURATION)) {
         console.log('[STATISTIK] Using cached data');
-        calculateAndUpdateStatistics(cachedAllDataForStats, cachedVerifiedPayments);
+        calculateAndUpdateStatistics(cachedStats);
         return;
       }
       
       console.log('[STATISTIK] Fetching fresh data...');
       
-      // Fetch ALL data untuk statistik (tanpa pagination)
-      const rAll = await fetch("/api/pendaftar_list?page=1&pageSize=1000");
-      const resultAll = await rAll.json();
-      const allDataForStats = resultAll.success && resultAll.data ? resultAll.data : [];
-      
-      // Fetch pembayaran data untuk sinkronisasi statistik
-      const rPembayaran = await fetch("/api/pembayaran_list");
-      const pembayaranResult = await rPembayaran.json();
-      
-      // Create map of verified payments by NISN/NIK
-      const verifiedPayments = new Map();
-      if (pembayaranResult.success && pembayaranResult.data) {
-        pembayaranResult.data.forEach(p => {
-          if ((p.status || "PENDING").toUpperCase() === "VERIFIED") {
-            const identifiers = [p.nisn, p.nik, p.nikcalon].filter(Boolean);
-            identifiers.forEach(key => {
-              if (key) verifiedPayments.set(key, true);
-            });
-          }
-        });
+      // Statistik dihitung di server (agregat), bukan dari seluruh baris pendaftar
+      const r = await fetch("/api/pendaftar_stats");
+      const result = await r.json();
+      if (!result.ok || !result.data) {
+        throw new Error(result.error || "Gagal memuat statistik");
       }
       
       // Cache hasil
-      cachedAllDataForStats = allDataForStats;
-      cachedVerifiedPayments = verifiedPayments;
+      cachedStats = result.data;
       lastStatsFetchTime = now;
       
-      // Calculate dan update statistik
-      calculateAndUpdateStatistics(allDataForStats, verifiedPayments);
+      // Update statistik
+      calculateAndUpdateStatistics(cachedStats);
       
     } catch (error) {
       console.error('[STATISTIK] Error loading statistics:', error);
@@ -600,33 +591,9 @@
     }
   }
   
-  // Fungsi untuk calculate dan update statistik
-  function calculateAndUpdateStatistics(allDataForStats, verifiedPayments) {
-    console.log('[STATISTIK] Calculating statistics...');
-    
-    // Helper function to check if payment is verified
-    const hasVerifiedPayment = (d) => {
-        const identifiers = [
-          d.nisn,
-          d.nikcalon,
-          d.nik
-        ].filter(Boolean);
-        
-        // Check if any identifier matches verified payments
-        const isVerified = identifiers.some(key => verifiedPayments.has(key));
-        
-        // Debug logging for first few items
-        if (window.debugStatistik && identifiers.length > 0) {
-          console.log("[MATCH DEBUG]", {
-            nama: d.nama,
-            identifiers,
-            isVerified,
-            hasInMap: identifiers.map(id => ({ id, exists: verifiedPayments.has(id) }))
-          });
-        }
-        
-        return isVerified;
-      };
+  // Fungsi untuk update statistik dari hasil agregat /api/pendaftar_stats
+  function calculateAndUpdateStatistics(stats) {
+    console.log('[STATISTIK] Applying aggregated statistics...', stats);
 
       // Kartu statistik
       const setText = (id, val) => {
@@ -634,211 +601,51 @@
         if (el) el.textContent = val;
       };
       
-      // Debug: Check data structure and field mapping
-      console.log("[STATISTIK] 🔍 Data structure analysis:");
-      console.log("[STATISTIK]   → Total pendaftar (ALL DATA):", allDataForStats.length);
-      
-      if (allDataForStats.length > 0) {
-        const sample = allDataForStats[0];
-        console.log("[STATISTIK]   → Sample pendaftar fields:", Object.keys(sample));
-        console.log("[STATISTIK]   → Sample status values:", allDataForStats.map(d => d.status).slice(0, 5));
-        console.log("[STATISTIK]   → Sample rencana_program values:", allDataForStats.map(d => d.rencana_program || d.rencanaprogram).slice(0, 5));
-        console.log("[STATISTIK]   → Sample rencanatingkat values:", allDataForStats.map(d => d.rencanatingkat).slice(0, 5));
-      }
-
       // Total count = all pendaftar (dari total API, bukan hanya halaman saat ini)
-      setText("totalCount", totalData);
-      console.log("[STATISTIK] ✅ Set totalCount to:", totalData);
-      
-      // Status counts (gunakan ALL DATA untuk statistik yang akurat)
-      const pendingCount = allDataForStats.filter((d) => d.status === "pending").length;
-      const revisiCount = allDataForStats.filter((d) => d.status === "revisi").length;
-      const diterimaCount = allDataForStats.filter((d) => d.status === "diterima").length;
-      const ditolakCount = allDataForStats.filter((d) => d.status === "ditolak").length;
-      
-      setText("pendingCount", pendingCount);
-      setText("revisiCount", revisiCount);
-      setText("diterimaCount", diterimaCount);
-      setText("ditolakCount", ditolakCount);
-      
-      console.log("[STATISTIK] ✅ Status counts set:");
-      console.log("[STATISTIK]   → Pending:", pendingCount);
-      console.log("[STATISTIK]   → Revisi:", revisiCount);
-      console.log("[STATISTIK]   → Diterima:", diterimaCount);
-      console.log("[STATISTIK]   → Ditolak:", ditolakCount);
-
-      // Breakdown program/jenjang
-      const getRencanaProgram = (d) => {
-        const program = d.rencana_program || d.rencanaProgram || d.rencanakelas || d.rencanaprogram || "";
-        return program.trim(); // Trim whitespace
-      };
-      
-      const getJenjang = (d) => {
-        const jenjang = d.rencanatingkat || d.rencanaTingkat || "";
-        return jenjang.trim(); // Trim whitespace
-      };
-      
-      // REVISI: Gunakan SEMUA pendaftar untuk statistik, bukan hanya yang verified
-      const allPendaftar = allDataForStats; // Gunakan SEMUA data untuk statistik (bukan hanya halaman saat ini)
-      
-      console.log("[STATISTIK] ========================================");
-      console.log("[STATISTIK] Total pendaftar (ALL DATA):", allDataForStats.length);
-      console.log("[STATISTIK] Menggunakan SEMUA pendaftar untuk statistik (bukan hanya verified)");
-      console.log("[STATISTIK] Verified payments map size:", verifiedPayments.size);
-      console.log("[STATISTIK] Pendaftar dengan pembayaran VERIFIED:", allDataForStats.filter(hasVerifiedPayment).length);
-      
-      // Debug: Log sample data for statistics verification
-      if (allPendaftar.length > 0) {
-        console.log("[STATISTIK] Sample pendaftar pertama:", {
-          nama: allPendaftar[0].nama,
-          nisn: allPendaftar[0].nisn,
-          nik: allPendaftar[0].nik,
-          nikcalon: allPendaftar[0].nikcalon,
-          rencana_program: getRencanaProgram(allPendaftar[0]),
-          rencanatingkat: getJenjang(allPendaftar[0]),
-          jeniskelamin: allPendaftar[0].jeniskelamin
-        });
-      }
-      
-      console.log("[STATISTIK] ========================================");
-      console.log("💡 Tip: Statistik sekarang menggunakan SEMUA pendaftar (bukan hanya verified)");
-
-      // REVISI: Hitung SEMUA pendaftar untuk breakdown statistics
-      console.log("[STATISTIK] 🔍 Calculating breakdown statistics...");
-      console.log("[STATISTIK]   → Total pendaftar count:", allPendaftar.length);
-      
-      const putraIndukMts = allPendaftar.filter(
-        (d) => {
-          const program = getRencanaProgram(d);
-          const jenjang = getJenjang(d);
-          const isMatch = program === "Asrama Putra Induk" && jenjang === "MTs";
-          return isMatch;
-        }
-      ).length;
-      const putraIndukMa = allPendaftar.filter(
-        (d) => {
-          const program = getRencanaProgram(d);
-          const jenjang = getJenjang(d);
-          const isMatch = program === "Asrama Putra Induk" && jenjang === "MA";
-          return isMatch;
-        }
-      ).length;
-      const putraIndukKuliah = allPendaftar.filter(
-        (d) => {
-          const program = getRencanaProgram(d);
-          const jenjang = getJenjang(d);
-          const isMatch = program === "Asrama Putra Induk" && jenjang === "Kuliah";
-          return isMatch;
-        }
-      ).length;
+      setText("totalCount", stats.total ?? totalData);
+      
+      // Status counts (key status dari server dalam UPPERCASE)
+      const byStatus = stats.by_status || {};
+      setText("pendingCount", byStatus.PENDING || 0);
+      setText("revisiCount", byStatus.REVISI || 0);
+      setText("diterimaCount", byStatus.DITERIMA || 0);
+      setText("ditolakCount", byStatus.DITOLAK || 0);
+
+      // Breakdown program/jenjang/jenis kelamin
+      const breakdown = stats.breakdown || [];
+      const countOf = (program, jenjang, gender) =>
+        breakdown
+          .filter(
+            (b) =>
+              b.rencanaprogram === program &&
+              b.rencanatingkat === jenjang &&
+              (!gender || b.jeniskelamin === gender)
+          )
+          .reduce((sum, b) => sum + (b.count || 0), 0);
+
+      const putraIndukMts = countOf("Asrama Putra Induk", "MTs");
+      const putraIndukMa = countOf("Asrama Putra Induk", "MA");
+      const putraIndukKuliah = countOf("Asrama Putra Induk", "Kuliah");
       const putraIndukTotal = putraIndukMts + putraIndukMa + putraIndukKuliah;
 
-      const putraTahfidzMts = allPendaftar.filter(
-        (d) => {
-          const program = getRencanaProgram(d);
-          const jenjang = getJenjang(d);
-          const isMatch = program === "Asrama Putra Tahfidz" && jenjang === "MTs";
-          return isMatch;
-        }
-      ).length;
-      const putraTahfidzMa = allPendaftar.filter(
-        (d) => {
-          const program = getRencanaProgram(d);
-          const jenjang = getJenjang(d);
-          const isMatch = program === "Asrama Putra Tahfidz" && jenjang === "MA";
-          return isMatch;
-        }
-      ).length;
-      const putraTahfidzKuliah = allPendaftar.filter(
-        (d) => {
-          const program = getRencanaProgram(d);
-          const jenjang = getJenjang(d);
-          const isMatch = program === "Asrama Putra Tahfidz" && jenjang === "Kuliah";
-          return isMatch;
-        }
-      ).length;
+      const putraTahfidzMts = countOf("Asrama Putra Tahfidz", "MTs");
+      const putraTahfidzMa = countOf("Asrama Putra Tahfidz", "MA");
+      const putraTahfidzKuliah = countOf("Asrama Putra Tahfidz", "Kuliah");
       const putraTahfidzTotal =
         putraTahfidzMts + putraTahfidzMa + putraTahfidzKuliah;
 
-      const putriMts = allPendaftar.filter(
-        (d) => {
-          const program = getRencanaProgram(d);
-          const jenjang = getJenjang(d);
-          const isMatch = program === "Asrama Putri" && jenjang === "MTs";
-          return isMatch;
-        }
-      ).length;
-      const putriMa = allPendaftar.filter(
-        (d) => {
-          const program = getRencanaProgram(d);
-          const jenjang = getJenjang(d);
-          const isMatch = program === "Asrama Putri" && jenjang === "MA";
-          return isMatch;
-        }
-      ).length;
-      const putriKuliah = allPendaftar.filter(
-        (d) => {
-          const program = getRencanaProgram(d);
-          const jenjang = getJenjang(d);
-          const isMatch = program === "Asrama Putri" && jenjang === "Kuliah";
-          return isMatch;
-        }
-      ).length;
+      const putriMts = countOf("Asrama Putri", "MTs");
+      const putriMa = countOf("Asrama Putri", "MA");
+      const putriKuliah = countOf("Asrama Putri", "Kuliah");
       const putriTotal = putriMts + putriMa + putriKuliah;
 
-      const hanyaSekolahMtsL = allPendaftar.filter(
-        (d) => {
-          const program = getRencanaProgram(d);
-          const jenjang = getJenjang(d);
-          const isGenderMatch = (d.jeniskelamin && d.jeniskelamin.trim().toUpperCase() === "L") || (d.jenisKelamin && d.jenisKelamin.trim().toUpperCase() === "L");
-          const isMatch = program === "Hanya Sekolah" && jenjang === "MTs" && isGenderMatch;
-          return isMatch;
-        }
-      ).length;
-      const hanyaSekolahMtsP = allPendaftar.filter(
-        (d) => {
-          const program = getRencanaProgram(d);
-          const jenjang = getJenjang(d);
-          const isGenderMatch = (d.jeniskelamin && d.jeniskelamin.trim().toUpperCase() === "P") || (d.jenisKelamin && d.jenisKelamin.trim().toUpperCase() === "P");
-          const isMatch = program === "Hanya Sekolah" && jenjang === "MTs" && isGenderMatch;
-          return isMatch;
-        }
-      ).length;
-      const hanyaSekolahMaL = allPendaftar.filter(
-        (d) => {
-          const program = getRencanaProgram(d);
-          const jenjang = getJenjang(d);
-          const isGenderMatch = (d.jeniskelamin && d.jeniskelamin.trim().toUpperCase() === "L") || (d.jenisKelamin && d.jenisKelamin.trim().toUpperCase() === "L");
-          const isMatch = program === "Hanya Sekolah" && jenjang === "MA" && isGenderMatch;
-          return isMatch;
-        }
-      ).length;
-      const hanyaSekolahMaP = allPendaftar.filter(
-        (d) => {
-          const program = getRencanaProgram(d);
-          const jenjang = getJenjang(d);
-          const isGenderMatch = (d.jeniskelamin && d.jeniskelamin.trim().toUpperCase() === "P") || (d.jenisKelamin && d.jenisKelamin.trim().toUpperCase() === "P");
-          const isMatch = program === "Hanya Sekolah" && jenjang === "MA" && isGenderMatch;
-          return isMatch;
-        }
-      ).length;
+      const hanyaSekolahMtsL = countOf("Hanya Sekolah", "MTs", "L");
+      const hanyaSekolahMtsP = countOf("Hanya Sekolah", "MTs", "P");
+      const hanyaSekolahMaL = countOf("Hanya Sekolah", "MA", "L");
+      const hanyaSekolahMaP = countOf("Hanya Sekolah", "MA", "P");
       const hanyaSekolahTotal =
         hanyaSekolahMtsL + hanyaSekolahMtsP + hanyaSekolahMaL + hanyaSekolahMaP;
 
-      // Debug: Log calculated statistics (SEMUA PENDAFTAR)
-      console.log("[STATISTIK] Hasil perhitungan (SEMUA PENDAFTAR):");
-      console.log("Asrama Putra Induk:", { MTs: putraIndukMts, MA: putraIndukMa, Kuliah: putraIndukKuliah, Total: putraIndukTotal });
-      console.log("Asrama Putra Tahfidz:", { MTs: putraTahfidzMts, MA: putraTahfidzMa, Kuliah: putraTahfidzKuliah, Total: putraTahfidzTotal });
-      console.log("Asrama Putri:", { MTs: putriMts, MA: putriMa, Kuliah: putriKuliah, Total: putriTotal });
-      console.log("Hanya Sekolah:", { 
-        MTs_L: hanyaSekolahMtsL, 
-        MTs_P: hanyaSekolahMtsP, 
-        MA_L: hanyaSekolahMaL, 
-        MA_P: hanyaSekolahMaP, 
-        Total: hanyaSekolahTotal 
-      });
-      console.log("[STATISTIK] ========================================");
-
       // Pasang ke DOM
       const mapSet = (m) =>
         Object.entries(m).forEach(([id, val]) => setText(id, val));
@@ -962,28 +769,23 @@
       let paymentStatus = "Belum Ada";
       let paymentBadgeClass = "secondary";
       try {
-        const r = await fetch("/api/pembayaran_list");
-        const result = await r.json();
-        if (r.ok && result.data) {
-          const nisn = pendaftar.nisn;
-          const payment = result.data.find(
-            (p) => p.nisn === nisn
-          );
-          if (payment) {
-            const raw = (payment.status || "PENDING").toUpperCase();
-            paymentStatus =
-              raw === "VERIFIED"
-                ? "Verified"
-                : raw === "REJECTED"
-                ? "Rejected"
-                : "Pending";
-            paymentBadgeClass =
-              raw === "VERIFIED"
-                ? "success"
-                : raw === "REJECTED"
-                ? "danger"
-                : "warning";
-          }
+        const payment = pendaftar.nisn
+          ? await fetchPembayaranByNisn(pendaftar.nisn, "status")
+          : null;
+        if (payment) {
+          const raw = (payment.status || "PENDING").toUpperCase();
+          paymentStatus =
+            raw === "VERIFIED"
+              ? "Verified"
+              : raw === "REJECTED"
+              ? "Rejected"
+              : "Pending";
+          paymentBadgeClass =
+            raw === "VERIFIED"
+              ? "success"
+              : raw === "REJECTED"
+              ? "danger"
+              : "warning";
         }
       } catch (e) {
         console.error("fetch pembayaran error:", e);
@@ -1508,30 +1310,53 @@ Jazakumullahu khairan,
         params.append('only', filters.only);
       }
       
-      const queryString = params.toString();
-      const url = `/api/pendaftar_download_zip${queryString ? '?' + queryString : ''}`;
-      
-      // Fetch ZIP generation endpoint (silent, no notification)
-      console.log('[ZIP] Requesting:', url);
-      console.log('[ZIP] ⏳ Generating ZIP file...');
-      
-      const response = await fetch(url);
-      const result = await response.json();
-      
-      console.log('[ZIP] Response:', result);
-      
-      if (!result.ok || !result.download_url) {
-        throw new Error(result.error || result.message || 'Gagal membuat file ZIP');
-      }
-      
-      // Success - log details and start download
-      console.log('[ZIP] ✓ ZIP ready:', result.filename, `(${result.size_mb} MB)`);
-      console.log('[ZIP] ✓ Total files:', result.success_count, '/', result.total_files);
-      console.log('[ZIP] ✓ Download URL:', result.download_url);
-      console.log('[ZIP] ✓ Expires in:', result.expires_in);
+      // ZIP besar dibuat per part: tiap response bisa berisi continuation_token
+      // untuk part berikutnya (server berhenti sebelum batas waktu function)
+      let part = 1;
+      let continuationToken = null;
       
-      // Redirect to signed download URL (silent download)
-      window.location.href = result.download_url;
+      do {
+        const partParams = new URLSearchParams(params);
+        if (continuationToken) {
+          partParams.set('continue', continuationToken);
+          partParams.set('part', String(part));
+        }
+        const queryString = partParams.toString();
+        const url = `/api/pendaftar_download_zip${queryString ? '?' + queryString : ''}`;
+        
+        // Fetch ZIP generation endpoint (silent, no notification)
+        console.log('[ZIP] Requesting:', url);
+        console.log(`[ZIP] ⏳ Generating ZIP file (part ${part})...`);
+        
+        const response = await fetch(url);
+        const result = await response.json();
+        
+        console.log('[ZIP] Response:', result);
+        
+        if (!result.ok || !result.download_url) {
+          throw new Error(result.error || result.message || 'Gagal membuat file ZIP');
+        }
+        
+        // Success - log details and start download
+        console.log('[ZIP] ✓ ZIP ready:', result.filename, `(${result.size_mb} MB)`);
+        console.log('[ZIP] ✓ Total files:', result.success_count, '/', result.total_files);
+        console.log('[ZIP] ✓ Download URL:', result.download_url);
+        console.log('[ZIP] ✓ Expires in:', result.expires_in);
+        
+        // Download lewat link sementara agar halaman tetap aktif untuk part berikutnya
+        const link = document.createElement('a');
+        link.href = result.download_url;
+        link.download = result.filename || '';
+        document.body.appendChild(link);
+        link.click();
+        link.remove();
+        
+        continuationToken = result.continuation_token || null;
+        if (continuationToken) {
+          console.log('[ZIP] ↪ Next part starts at:', result.next_pendaftar, `(${result.remaining_pendaftar} pendaftar tersisa)`);
+        }
+        part += 1;
+      } while (continuationToken);
       
       console.log('[ZIP] ✓ Download initiated via storage URL');
     } catch (error) {
@@ -1554,19 +1379,39 @@ Jazakumullahu khairan,
       // Show loading state
       const tbody = $("#pembayaranTableBody");
       if (tbody && !pembayaranLoadedOnce) {
-        tbody.innerHTML = '<tr><td colspan="7" class="text-center"><div class="spinner-border spinner-border-sm text-primary me-2"></div>Memuat data pembayaran...</td></tr>';
+        tbody.innerHTML = '<tr><td colspan="8" class="text-center"><div class="spinner-border spinner-border-sm text-primary me-2"></div>Memuat data pembayaran...</td></tr>';
       }
       
-      const r = await fetch("/api/pembayaran_list");
+      const query = new URLSearchParams({
+        page: String(pembayaranPage),
+        pageSize: String(PEMBAYARAN_PAGE_SIZE),
+        summary: "1",
+        fields: "id,nisn,nik,nama_lengkap,jumlah,status,tanggal_upload",
+      });
+      const search = ($("#searchPembayaran")?.value || "").trim();
+      const statusFilter = $("#filterPembayaranStatus")?.value || "";
+      if (search) query.set("q", search);
+      if (statusFilter) query.set("status", statusFilter);
+
+      const r = await fetch(`/api/pembayaran_list?${query}`);
       const result = await r.json();
       
       pembayaranLoadedOnce = true;
-      console.log('[PEMBAYARAN] ✅ Data loaded:', result.data?.length || 0, 'items');
+      console.log('[PEMBAYARAN] ✅ Data loaded:', result.data?.length || 0, 'of', result.total, 'items');
       
       if (!(result.success && result.data)) return;
 
+      pembayaranTotal = result.total || 0;
+      updatePembayaranPaginationUI(result.data.length);
+      updateBulkPembayaranUI();
+      const selectAll = $("#pembayaranSelectAll");
+      if (selectAll) selectAll.checked = false;
+      const startNum = (pembayaranPage - 1) * PEMBAYARAN_PAGE_SIZE;
+
       // Tabel (tbody already declared above)
-      if (tbody) {
+      if (tbody && !result.data.length) {
+        tbody.innerHTML = '<tr><td colspan="8" class="text-center text-muted">Tidak ada data pembayaran</td></tr>';
+      } else if (tbody) {
         tbody.innerHTML = result.data
           .map((item, i) => {
             const raw = (item.status || "PENDING").toUpperCase();
@@ -1576,9 +1421,17 @@ Jazakumullahu khairan,
                 : raw === "REJECTED"
                 ? "danger"
                 : "warning";
+            const identifier = item.nisn || item.nik || "";
             return `
             <tr>
-              <td>${i + 1}</td>
+              <td>${
+                identifier
+                  ? `<input type="checkbox" class="form-check-input pembayaran-select" value="${identifier}" ${
+                      selectedPembayaran.has(identifier) ? "checked" : ""
+                    } onchange="togglePembayaranSelection(this.value, this.checked)">`
+                  : ""
+              }</td>
+              <td>${startNum + i + 1}</td>
               <td>${item.nisn || item.nik || "-"}</td>
               <td>${item.nama_lengkap || "-"}</td>
               <td>${rupiah(item.jumlah)}</td>
@@ -1602,19 +1455,12 @@ Jazakumullahu khairan,
           .join("");
       }
 
-      // Statistik
-      const totalPending = result.data.filter(
-        (p) => (p.status || "PENDING").toUpperCase() === "PENDING"
-      ).length;
-      const totalVerified = result.data.filter(
-        (p) => (p.status || "PENDING").toUpperCase() === "VERIFIED"
-      ).length;
-      const totalRejected = result.data.filter(
-        (p) => (p.status || "PENDING").toUpperCase() === "REJECTED"
-      ).length;
-      const totalRevenue = result.data
-        .filter((p) => (p.status || "PENDING").toUpperCase() === "VERIFIED")
-        .reduce((sum, p) => sum + (parseFloat(p.jumlah) || 0), 0);
+      // Statistik (dihitung server untuk seluruh data, bukan hanya halaman ini)
+      const summary = result.summary || { by_status: {}, verified_revenue: 0 };
+      const totalPending = summary.by_status.PENDING || 0;
+      const totalVerified = summary.by_status.VERIFIED || 0;
+      const totalRejected = summary.by_status.REJECTED || 0;
+      const totalRevenue = summary.verified_revenue || 0;
 
       const set = (id, val) => {
         const el = document.getElementById(id);
@@ -1635,6 +1481,216 @@ Jazakumullahu khairan,
     }
   }
 
+  function updatePembayaranPaginationUI(rowsOnPage) {
+    const totalPages = Math.max(1, Math.ceil(pembayaranTotal / PEMBAYARAN_PAGE_SIZE));
+    const startIndex = pembayaranTotal ? (pembayaranPage - 1) * PEMBAYARAN_PAGE_SIZE + 1 : 0;
+    const endIndex = (pembayaranPage - 1) * PEMBAYARAN_PAGE_SIZE + rowsOnPage;
+
+    const info = $("#pembayaranPaginationInfo");
+    if (info) info.textContent = `Menampilkan ${startIndex} - ${endIndex} dari ${pembayaranTotal} data`;
+    const pageInfo = $("#pembayaranPageInfo");
+    if (pageInfo) pageInfo.textContent = `Halaman ${pembayaranPage} dari ${totalPages}`;
+    const btnPrev = $("#btnPrevPembayaran");
+    if (btnPrev) btnPrev.disabled = pembayaranPage === 1;
+    const btnNext = $("#btnNextPembayaran");
+    if (btnNext) btnNext.disabled = pembayaranPage >= totalPages;
+  }
+
+  function nextPembayaranPage() {
+    if (pembayaranPage < Math.ceil(pembayaranTotal / PEMBAYARAN_PAGE_SIZE)) {
+      pembayaranPage++;
+      loadPembayaran();
+    }
+  }
+
+  function previousPembayaranPage() {
+    if (pembayaranPage > 1) {
+      pembayaranPage--;
+      loadPembayaran();
+    }
+  }
+
+  function filterPembayaran() {
+    pembayaranPage = 1;
+    loadPembayaran();
+  }
+
+  function searchPembayaran() {
+    // Debounce: query baru dikirim setelah user berhenti mengetik
+    clearTimeout(pembayaranSearchTimer);
+    pembayaranSearchTimer = setTimeout(filterPembayaran, 300);
+  }
+
+  function updateBulkPembayaranUI() {
+    const count = selectedPembayaran.size;
+    const counter = $("#pembayaranSelectedCount");
+    if (counter) counter.textContent = count;
+    const btnVerify = $("#btnBulkVerify");
+    if (btnVerify) btnVerify.disabled = count === 0;
+    const btnReject = $("#btnBulkReject");
+    if (btnReject) btnReject.disabled = count === 0;
+  }
+
+  function togglePembayaranSelection(identifier, checked) {
+    if (checked) selectedPembayaran.add(identifier);
+    else selectedPembayaran.delete(identifier);
+    updateBulkPembayaranUI();
+  }
+
+  function toggleAllPembayaran(checked) {
+    document.querySelectorAll("#pembayaranTableBody .pembayaran-select").forEach((box) => {
+      box.checked = checked;
+      togglePembayaranSelection(box.value, checked);
+    });
+  }
+
+  // Verifikasi / tolak semua yang dicentang dalam satu request (set-based di server)
+  async function bulkVerifyPembayaran(status) {
+    const identifiers = Array.from(selectedPembayaran);
+    if (!identifiers.length) return;
+    const label = status === "VERIFIED" ? "memverifikasi" : "menolak";
+    if (!confirm(`Yakin ${label} ${identifiers.length} pembayaran?`)) return;
+    const catatan = prompt("Catatan admin (opsional):", "") ?? "";
+
+    const btnVerify = $("#btnBulkVerify");
+    const btnReject = $("#btnBulkReject");
+    if (btnVerify) btnVerify.disabled = true;
+    if (btnReject) btnReject.disabled = true;
+    try {
+      const r = await fetch("/api/pembayaran_verify_bulk", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({
+          items: identifiers,
+          status,
+          catatan_admin: catatan,
+          verified_by: localStorage.getItem("adminEmail") || "admin",
+        }),
+      });
+      const result = await r.json();
+      if (!r.ok || !result.ok) throw new Error(result.error || "Gagal verifikasi massal");
+
+      const failed = result.results.filter((item) => !item.ok);
+      result.results
+        .filter((item) => item.ok)
+        .forEach((item) => selectedPembayaran.delete(item.identifier));
+      let message = `✅ ${result.summary.success} dari ${result.summary.total} pembayaran berhasil diproses.`;
+      if (failed.length) {
+        message +=
+          "\n\n❌ Gagal:\n" +
+          failed.map((item) => `• ${item.identifier || "-"}: ${item.message || item.code}`).join("\n");
+      }
+      alert(message);
+    } catch (e) {
+      console.error("bulk verify error:", e);
+      alert("❌ Error: " + e.message);
+    } finally {
+      updateBulkPembayaranUI();
+      loadPembayaran();
+    }
+  }
+
+  // Rekonsiliasi mutasi bank (CSV / XLSX): server mencocokkan transaksi masuk ke
+  // pembayaran PENDING, match confidence tinggi langsung dicentang untuk bulk verify
+  async function reconcileMutasi(input) {
+    const file = input.files && input.files[0];
+    if (!file) return;
+    // Dikirim sebagai base64 dalam JSON: 3 MB → ~4 MB body, di bawah batas 4.5 MB Vercel
+    if (file.size > 3 * 1024 * 1024) {
+      alert("❌ File mutasi terlalu besar! Maksimal 3 MB.");
+      input.value = "";
+      return;
+    }
+
+    const btn = $("#btnReconcileMutasi");
+    const box = $("#reconcileResult");
+    if (btn) btn.disabled = true;
+    try {
+      const dataUrl = await new Promise((resolve, reject) => {
+        const reader = new FileReader();
+        reader.onload = (event) => resolve(event.target.result);
+        reader.onerror = reject;
+        reader.readAsDataURL(file);
+      });
+      const r = await fetch("/api/pembayaran_reconcile", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ file: dataUrl, fileName: file.name }),
+      });
+      const result = await r.json();
+      if (!r.ok || !result.ok) throw new Error(result.error || "Gagal rekonsiliasi mutasi");
+
+      result.verify_items.forEach((item) => selectedPembayaran.add(item.identifier));
+      updateBulkPembayaranUI();
+      loadPembayaran();
+
+      const confidenceClass = { high: "success", medium: "warning", low: "secondary" };
+      const rows = result.matches
+        .map(
+          (match) => `
+            <tr>
+              <td>${match.line}</td>
+              <td>${formatIDDate(match.tanggal)}</td>
+              <td>${rupiah(match.jumlah)}</td>
+              <td class="small">${escapeHtml(match.keterangan)}</td>
+              <td>${escapeHtml(match.pembayaran.nama_lengkap || "-")}<br><small class="text-muted">${escapeHtml(match.identifier || "-")}</small></td>
+              <td>${badge(match.confidence, confidenceClass[match.confidence] || "secondary")}<br><small class="text-muted">${escapeHtml(match.reasons.join(", "))}</small></td>
+            </tr>`
+        )
+        .join("");
+      const s = result.summary;
+      if (box) {
+        box.innerHTML = `
+          <div class="alert alert-info small mb-2">
+            <strong>${escapeHtml(result.statement.file_name)}</strong>:
+            ${s.transactions} transaksi masuk, ${s.matched} cocok
+            (${s.by_confidence.high} tinggi, ${s.by_confidence.medium} sedang, ${s.by_confidence.low} rendah),
+            ${s.unmatched_transactions} transaksi tanpa pasangan, ${s.unmatched_pembayaran} pembayaran PENDING belum ditemukan.
+            <br>${result.verify_items.length} pembayaran confidence tinggi sudah dicentang — cek lalu klik "Verifikasi Terpilih".
+          </div>
+          ${
+            rows
+              ? `<div class="table-responsive"><table class="table table-sm">
+                  <thead><tr><th>Baris</th><th>Tanggal</th><th>Jumlah</th><th>Keterangan</th><th>Pembayaran</th><th>Confidence</th></tr></thead>
+                  <tbody>${rows}</tbody>
+                </table></div>`
+              : ""
+          }`;
+        box.style.display = "block";
+      }
+    } catch (e) {
+      console.error("reconcile mutasi error:", e);
+      alert("❌ Error: " + e.message);
+    } finally {
+      if (btn) btn.disabled = false;
+      input.value = "";
+    }
+  }
+
+  // Ambil satu pembayaran (nisn atau nik) tanpa memuat seluruh tabel
+  async function fetchPembayaranByNisn(nisn, fields) {
+    const query = new URLSearchParams({ nisn: String(nisn), pageSize: "1", count: "planned" });
+    if (fields) query.set("fields", fields);
+    const r = await fetch(`/api/pembayaran_list?${query}`);
+    const result = await r.json();
+    if (!(r.ok && result.success && result.data)) return null;
+    return result.data[0] || null;
+  }
+
+  // Pendaftar pemilik pembayaran (join nisn / nik di server)
+  async function findPendaftarForPembayaran(payment) {
+    const lookup = new URLSearchParams({
+      nisn: String(payment.nisn || payment.nik || ""),
+      pageSize: "1",
+      count: "planned",
+      fields: "nisn,nama,telepon_orang_tua",
+    });
+    const r = await fetch(`/api/pendaftar_pembayaran?${lookup}`);
+    const result = await r.json();
+    if (!(r.ok && result.ok && result.data)) return null;
+    return result.data[0] || null;
+  }
+
   function viewPembayaranDetail(payment) {
     currentPembayaranData = payment;
 
@@ -1777,21 +1833,17 @@ Jazakumullahu khairan,
       // 📱 WHATSAPP MODAL - Kirim WA jika VERIFIED (ANTI POPUP BLOCKER!)
       if (status === "VERIFIED" && currentPembayaranData) {
         try {
-          const pRes = await fetch("/api/pendaftar_list");
-          const pJson = await pRes.json();
-          if (pJson.success && pJson.data) {
-            const pendaftar = pJson.data.find(
-              (p) =>
-                (p.nisn || p.nikcalon || p.nik) === (currentPembayaranData.nisn || currentPembayaranData.nik)
-            );
-            if (pendaftar && pendaftar.telepon_orang_tua) {
-              let phone = pendaftar.telepon_orang_tua.replace(/\D/g, '');
-              if (phone.startsWith('0')) {
-                phone = '62' + phone.substring(1);
-              }
-              
-              const message = encodeURIComponent(
-                `Assalamualaikum Wr. Wb.
+          // Pendaftar ikut dikembalikan pembayaran_verify; lookup hanya jika kosong
+          const pendaftar =
+            result.pendaftar || (await findPendaftarForPembayaran(currentPembayaranData));
+          if (pendaftar && pendaftar.telepon_orang_tua) {
+            let phone = pendaftar.telepon_orang_tua.replace(/\D/g, '');
+            if (phone.startsWith('0')) {
+              phone = '62' + phone.substring(1);
+            }
+            
+            const message = encodeURIComponent(
+              `Assalamualaikum Wr. Wb.
 
 ✅ *Pembayaran telah TERVERIFIKASI*
 
@@ -1804,21 +1856,17 @@ Kami akan menghubungi Anda kembali untuk informasi lebih lanjut.
 
 Jazakumullahu khairan,
 *PONDOK PESANTREN AL IKHSAN BEJI*`
-              );
+            );
 
-              const waWeb = `https://wa.me/${phone}?text=${message}`;
-              
-              // Tampilkan modal WhatsApp (100% tidak kena popup blocker!)
-              showWhatsAppModalPembayaran(
-                currentPembayaranData.nama_lengkap,
-                currentPembayaranData.nisn || currentPembayaranData.nik,
-                phone,
-                waWeb
-              );
-            } else {
-              alert("✅ Pembayaran berhasil diverifikasi!");
-              loadPembayaran();
-            }
+            const waWeb = `https://wa.me/${phone}?text=${message}`;
+            
+            // Tampilkan modal WhatsApp (100% tidak kena popup blocker!)
+            showWhatsAppModalPembayaran(
+              currentPembayaranData.nama_lengkap,
+              currentPembayaranData.nisn || currentPembayaranData.nik,
+              phone,
+              waWeb
+            );
           } else {
             alert("✅ Pembayaran berhasil diverifikasi!");
             loadPembayaran();
@@ -1843,18 +1891,12 @@ Jazakumullahu khairan,
 
   async function loadPembayaranDetail(nisn) {
     try {
-      const r = await fetch("/api/pembayaran_list");
-      const result = await r.json();
-      if (result.success && result.data) {
-        const payment = result.data.find(
-          (p) => (p.nisn || p.nik) === nisn
-        );
-        if (payment) {
-          currentPembayaranData = payment;
-          viewPembayaranDetail(payment);
-        } else {
-          alert("Pembayaran tidak ditemukan.");
-        }
+      const payment = await fetchPembayaranByNisn(nisn);
+      if (payment) {
+        currentPembayaranData = payment;
+        viewPembayaranDetail(payment);
+      } else {
+        alert("Pembayaran tidak ditemukan.");
       }
     } catch (e) {
       console.error("loadPembayaranDetail error:", e);
@@ -1867,6 +1909,14 @@ Jazakumullahu khairan,
   window.openVerifikasiPembayaran = openVerifikasiPembayaran;
   window.confirmVerifikasiPembayaran = confirmVerifikasiPembayaran;
   window.loadPembayaranDetail = loadPembayaranDetail;
+  window.nextPembayaranPage = nextPembayaranPage;
+  window.previousPembayaranPage = previousPembayaranPage;
+  window.filterPembayaran = filterPembayaran;
+  window.searchPembayaran = searchPembayaran;
+  window.togglePembayaranSelection = togglePembayaranSelection;
+  window.toggleAllPembayaran = toggleAllPembayaran;
+  window.bulkVerifyPembayaran = bulkVerifyPembayaran;
+  window.reconcileMutasi = reconcileMutasi;
 
   /* =========================
      6) MODAL CLEANUP HANDLERS
@@ -0,0 +1,51 @@
+-- =========================================================
+-- RPC: cek_status
+-- Lookup pendaftar + pembayaran terbaru untuk halaman cek status
+-- dalam satu round trip. Dipanggil oleh lib/handlers/pendaftar_cek_status.py
+--
+-- p_identifiers: daftar kandidat NISN/NIK (raw & ternormalisasi)
+-- Mengembalikan JSON: { "pendaftar": {...} | null, "pembayaran": {...} | null }
+-- =========================================================
+
+CREATE INDEX IF NOT EXISTS idx_pendaftar_nisn ON public.pendaftar (nisn);
+CREATE INDEX IF NOT EXISTS idx_pendaftar_nikcalon ON public.pendaftar (nikcalon);
+CREATE INDEX IF NOT EXISTS idx_pembayaran_nisn ON public.pembayaran (nisn);
+CREATE INDEX IF NOT EXISTS idx_pembayaran_nik ON public.pembayaran (nik);
+
+CREATE OR REPLACE FUNCTION public.cek_status(p_identifiers text[])
+RETURNS json
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  WITH p AS (
+    SELECT *
+    FROM pendaftar
+    WHERE nisn = ANY (p_identifiers) OR nikcalon = ANY (p_identifiers)
+    -- Prioritas: cocok via NISN dulu, lalu data yang paling baru di-update
+    ORDER BY (nisn = ANY (p_identifiers)) DESC, updatedat DESC NULLS LAST
+    LIMIT 1
+  ),
+  ids AS (
+    SELECT array_remove(
+      p_identifiers || ARRAY[(SELECT nisn FROM p), (SELECT nikcalon FROM p)]::text[],
+      NULL
+    ) AS v
+  ),
+  b AS (
+    SELECT pb.*
+    FROM pembayaran pb
+    CROSS JOIN ids
+    WHERE EXISTS (SELECT 1 FROM p)
+      AND (pb.nisn = ANY (ids.v) OR pb.nik = ANY (ids.v))
+    ORDER BY (pb.nisn = ANY (ids.v)) DESC, pb.updated_at DESC NULLS LAST
+    LIMIT 1
+  )
+  SELECT json_build_object(
+    'pendaftar', (SELECT row_to_json(p) FROM p),
+    'pembayaran', (SELECT row_to_json(b) FROM b)
+  );
+$$;
+
+GRANT EXECUTE ON FUNCTION public.cek_status(text[]) TO service_role;
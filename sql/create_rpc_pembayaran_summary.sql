@@ -0,0 +1,66 @@
+-- =========================================================
+-- RPC: pembayaran_summary
+-- Statistik kartu pembayaran (jumlah per status + total nominal VERIFIED)
+-- dalam satu query agregat. Dipanggil oleh lib/handlers/pembayaran_list.py
+-- untuk ?summary=1, dengan filter yang sama seperti daftar (tanpa status):
+--
+-- p_metode         : metode_pembayaran (exact), NULL = semua
+-- p_created_from   : created_at >= nilai ini
+-- p_created_before : created_at <  nilai ini (date_to polos, eksklusif hari berikutnya)
+-- p_created_until  : created_at <= nilai ini (date_to berupa timestamp)
+-- p_identifier     : nisn = nilai ATAU nik = nilai
+-- p_q              : cari di nisn / nik / nama_lengkap (ILIKE %q%)
+--
+-- Mengembalikan JSON:
+--   { "total": 120, "by_status": { "PENDING": 10, "VERIFIED": 100, "REJECTED": 10 },
+--     "verified_revenue": 50000000 }
+-- =========================================================
+
+CREATE INDEX IF NOT EXISTS idx_pembayaran_created_at ON public.pembayaran (created_at DESC);
+
+CREATE OR REPLACE FUNCTION public.pembayaran_summary(
+  p_metode text DEFAULT NULL,
+  p_created_from timestamptz DEFAULT NULL,
+  p_created_before timestamptz DEFAULT NULL,
+  p_created_until timestamptz DEFAULT NULL,
+  p_identifier text DEFAULT NULL,
+  p_q text DEFAULT NULL
+)
+RETURNS json
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  WITH grouped AS (
+    SELECT
+      upper(coalesce(nullif(trim(status_pembayaran), ''), 'PENDING')) AS status,
+      count(*) AS jumlah_baris,
+      coalesce(sum(jumlah), 0) AS nominal
+    FROM pembayaran
+    WHERE (p_metode IS NULL OR metode_pembayaran = p_metode)
+      AND (p_created_from IS NULL OR created_at >= p_created_from)
+      AND (p_created_before IS NULL OR created_at < p_created_before)
+      AND (p_created_until IS NULL OR created_at <= p_created_until)
+      AND (p_identifier IS NULL OR nisn = p_identifier OR nik = p_identifier)
+      AND (
+        p_q IS NULL
+        OR nisn ILIKE '%' || p_q || '%'
+        OR nik ILIKE '%' || p_q || '%'
+        OR nama_lengkap ILIKE '%' || p_q || '%'
+      )
+    GROUP BY 1
+  )
+  SELECT json_build_object(
+    'total', coalesce((SELECT sum(jumlah_baris) FROM grouped), 0),
+    'by_status', json_build_object(
+      'PENDING', coalesce((SELECT jumlah_baris FROM grouped WHERE status = 'PENDING'), 0),
+      'VERIFIED', coalesce((SELECT jumlah_baris FROM grouped WHERE status = 'VERIFIED'), 0),
+      'REJECTED', coalesce((SELECT jumlah_baris FROM grouped WHERE status = 'REJECTED'), 0)
+    ),
+    'verified_revenue', coalesce((SELECT nominal FROM grouped WHERE status = 'VERIFIED'), 0)
+  );
+$$;
+
+REVOKE ALL ON FUNCTION public.pembayaran_summary(text, timestamptz, timestamptz, timestamptz, text, text) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.pembayaran_summary(text, timestamptz, timestamptz, timestamptz, text, text) TO service_role;
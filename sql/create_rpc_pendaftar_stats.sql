@@ -0,0 +1,66 @@
+-- =========================================================
+-- RPC: pendaftar_stats
+-- Statistik agregat dashboard admin dalam satu round trip.
+-- Dipanggil oleh lib/handlers/pendaftar_stats.py
+--
+-- Mengembalikan JSON:
+-- {
+--   "total": 123,
+--   "by_status":  { "PENDING": 10, "DITERIMA": 5, ... },
+--   "by_program": { "Asrama Putri": 40, ... },
+--   "by_tingkat": { "MTs": 60, ... },
+--   "by_gender":  { "L": 70, "P": 53 },
+--   "breakdown":  [ { "rencanaprogram": "...", "rencanatingkat": "...", "jeniskelamin": "L", "count": 3 }, ... ],
+--   "per_day":    [ { "date": "2025-10-01", "count": 12 }, ... ]
+-- }
+-- =========================================================
+
+CREATE OR REPLACE FUNCTION public.pendaftar_stats(p_days integer DEFAULT 90)
+RETURNS json
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  WITH base AS (
+    SELECT
+      upper(coalesce(nullif(trim(statusberkas), ''), 'PENDING')) AS status,
+      coalesce(trim(rencanaprogram), '') AS program,
+      coalesce(trim(rencanatingkat), '') AS tingkat,
+      upper(coalesce(trim(jeniskelamin), '')) AS gender,
+      (createdat AT TIME ZONE 'Asia/Jakarta')::date AS tanggal
+    FROM pendaftar
+  ),
+  grouped AS (
+    SELECT status, program, tingkat, gender, count(*) AS c
+    FROM base
+    GROUP BY GROUPING SETS ((status), (program), (tingkat), (gender), (program, tingkat, gender))
+  )
+  SELECT json_build_object(
+    'total', (SELECT count(*) FROM base),
+    'by_status', coalesce((SELECT json_object_agg(status, c) FROM grouped
+                           WHERE status IS NOT NULL AND program IS NULL), '{}'::json),
+    'by_program', coalesce((SELECT json_object_agg(program, c) FROM grouped
+                            WHERE program IS NOT NULL AND tingkat IS NULL), '{}'::json),
+    'by_tingkat', coalesce((SELECT json_object_agg(tingkat, c) FROM grouped
+                            WHERE tingkat IS NOT NULL AND program IS NULL), '{}'::json),
+    'by_gender', coalesce((SELECT json_object_agg(gender, c) FROM grouped
+                           WHERE gender IS NOT NULL AND program IS NULL), '{}'::json),
+    'breakdown', coalesce((SELECT json_agg(json_build_object(
+                              'rencanaprogram', program,
+                              'rencanatingkat', tingkat,
+                              'jeniskelamin', gender,
+                              'count', c) ORDER BY program, tingkat, gender)
+                           FROM grouped
+                           WHERE program IS NOT NULL AND tingkat IS NOT NULL), '[]'::json),
+    'per_day', coalesce((SELECT json_agg(json_build_object('date', tanggal, 'count', c) ORDER BY tanggal)
+                         FROM (
+                           SELECT tanggal, count(*) AS c
+                           FROM base
+                           WHERE tanggal >= (now() AT TIME ZONE 'Asia/Jakarta')::date - p_days
+                           GROUP BY tanggal
+                         ) d), '[]'::json)
+  );
+$$;
+
+GRANT EXECUTE ON FUNCTION public.pendaftar_stats(integer) TO service_role;
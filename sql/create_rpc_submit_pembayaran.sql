@@ -0,0 +1,80 @@
+-- =========================================================
+-- RPC: submit_pembayaran
+-- Submit / upload ulang bukti pembayaran dalam satu round trip & satu
+-- transaksi. Dipanggil oleh lib/handlers/pembayaran_submit.py
+--
+-- - pendaftar dengan NISN tersebut wajib ada
+-- - advisory lock per NISN: submit bersamaan untuk NISN yang sama diproses
+--   berurutan, jadi tidak ada dua baris pembayaran baru untuk satu NISN
+-- - sudah ada pembayaran → update bukti, status kembali PENDING
+--   belum ada → insert baru (jumlah & metode default sama dengan handler)
+--
+-- Mengembalikan JSON:
+--   { "ok": true,  "result": "created" | "updated", "pembayaran": {...} }
+--   { "ok": false, "code": "pendaftar_not_found", "message": "..." }
+-- =========================================================
+
+CREATE INDEX IF NOT EXISTS idx_pendaftar_nisn ON public.pendaftar (nisn);
+CREATE INDEX IF NOT EXISTS idx_pembayaran_nisn ON public.pembayaran (nisn);
+
+CREATE OR REPLACE FUNCTION public.submit_pembayaran(
+  p_nisn text,
+  p_nama_lengkap text,
+  p_bukti_pembayaran text,
+  p_catatan text DEFAULT '',
+  p_jumlah numeric DEFAULT 500000.00,
+  p_metode_pembayaran text DEFAULT 'Transfer Bank BRI'
+)
+RETURNS json
+LANGUAGE plpgsql
+VOLATILE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_row pembayaran%ROWTYPE;
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM pendaftar WHERE nisn = p_nisn) THEN
+    RETURN json_build_object(
+      'ok', false,
+      'code', 'pendaftar_not_found',
+      'message', 'NISN tidak ditemukan di database pendaftar'
+    );
+  END IF;
+
+  -- Serialisasi per NISN sampai transaksi selesai
+  PERFORM pg_advisory_xact_lock(hashtext('pembayaran_submit:' || p_nisn));
+
+  UPDATE pembayaran
+  SET bukti_pembayaran = p_bukti_pembayaran,
+      status_pembayaran = 'PENDING',
+      catatan_admin = coalesce(p_catatan, ''),
+      updated_at = now()
+  WHERE nisn = p_nisn;
+
+  IF FOUND THEN
+    SELECT * INTO v_row
+    FROM pembayaran
+    WHERE nisn = p_nisn
+    ORDER BY updated_at DESC NULLS LAST, id DESC
+    LIMIT 1;
+
+    RETURN json_build_object('ok', true, 'result', 'updated', 'pembayaran', row_to_json(v_row));
+  END IF;
+
+  INSERT INTO pembayaran (
+    nisn, nik, nama_lengkap, jumlah, metode_pembayaran, bukti_pembayaran,
+    status_pembayaran, catatan_admin, tanggal_upload, created_at, updated_at
+  )
+  VALUES (
+    p_nisn, NULL, p_nama_lengkap, p_jumlah, p_metode_pembayaran, p_bukti_pembayaran,
+    'PENDING', coalesce(p_catatan, ''), now(), now(), now()
+  )
+  RETURNING * INTO v_row;
+
+  RETURN json_build_object('ok', true, 'result', 'created', 'pembayaran', row_to_json(v_row));
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.submit_pembayaran(text, text, text, text, numeric, text) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.submit_pembayaran(text, text, text, text, numeric, text) TO service_role;
@@ -0,0 +1,104 @@
+-- =========================================================
+-- RPC: verify_pembayaran
+-- Verifikasi / tolak pembayaran + update status pendaftar dalam SATU
+-- transaksi. Dipanggil oleh lib/handlers/pembayaran_verify.py
+--
+-- p_identifier : NISN / NIK (dicocokkan ke pembayaran.nisn / pembayaran.nik)
+-- p_status     : 'VERIFIED' | 'REJECTED'
+-- VERIFIED juga mengubah pendaftar (nisn / nikcalon = p_identifier) menjadi
+-- DITERIMA. Jika salah satu langkah gagal, seluruh perubahan di-rollback,
+-- jadi pembayaran & pendaftar tidak pernah berbeda status.
+--
+-- Mengembalikan JSON:
+--   { "ok": true, "pembayaran": {...}, "pembayaran_count": 1, "pendaftar": {...} | null }
+--   { "ok": false, "code": "invalid_status" | "pembayaran_not_found", "message": "..." }
+-- =========================================================
+
+CREATE INDEX IF NOT EXISTS idx_pembayaran_nisn ON public.pembayaran (nisn);
+CREATE INDEX IF NOT EXISTS idx_pembayaran_nik ON public.pembayaran (nik);
+CREATE INDEX IF NOT EXISTS idx_pendaftar_nisn ON public.pendaftar (nisn);
+CREATE INDEX IF NOT EXISTS idx_pendaftar_nikcalon ON public.pendaftar (nikcalon);
+
+CREATE OR REPLACE FUNCTION public.verify_pembayaran(
+  p_identifier text,
+  p_status text,
+  p_catatan text DEFAULT '',
+  p_verified_by text DEFAULT 'admin'
+)
+RETURNS json
+LANGUAGE plpgsql
+VOLATILE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_status text := upper(coalesce(p_status, ''));
+  v_count integer;
+  v_pembayaran json;
+  v_pendaftar json;
+BEGIN
+  IF v_status NOT IN ('VERIFIED', 'REJECTED') THEN
+    RETURN json_build_object(
+      'ok', false,
+      'code', 'invalid_status',
+      'message', 'Invalid status. Must be one of: VERIFIED, REJECTED'
+    );
+  END IF;
+
+  WITH updated AS (
+    UPDATE pembayaran
+    SET status_pembayaran = v_status,
+        verified_by = coalesce(p_verified_by, 'admin'),
+        catatan_admin = coalesce(p_catatan, ''),
+        tanggal_verifikasi = now(),
+        updated_at = now()
+    WHERE nisn = p_identifier OR nik = p_identifier
+    RETURNING *
+  )
+  SELECT count(*),
+         (SELECT row_to_json(u) FROM updated u
+          ORDER BY (u.nisn = p_identifier) DESC NULLS LAST, u.id DESC LIMIT 1)
+  INTO v_count, v_pembayaran
+  FROM updated;
+
+  IF v_count = 0 THEN
+    RETURN json_build_object(
+      'ok', false,
+      'code', 'pembayaran_not_found',
+      'message', 'Pembayaran dengan NISN tersebut tidak ditemukan'
+    );
+  END IF;
+
+  IF v_status = 'VERIFIED' THEN
+    WITH updated AS (
+      UPDATE pendaftar
+      SET statusberkas = 'DITERIMA',
+          verifiedby = coalesce(p_verified_by, 'admin'),
+          verifiedat = now(),
+          updatedat = now()
+      WHERE nisn = p_identifier OR nikcalon = p_identifier
+      RETURNING *
+    )
+    SELECT row_to_json(u) INTO v_pendaftar
+    FROM updated u
+    ORDER BY (u.nisn = p_identifier) DESC NULLS LAST, u.id DESC
+    LIMIT 1;
+  ELSE
+    SELECT row_to_json(p) INTO v_pendaftar
+    FROM pendaftar p
+    WHERE p.nisn = p_identifier OR p.nikcalon = p_identifier
+    ORDER BY (p.nisn = p_identifier) DESC NULLS LAST, p.updatedat DESC NULLS LAST
+    LIMIT 1;
+  END IF;
+
+  RETURN json_build_object(
+    'ok', true,
+    'pembayaran', v_pembayaran,
+    'pembayaran_count', v_count,
+    'pendaftar', v_pendaftar
+  );
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.verify_pembayaran(text, text, text, text) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.verify_pembayaran(text, text, text, text) TO service_role;
@@ -0,0 +1,110 @@
+-- =========================================================
+-- RPC: verify_pembayaran_bulk
+-- Verifikasi / tolak banyak pembayaran sekaligus, set-based, dalam satu
+-- transaksi. Dipanggil oleh lib/handlers/pembayaran_verify_bulk.py
+--
+-- p_items: [ { "identifier": "0012345678", "status": "VERIFIED", "catatan": "..." }, ... ]
+--   identifier dicocokkan ke pembayaran.nisn / pembayaran.nik; item VERIFIED
+--   juga mengubah pendaftar (nisn / nikcalon) menjadi DITERIMA — sama dengan
+--   RPC verify_pembayaran, tapi satu UPDATE per tabel untuk seluruh item.
+--   Identifier ganda: item terakhir yang dipakai, item sebelumnya "duplicate".
+--
+-- Mengembalikan JSON array hasil per item (urut input):
+--   [ { "index": 0, "identifier": "...", "status": "VERIFIED", "ok": true,
+--       "code": null, "pembayaran_count": 1, "pendaftar_count": 1 }, ... ]
+--   code: invalid_identifier | invalid_status | duplicate | pembayaran_not_found
+-- =========================================================
+
+CREATE INDEX IF NOT EXISTS idx_pembayaran_nisn ON public.pembayaran (nisn);
+CREATE INDEX IF NOT EXISTS idx_pembayaran_nik ON public.pembayaran (nik);
+CREATE INDEX IF NOT EXISTS idx_pendaftar_nisn ON public.pendaftar (nisn);
+CREATE INDEX IF NOT EXISTS idx_pendaftar_nikcalon ON public.pendaftar (nikcalon);
+
+CREATE OR REPLACE FUNCTION public.verify_pembayaran_bulk(
+  p_items jsonb,
+  p_verified_by text DEFAULT 'admin'
+)
+RETURNS json
+LANGUAGE sql
+VOLATILE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  WITH items AS (
+    SELECT
+      (t.ord - 1)::integer AS idx,
+      trim(coalesce(t.item ->> 'identifier', '')) AS identifier,
+      upper(trim(coalesce(t.item ->> 'status', ''))) AS status,
+      coalesce(t.item ->> 'catatan', '') AS catatan
+    FROM jsonb_array_elements(coalesce(p_items, '[]'::jsonb)) WITH ORDINALITY AS t(item, ord)
+  ),
+  -- Satu item per identifier (yang terakhir), hanya status yang valid
+  valid AS (
+    SELECT DISTINCT ON (identifier) idx, identifier, status, catatan
+    FROM items
+    WHERE identifier <> '' AND status IN ('VERIFIED', 'REJECTED')
+    ORDER BY identifier, idx DESC
+  ),
+  upd_pembayaran AS (
+    UPDATE pembayaran pb
+    SET status_pembayaran = v.status,
+        verified_by = coalesce(p_verified_by, 'admin'),
+        catatan_admin = v.catatan,
+        tanggal_verifikasi = now(),
+        updated_at = now()
+    FROM valid v
+    WHERE pb.nisn = v.identifier OR pb.nik = v.identifier
+    RETURNING v.idx
+  ),
+  upd_pendaftar AS (
+    UPDATE pendaftar p
+    SET statusberkas = 'DITERIMA',
+        verifiedby = coalesce(p_verified_by, 'admin'),
+        verifiedat = now(),
+        updatedat = now()
+    FROM valid v
+    WHERE v.status = 'VERIFIED'
+      AND (p.nisn = v.identifier OR p.nikcalon = v.identifier)
+      -- Hanya pendaftar yang pembayarannya benar-benar ada
+      AND EXISTS (
+        SELECT 1 FROM pembayaran pb
+        WHERE pb.nisn = v.identifier OR pb.nik = v.identifier
+      )
+    RETURNING v.idx
+  ),
+  results AS (
+    SELECT
+      i.idx,
+      i.identifier,
+      i.status,
+      CASE
+        WHEN i.identifier = '' THEN 'invalid_identifier'
+        WHEN i.status NOT IN ('VERIFIED', 'REJECTED') THEN 'invalid_status'
+        WHEN v.idx IS NULL THEN 'duplicate'
+        WHEN (SELECT count(*) FROM upd_pembayaran u WHERE u.idx = i.idx) = 0 THEN 'pembayaran_not_found'
+      END AS code,
+      (SELECT count(*) FROM upd_pembayaran u WHERE u.idx = i.idx) AS pembayaran_count,
+      (SELECT count(*) FROM upd_pendaftar u WHERE u.idx = i.idx) AS pendaftar_count
+    FROM items i
+    LEFT JOIN valid v ON v.idx = i.idx
+  )
+  SELECT coalesce(
+    json_agg(
+      json_build_object(
+        'index', r.idx,
+        'identifier', r.identifier,
+        'status', r.status,
+        'ok', r.code IS NULL,
+        'code', r.code,
+        'pembayaran_count', r.pembayaran_count,
+        'pendaftar_count', r.pendaftar_count
+      )
+      ORDER BY r.idx
+    ),
+    '[]'::json
+  )
+  FROM results r;
+$$;
+
+REVOKE ALL ON FUNCTION public.verify_pembayaran_bulk(jsonb, text) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.verify_pembayaran_bulk(jsonb, text) TO service_role;
@@ -0,0 +1,30 @@
+-- =========================================================
+-- Table: export_jobs
+-- State job export background (ZIP berkas / XLSX pendaftar).
+-- Dipakai oleh lib/export_jobs.py & /api/export_jobs
+--
+-- Pekerjaan dipecah per range id pendaftar dan dijalankan bertahap
+-- di beberapa invocation (PUT /api/export_jobs) sampai status = 'done'.
+-- =========================================================
+
+CREATE TABLE IF NOT EXISTS public.export_jobs (
+  id            uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  kind          text NOT NULL CHECK (kind IN ('zip', 'xlsx')),
+  status        text NOT NULL DEFAULT 'pending'
+                CHECK (status IN ('pending', 'running', 'finalizing', 'done', 'failed')),
+  params        jsonb NOT NULL DEFAULT '{}'::jsonb,
+  state         jsonb NOT NULL DEFAULT '{}'::jsonb,
+  total         integer NOT NULL DEFAULT 0,
+  processed     integer NOT NULL DEFAULT 0,
+  result        jsonb,
+  error         text,
+  version       integer NOT NULL DEFAULT 0,   -- optimistic lock antar invocation
+  locked_until  timestamptz,
+  created_at    timestamptz NOT NULL DEFAULT now(),
+  updated_at    timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_export_jobs_created_at ON public.export_jobs (created_at DESC);
+
+ALTER TABLE public.export_jobs ENABLE ROW LEVEL SECURITY;
+-- Tidak ada policy untuk anon/authenticated: hanya service_role (server) yang akses.
@@ -0,0 +1,29 @@
+-- =========================================================
+-- Trigger: pendaftar.updatedat selalu di-set saat baris dibuat / berubah
+-- Dipakai sebagai "data version" cache export (lib/export_cache.py):
+-- max(updatedat) + jumlah baris + filter. Tanpa trigger ini, perubahan
+-- status / berkas yang tidak mengisi updatedat tidak membatalkan cache.
+-- =========================================================
+
+-- Backfill baris lama agar updatedat tidak pernah NULL
+UPDATE public.pendaftar
+SET updatedat = COALESCE(createdat, now())
+WHERE updatedat IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_pendaftar_updatedat ON public.pendaftar (updatedat DESC);
+
+CREATE OR REPLACE FUNCTION public.set_pendaftar_updatedat()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  NEW.updatedat := now();
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_pendaftar_updatedat ON public.pendaftar;
+CREATE TRIGGER trg_pendaftar_updatedat
+  BEFORE INSERT OR UPDATE ON public.pendaftar
+  FOR EACH ROW
+  EXECUTE FUNCTION public.set_pendaftar_updatedat();
@@ -0,0 +1,56 @@
+-- =========================================================
+-- VIEW: pendaftar_pembayaran
+-- Setiap pendaftar + pembayaran terbarunya dalam satu baris, untuk
+-- /api/pendaftar_pembayaran (lib/handlers/pendaftar_pembayaran_list.py).
+--
+-- Pembayaran dicocokkan ke nisn / nikcalon pendaftar lewat kolom nisn atau
+-- nik pembayaran, prioritas sama dengan RPC cek_status: cocok via
+-- pembayaran.nisn dulu, lalu yang paling baru di-update.
+-- Pendaftar tanpa pembayaran tetap muncul (kolom pembayaran NULL).
+--
+-- Butuh index nisn / nik dari create_rpc_cek_status.sql (dibuat ulang di sini
+-- jika belum ada) agar LATERAL join tetap index lookup per pendaftar.
+-- =========================================================
+
+CREATE INDEX IF NOT EXISTS idx_pembayaran_nisn ON public.pembayaran (nisn);
+CREATE INDEX IF NOT EXISTS idx_pembayaran_nik ON public.pembayaran (nik);
+CREATE INDEX IF NOT EXISTS idx_pendaftar_createdat ON public.pendaftar (createdat DESC, id DESC);
+
+CREATE OR REPLACE VIEW public.pendaftar_pembayaran
+WITH (security_invoker = true)
+AS
+SELECT
+  p.id,
+  p.nisn,
+  p.nikcalon,
+  p.namalengkap,
+  p.statusberkas,
+  p.rencanaprogram,
+  p.rencanatingkat,
+  p.jeniskelamin,
+  p.telepon_orang_tua,
+  p.createdat,
+  p.updatedat,
+  b.id                 AS pembayaran_id,
+  b.status_pembayaran,
+  b.jumlah,
+  b.metode_pembayaran,
+  b.bukti_pembayaran,
+  b.tanggal_upload,
+  b.tanggal_verifikasi,
+  b.verified_by,
+  b.catatan_admin,
+  b.updated_at         AS pembayaran_updated_at
+FROM public.pendaftar p
+LEFT JOIN LATERAL (
+  SELECT pb.*
+  FROM public.pembayaran pb
+  WHERE pb.nisn IN (p.nisn, p.nikcalon)
+     OR pb.nik IN (p.nisn, p.nikcalon)
+  ORDER BY (pb.nisn IN (p.nisn, p.nikcalon)) DESC NULLS LAST, pb.updated_at DESC NULLS LAST
+  LIMIT 1
+) b ON true;
+
+-- Hanya backend (service role) yang membaca view ini
+REVOKE ALL ON public.pendaftar_pembayaran FROM anon, authenticated;
+GRANT SELECT ON public.pendaftar_pembayaran TO service_role;